@@ -4,12 +4,15 @@ import json
 import numpy as np
 from utils.logger import Logger
 from utils.metadata.metadata import Metadata
-from dataclasses import dataclass
-from typing import List, Union
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List, Tuple, Union
 import requests
 from dotenv import dotenv_values
 import os.path as path
 from os import listdir, mkdir, remove
+from api.push_engine import PushEngine
+from api.commit_journal import CommitJournal
 
 def to_grid(list_files,chunks_t,chunks_v):
     grids = []
@@ -38,7 +41,29 @@ class ArchiveDB:
     experiments : dict
     commit_dir : str
     api_key : str
+    engine : PushEngine = None
+    commits : CommitJournal = field(default=None,repr=False)
     
+    """
+        append the row of a converted variable to the journal at once, only the keys
+        of the rows of each experiment are kept in memory
+        param :
+            exp_id : str
+            variable_name : str
+            list_files_ts : List[List[str]]
+            list_files_mean : List[List[str]]
+            config_name : str
+            rx : Union[float,None]
+            ry : Union[float,None]
+            extension : str
+            lossless : bool
+            id_metadata : dict
+            chunks_t : int
+            chunks_v : int
+            metadata : Metadata
+        return :
+            None
+    """
     def add(self,exp_id:str,
             variable_name:str,
             list_files_ts:List[List[str]],
@@ -85,9 +110,7 @@ class ArchiveDB:
             "yinc":metadata.general_metadata.yinc,
             "metadata":{"metadata":[vs.to_dict() for vs in metadata.vs_metadata]},
         }
-        if exp_id in self.experiments:
-            self.experiments[exp_id]['table_variable'].append(table_variable_row)
-        else :
+        if exp_id not in self.experiments:
             if "date_original" in id_metadata["metadata"]:
                 id_metadata["metadata"]["date_original"] = datetime.strptime(id_metadata["metadata"]["date_original"], '%Y_%m_%d_%H_%M').isoformat()
             if "date_modified" in id_metadata["metadata"]:
@@ -104,62 +127,144 @@ class ArchiveDB:
                         "labels" : id_metadata["labels"][i],
                         "metadata" : {}
                     }
+            self.experiments[exp_id] = []
 
-            self.experiments[exp_id] = {
-                'table_nimbus_execution' : table_nimbus_execution_row,
-                'table_variable' : [table_variable_row],
-                'exp_metadata' : id_metadata
-            }
+        key = CommitJournal.key(exp_id,variable_name,config_name,extension,lossless,rx,ry)
+        self.journal().append([(key,exp_id,{
+            'table_nimbus_execution' : table_nimbus_execution_row,
+            'table_variable' : table_variable_row,
+            'exp_metadata' : id_metadata
+        })])
+        self.experiments[exp_id].append(key)
     
+    """
+        journal of the commits waiting to be inserted
+        param :
+            None
+        return :
+            CommitJournal
+    """
+    def journal(self) -> CommitJournal:
+        if self.commits is None:
+            if not path.isdir(self.commit_dir) :
+                mkdir(self.commit_dir)
+            self.commits = CommitJournal(path.join(self.commit_dir,"journal.db"))
+        return self.commits
+
+    """
+        the rows are appended to the journal as soon as they are added,
+        commit only releases the journal
+        param :
+            None
+        return :
+            None
+    """
     def commit(self):
-        if not path.isdir(self.commit_dir) :
-            mkdir(self.commit_dir)
-        for exp_id,rows in self.experiments.items():
-            commit_file = path.join(self.commit_dir,f"commit_{exp_id}_{datetime.now().strftime('%d_%m_%Y_%H:%M')}.json")
-            with open(commit_file,"w") as file:
-                file.write(json.dumps({
-                    "date": datetime.now().isoformat(),
-                    "exp_id":exp_id,
-                    "body" : {"request":rows}
-                }))
-        
-    def push(self) -> bool:
-        if not path.isdir(self.commit_dir) :
-            result = True
-            for exp_id,rows in self.experiments.items():
-                url = f"{self.url}/insert/{exp_id}"
-                try :
-                    res = requests.post(url,json={"request":rows},cookies={"access_token":self.api_key})          
-                    if not res.ok:
-                        result = False
-                except :
-                    result = False
-            return result
-        else :
-            result = True
-            requests_list = []
-            for file in listdir(self.commit_dir):
-                with open(path.join(self.commit_dir,file),'r') as rd :
-                    requests_list.append((path.join(self.commit_dir,file),json.loads(rd.read())))
-            requests_list.sort(key=lambda item:datetime.fromisoformat(item[1]['date']), reverse=True)
-            for file,request in requests_list:
-                url = f"{self.url}/insert/{request['exp_id']}"
-                try :
-                    res = requests.post(url,json=request['body'],cookies={"access_token":self.api_key})
-                    if res.ok:
-                        remove(file)
-                    else :
-                        result = False
-                except :
+        if self.commits is not None:
+            self.commits.close()
+
+    """
+        move the commit files written by the previous versions to the journal, oldest first
+        param :
+            journal : CommitJournal
+        return :
+            None
+    """
+    def migrate(self,journal:CommitJournal):
+        files = [path.join(self.commit_dir,file) for file in listdir(self.commit_dir)\
+            if file.startswith("commit_") and file.endswith(".json")]
+        for file in sorted(files,key=path.getmtime):
+            try :
+                with open(file,'r') as rd :
+                    request = json.loads(rd.read())
+                rows = request['body']['request']
+                execution = rows['table_nimbus_execution']
+                journal.append([(CommitJournal.key(request['exp_id'],row['name'],execution['config_name'],\
+                    execution['extension'],execution['lossless'],execution['rx'],execution['ry']),request['exp_id'],{
+                    'table_nimbus_execution' : execution,
+                    'table_variable' : row,
+                    'exp_metadata' : rows['exp_metadata']
+                }) for row in rows['table_variable']])
+            except (ValueError,KeyError,TypeError) as e:
+                Logger.console().warning(f"can't migrate {file} : {e}")
+                continue
+            remove(file)
+
+    """
+        sequence numbers of the pending entries of an experiment grouped by their execution
+        (config, extension and resolution), each group is inserted with its own request
+        param :
+            keys : List[Tuple[int,str]] (the sequence numbers and the keys of the entries)
+        return :
+            List[List[int]]
+    """
+    @staticmethod
+    def executions(keys:List[Tuple[int,str]]) -> List[List[int]]:
+        groups = {}
+        for seq,key in keys:
+            # the key without the experiment and the variable
+            groups.setdefault(json.dumps(json.loads(key)[2:]),[]).append(seq)
+        return list(groups.values())
+
+    """
+        insert the experiments pending in the journal in the archive database, in the order
+        they were committed, whether they were added by this run or an interrupted one. an experiment
+        is sent with a request per execution, the entries of a request are removed from the journal once inserted
+        param :
+            page : int (experiments sent at once)
+        return :
+            bool
+    """
+    def push(self,page:int=256) -> bool:
+        engine = self.engine
+        if engine is None:
+            engine = PushEngine(url=self.url,api_key=self.api_key)
+        journal = self.journal()
+        self.migrate(journal)
+        def load(exp_id,seqs):
+            entries = journal.entries(exp_id,seqs)
+            if len(entries) == 0:
+                raise ValueError(f"no pending entry for {exp_id}")
+            first = entries[0][1]
+            return {"request":{
+                'table_nimbus_execution' : first['table_nimbus_execution'],
+                'table_variable' : [entry['table_variable'] for _,entry in entries],
+                'exp_metadata' : first['exp_metadata']
+            }}
+
+        result = True
+        pending = journal.pending(page)
+        while True:
+            exp_ids = list(islice(pending,page))
+            if len(exp_ids) == 0:
+                break
+            requests = [(exp_id,seqs) for exp_id in exp_ids for seqs in ArchiveDB.executions(journal.keys(exp_id))]
+            inserted = engine.push([(exp_id,lambda exp_id=exp_id,seqs=seqs : load(exp_id,seqs)) for exp_id,seqs in requests])
+            for (_,seqs),ok in zip(requests,inserted):
+                if ok:
+                    journal.remove(seqs)
+                else :
                     result = False
-            return result
+        journal.close()
+        return result
+
     @staticmethod
     def build() -> 'ArchiveDB':
         config = dotenv_values(".env")
         
+        engine = PushEngine(
+            url = config["ARCHIVE_DB_URL"],
+            api_key = config["API_KEY"],
+            workers = int(config.get("ARCHIVE_DB_WORKERS",4)),
+            timeout = float(config.get("ARCHIVE_DB_TIMEOUT",60)),
+            retries = int(config.get("ARCHIVE_DB_RETRIES",3)),
+            compress = config.get("ARCHIVE_DB_GZIP","true").lower() != "false",
+            bulk = int(config.get("ARCHIVE_DB_BULK",0))
+        )
         return ArchiveDB(
             api_key =  config["API_KEY"],
             commit_dir = "./migrations",
             url = config["ARCHIVE_DB_URL"],
-            experiments={}
+            experiments={},
+            engine = engine
         )
\ No newline at end of file
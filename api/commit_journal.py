@@ -0,0 +1,149 @@
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterator, List, Tuple
+
+# to increase when the stored entries change
+JOURNAL_VERSION = 1
+
+"""
+    class CommitJournal, durable queue of the rows to insert in the archive database.
+    an entry is a variable of an experiment converted by a config to an extension at a resolution,
+    committing it again replaces the pending entry, so a reconversion never sends superseded rows.
+    the entries are drained in the order they were committed, one experiment at a time
+"""
+class CommitJournal:
+    def __init__(self,file:str):
+        self.file = file
+        self.__local = threading.local()
+
+    """
+        connection to the journal, one per thread and per process
+        param :
+            None
+        return :
+            sqlite3.Connection
+    """
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local,"connection",None)
+        if connection is None or self.__local.pid != os.getpid():
+            connection = sqlite3.connect(self.file,timeout=60)
+            # every commit is written to the disk before it returns
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            with connection:
+                connection.execute("""CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT UNIQUE,
+                    exp_id TEXT,
+                    date TEXT,
+                    version INTEGER,
+                    entry TEXT)""")
+                connection.execute("CREATE INDEX IF NOT EXISTS journal_exp_id ON journal (exp_id,seq)")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+        return connection
+
+    """
+        idempotency key of an entry, the default resolution is 0 as in the rows of the archive database
+        param :
+            exp_id : str
+            variable_name : str
+            config_name : str
+            extension : str
+            lossless : bool
+            rx : float
+            ry : float
+        return :
+            str
+    """
+    @staticmethod
+    def key(exp_id:str,variable_name:str,config_name:str,extension:str,lossless:bool,rx,ry) -> str:
+        return json.dumps([exp_id,variable_name,config_name,extension,lossless,0 if rx is None else rx,0 if ry is None else ry])
+
+    """
+        append entries to the journal, replacing the pending entries with the same key
+        param :
+            entries : List[Tuple[str,str,dict]] (key, exp_id and entry)
+        return :
+            None
+    """
+    def append(self,entries:List[Tuple[str,str,dict]]):
+        date = datetime.now().isoformat()
+        with self.connection() as connection:
+            connection.executemany("DELETE FROM journal WHERE key = ?",((key,) for key,_,_ in entries))
+            connection.executemany("INSERT INTO journal (key,exp_id,date,version,entry) VALUES (?,?,?,?,?)",\
+                ((key,exp_id,date,JOURNAL_VERSION,json.dumps(entry)) for key,exp_id,entry in entries))
+
+    """
+        experiments with pending entries, in the order of their oldest entry,
+        read a page at a time
+        param :
+            page : int
+        return :
+            Iterator[str]
+    """
+    def pending(self,page:int=256) -> Iterator[str]:
+        last = 0
+        while True:
+            rows = self.connection().execute("""SELECT exp_id,MIN(seq) AS first FROM journal GROUP BY exp_id
+                HAVING first > ? ORDER BY first LIMIT ?""",(last,page)).fetchall()
+            if len(rows) == 0:
+                return
+            for exp_id,last in rows:
+                yield exp_id
+
+    """
+        keys of the pending entries of an experiment, in the order they were committed
+        param :
+            exp_id : str
+        return :
+            List[Tuple[int,str]] (the sequence number and the key)
+    """
+    def keys(self,exp_id:str) -> List[Tuple[int,str]]:
+        return self.connection().execute(\
+            "SELECT seq,key FROM journal WHERE exp_id = ? AND version = ? ORDER BY seq",(exp_id,JOURNAL_VERSION)).fetchall()
+
+    """
+        pending entries of an experiment, in the order they were committed
+        param :
+            exp_id : str
+            seqs : List[int] (the sequence numbers of the entries read, all of them by default)
+        return :
+            List[Tuple[int,dict]] (the sequence number and the entry)
+    """
+    def entries(self,exp_id:str,seqs:List[int] = None) -> List[Tuple[int,dict]]:
+        entries = [(seq,json.loads(entry)) for seq,entry in self.connection().execute(\
+            "SELECT seq,entry FROM journal WHERE exp_id = ? AND version = ? ORDER BY seq",(exp_id,JOURNAL_VERSION))]
+        if seqs is None:
+            return entries
+        seqs = set(seqs)
+        return [(seq,entry) for seq,entry in entries if seq in seqs]
+
+    """
+        remove the entries once inserted, the entries committed since, even with the same key, stay pending
+        param :
+            seqs : List[int] (the sequence numbers of the entries inserted)
+        return :
+            None
+    """
+    def remove(self,seqs:List[int]):
+        with self.connection() as connection:
+            connection.executemany("DELETE FROM journal WHERE seq = ?",((seq,) for seq in seqs))
+
+    def __len__(self) -> int:
+        return self.connection().execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def close(self):
+        connection = getattr(self.__local,"connection",None)
+        if connection is not None and self.__local.pid == os.getpid():
+            connection.close()
+        self.__local.connection = None
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
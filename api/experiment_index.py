@@ -0,0 +1,181 @@
+from datetime import datetime
+import hashlib
+import json
+import os
+import os.path as path
+from typing import List, Union
+import numpy as np
+from api.archive_db import to_grid
+from utils.metadata.bounds_encoding import bounds_array, pack_bounds
+from utils.metadata.metadata import VariableSpecificMetadata
+
+# to increase when the layout of the index changes, an index of another version is rewritten
+INDEX_VERSION = 1
+
+"""
+    sha1 of the content of a file, read by blocks
+    param :
+        file : str
+    return :
+        str
+"""
+def file_checksum(file:str) -> str:
+    sha1 = hashlib.sha1()
+    with open(file,"rb") as f:
+        for block in iter(lambda : f.read(1 << 20),b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+"""
+    boundaries of the chunks of an axis, the same as np.array_split
+    param :
+        size : int
+        chunks : int
+    return :
+        List[slice]
+"""
+def split(size:int,chunks:int) -> List[slice]:
+    step,extra = divmod(size,chunks)
+    starts = np.cumsum([0] + [step + 1 if i < extra else step for i in range(chunks)])
+    return [slice(starts[i],starts[i+1]) for i in range(chunks)]
+
+"""
+    chunks of the grid of an output : their position, their size, their checksum
+    and the bounds of the tiles they hold, one per channel
+    param :
+        files : List[str]
+        chunks_t : int
+        chunks_v : int
+        bounds : List[Union[np.ndarray,None]] (vertical, time, 2)
+    return :
+        dict
+"""
+def grid_index(files:List[str],chunks_t:int,chunks_v:int,bounds:List[Union[np.ndarray,None]]) -> dict:
+    grid = to_grid([files],chunks_t,chunks_v)[0]["grid"]
+    chunks = []
+    for v,row in enumerate(grid):
+        for t,file in enumerate(row):
+            chunk = {
+                "file" : path.basename(file),
+                "t" : t,
+                "v" : v,
+                "size" : path.getsize(file),
+                "sha1" : file_checksum(file),
+                "bounds" : []
+            }
+            for array in bounds:
+                if array is None:
+                    chunk["bounds"].append(None)
+                    continue
+                vertical = split(array.shape[0],len(grid))[v]
+                time = split(array.shape[1],len(row))[t]
+                chunk["bounds"].append(pack_bounds(array[vertical,time]))
+            chunks.append(chunk)
+    return {"rows" : len(grid), "columns" : max((len(row) for row in grid),default=0), "chunks" : chunks}
+
+"""
+    index of the files of a converter, laid out as the grids of the archive database
+    param :
+        ts_files : List[str]
+        mean_files : List[str]
+        chunks_t : int
+        chunks_v : int
+        vs_metadata : List[VariableSpecificMetadata] (the metadata of the channels of the converter)
+    return :
+        dict
+"""
+def output_index(ts_files:List[str],mean_files:List[str],chunks_t:int,chunks_v:int,\
+        vs_metadata:List[VariableSpecificMetadata]) -> dict:
+    ct = chunks_t if chunks_t > 1 else 1
+    cv = chunks_v if chunks_v > 1 else 1
+    bounds_ts = [None if vs.bounds_matrix_ts is None else bounds_array(vs.bounds_matrix_ts) for vs in vs_metadata]
+    bounds_avg = [None if vs.bounds_matrix_avg is None else bounds_array(vs.bounds_matrix_avg) for vs in vs_metadata]
+    return {
+        "ts" : grid_index(ts_files,ct,cv,bounds_ts),
+        "mean" : grid_index(mean_files,ct,cv,bounds_avg)
+    }
+
+
+"""
+    class ExperimentIndex, json file next to the images of an experiment listing every
+    image with its position in the grid, its size, its checksum and the bounds of its tiles,
+    so a client can fetch a single small file instead of reading the metadata of each image.
+    the file is rewritten one variable at a time
+"""
+class ExperimentIndex:
+    def __init__(self,file:str,exp_id:str):
+        self.file = file
+        self.exp_id = exp_id
+
+    """
+        content of the index, empty if it does not exist or has another version
+        param :
+            None
+        return :
+            dict
+    """
+    def load(self) -> dict:
+        try :
+            with open(self.file,"r") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION and index.get("exp_id") == self.exp_id:
+                return index
+        except (OSError,ValueError):
+            pass
+        return {"version" : INDEX_VERSION, "exp_id" : self.exp_id, "variables" : {}}
+
+    """
+        whether the index lists a variable
+        param :
+            variable_name : str
+        return :
+            bool
+    """
+    def has(self,variable_name:str) -> bool:
+        return variable_name in self.load()["variables"]
+
+    """
+        write the index, the file is replaced at once so a reader never sees a partial index
+        param :
+            index : dict
+        return :
+            None
+    """
+    def write(self,index:dict):
+        tmp = f"{self.file}.{os.getpid()}.tmp"
+        with open(tmp,"w") as f:
+            json.dump(index,f,separators=(",",":"))
+        os.replace(tmp,self.file)
+
+    """
+        replace the entry of a variable
+        param :
+            variable_name : str
+            resolutions : List[dict] (one per resolution, see output_index for its outputs)
+        return :
+            None
+    """
+    def put(self,variable_name:str,resolutions:List[dict]):
+        index = self.load()
+        index["created_at"] = datetime.now().isoformat()
+        index["variables"][variable_name] = resolutions
+        self.write(index)
+
+    """
+        forget a variable
+        param :
+            variable_name : str
+        return :
+            None
+    """
+    def remove(self,variable_name:str):
+        index = self.load()
+        if variable_name in index["variables"]:
+            del index["variables"][variable_name]
+            self.write(index)
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import gzip
+import json
+import time
+from typing import Callable, List, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from utils.logger import Logger
+
+# status codes of the requests the server did not process, the insert is not idempotent
+# so the other failures (5xx, read timeouts) are not retried : the experiment may be inserted
+RETRIED_STATUS = {408,429,503}
+
+"""
+    class PushEngine, send the experiments to the archive database through one session
+    kept alive, with a bounded number of concurrent uploads, a timeout on every request
+    and retries with an exponential backoff of the requests which did not reach the server. in bulk mode several experiments are sent
+    in a single request to the bulk endpoint
+"""
+@dataclass
+class PushEngine:
+    url : str
+    api_key : str
+    workers : int = 4
+    timeout : float = 60
+    retries : int = 3
+    backoff : float = 1
+    compress : bool = True
+    bulk : int = 0
+
+    """
+        session shared by the uploads, with a connection per worker
+        param :
+            None
+        return :
+            requests.Session
+    """
+    def session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,pool_maxsize=self.workers)
+        session.mount("http://",adapter)
+        session.mount("https://",adapter)
+        session.cookies.set("access_token",self.api_key)
+        return session
+
+    """
+        post a json body, compressed with gzip, and retry it while the server
+        can't be connected to or answers it did not process the request
+        param :
+            session : requests.Session
+            url : str
+            body : dict
+        return :
+            bool
+    """
+    def post(self,session:requests.Session,url:str,body:dict) -> bool:
+        data = json.dumps(body).encode()
+        headers = {"Content-Type":"application/json"}
+        if self.compress:
+            data = gzip.compress(data)
+            headers["Content-Encoding"] = "gzip"
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2**(attempt - 1))
+            try :
+                res = session.post(url,data=data,headers=headers,timeout=self.timeout)
+            except requests.ConnectionError as e:
+                # the connect timeouts are connection errors, the read timeouts are not
+                Logger.console().debug(f"{url} failed : {e}","REQUESTS")
+                continue
+            except requests.RequestException as e:
+                Logger.console().warning(f"{url} failed, not retried as it may have been processed : {e}")
+                return False
+            if res.ok:
+                return True
+            Logger.console().debug(f"{url} answered {res.status_code}","REQUESTS")
+            if res.status_code not in RETRIED_STATUS:
+                return False
+        return False
+
+    """
+        insert an experiment, its body is loaded by the worker sending it
+        param :
+            session : requests.Session
+            exp_id : str
+            load : Callable[[],dict]
+        return :
+            bool
+    """
+    def insert(self,session:requests.Session,exp_id:str,load:Callable[[],dict]) -> bool:
+        try :
+            body = load()
+        except (OSError,ValueError,KeyError) as e:
+            Logger.console().warning(f"can't load the request of {exp_id} : {e}")
+            return False
+        return self.post(session,f"{self.url}/insert/{exp_id}",body)
+
+    """
+        insert several experiments in a single request to the bulk endpoint
+        param :
+            session : requests.Session
+            batch : List[Tuple[str,Callable[[],dict]]]
+        return :
+            bool
+    """
+    def insert_bulk(self,session:requests.Session,batch:List[Tuple[str,Callable[[],dict]]]) -> bool:
+        try :
+            body = {"requests":[dict(exp_id=exp_id,**load()) for exp_id,load in batch]}
+        except (OSError,ValueError,KeyError) as e:
+            Logger.console().warning(f"can't load the requests of {[exp_id for exp_id,_ in batch]} : {e}")
+            return False
+        return self.post(session,f"{self.url}/insert",body)
+
+    """
+        send the experiments, each one given by its id and a function loading its body
+        param :
+            experiments : List[Tuple[str,Callable[[],dict]]]
+        return :
+            List[bool] (whether each experiment was inserted)
+    """
+    def push(self,experiments:List[Tuple[str,Callable[[],dict]]]) -> List[bool]:
+        if len(experiments) == 0:
+            return []
+        session = self.session()
+        try :
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                if self.bulk <= 1:
+                    return list(executor.map(lambda experiment : self.insert(session,*experiment),experiments))
+                batches = [experiments[i:i+self.bulk] for i in range(0,len(experiments),self.bulk)]
+                results = executor.map(lambda batch : self.insert_bulk(session,batch),batches)
+                return [result for batch,result in zip(batches,results) for _ in batch]
+        finally :
+            session.close()
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
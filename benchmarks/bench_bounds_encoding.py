@@ -0,0 +1,43 @@
+"""
+    benchmark of the binary encoding of the bounds matrices against the json form,
+    report the size of the metadata, in the json payload and in the png text chunks,
+    and the encoding and decoding time for a 6-hourly year on 7 levels
+    usage :
+        python -m benchmarks.bench_bounds_encoding [timesteps]
+"""
+import sys
+import json
+import time
+import zlib
+import numpy as np
+from utils.converters.utils.channel import Channel
+from utils.metadata.bounds_encoding import BoundsEncoding, decode_bounds
+from utils.metadata.metadata import VariableSpecificMetadata
+
+
+def timed(f, repeats:int = 5):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = f()
+    return result,(time.perf_counter() - start)/repeats
+
+
+def main(timesteps:int):
+    rng = np.random.default_rng(0)
+    mins = rng.normal(250, 10, size = (7,timesteps)).astype(np.float32)
+    maxs = mins + rng.uniform(1, 50, size = (7,timesteps)).astype(np.float32)
+    empty = np.zeros((7,timesteps), dtype = bool)
+    bounds_matrix = Channel.bounds_matrix(mins, maxs, empty)
+    print(f"bounds : 7 x {timesteps}")
+
+    for encoding in BoundsEncoding:
+        vs_metadata = VariableSpecificMetadata()
+        vs_metadata.extends(bounds_matrix_ts = bounds_matrix, bounds_encoding = encoding.value)
+        text,encode = timed(lambda : json.dumps(vs_metadata.to_dict()))
+        _,decode = timed(lambda : decode_bounds(json.loads(text)["bounds_matrix_ts"]))
+        print(f"{encoding.value:<7}: {len(text):9d} bytes json {len(zlib.compress(text.encode())):9d} bytes zTXt"
+              f" encode {encode*1000:8.2f}ms decode {decode*1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1460)
@@ -0,0 +1,67 @@
+"""
+    benchmark of Channel.convert against the former per tile conversion,
+    of the rounded uint8 quantization and of the bounds engines
+    usage :
+        python -m benchmarks.bench_channel_convert [timesteps]
+"""
+import sys
+import time
+import numpy as np
+from utils.converters.utils.channel import Channel
+from utils.converters.utils.utils import BoundsEngine, Shape, bounds, clean, normalize
+from utils.metadata.metadata import VariableSpecificMetadata
+
+
+def convert_per_tile(data:np.ndarray, nan_encoding:int, threshold:float) -> np.ndarray:
+    converted_data = np.zeros(data.shape)
+    for vertical in range(data.shape[0]):
+        for time in range(data.shape[1]):
+            min,max = bounds(arr=data[vertical,time,:,:],threshold=threshold)
+            normalized = normalize(input=data[vertical,time,:,:],min = min, max = max )
+            if nan_encoding == 0 :
+                normalized = normalized * 254 + 1
+            else :
+                normalized = normalized * 254
+            converted_data[vertical,time,:,:] = normalized
+    return clean(converted_data,nan_encoding=nan_encoding)
+
+
+def main(timesteps:int):
+    rng = np.random.default_rng(0)
+    data = rng.normal(280, 15, size = (1,timesteps,73,96)).astype(np.float32)
+    data[:,:,:10,:] = np.nan
+    # netCDF4 returns masked arrays
+    data = np.ma.masked_invalid(data)
+    channel = Channel(metadata=VariableSpecificMetadata(), data=data, shape=Shape.build(data.shape))
+
+    start = time.perf_counter()
+    expected = convert_per_tile(data, nan_encoding=255, threshold=3.0)
+    per_tile = time.perf_counter() - start
+
+    start = time.perf_counter()
+    converted = channel.convert(nan_encoding=255, threshold=3.0, legacy_quantization=True)
+    batched = time.perf_counter() - start
+
+    identical = np.array_equal(np.int8(expected).view(np.uint8), converted.data)
+    print(f"field : {data.shape}")
+    print(f"per tile : {per_tile:.3f}s")
+    print(f"batched  : {batched:.3f}s")
+    print(f"speedup  : {per_tile/batched:.1f}x")
+    print(f"identical : {identical}")
+    
+    channel = Channel(metadata=VariableSpecificMetadata(), data=data, shape=Shape.build(data.shape))
+    start = time.perf_counter()
+    rounded = channel.convert(nan_encoding=255, threshold=3.0)
+    elapsed = time.perf_counter() - start
+    print(f"rounded uint8 : {elapsed:.3f}s max difference : {np.max(np.abs(rounded.data.astype(int) - converted.data.astype(int)))}")
+    
+    for bounds_engine in BoundsEngine:
+        channel = Channel(metadata=VariableSpecificMetadata(), data=data, shape=Shape.build(data.shape))
+        start = time.perf_counter()
+        converted = channel.convert(nan_encoding=255, threshold=3.0, bounds_engine=bounds_engine)
+        elapsed = time.perf_counter() - start
+        print(f"{bounds_engine.value:<10}: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,55 @@
+"""
+    benchmark of the encoding profiles of the png and webp providers on the sample data,
+    report the encoding time and the size of the images of every profile
+    usage :
+        python -m benchmarks.bench_encoding_profiles [repeats]
+"""
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+from netCDF4 import Dataset
+from utils.converters.providers.png_provider import PNG_Provider
+from utils.converters.providers.webp_provider import WEBP_Provider
+from utils.converters.utils.channel import Channel
+from utils.converters.utils.utils import EncodingProfile, Mode, Shape
+from utils.metadata.metadata import Metadata, VariableSpecificMetadata
+
+MONTHS = ["jan","feb","mar","apr","may","jun","jul","aug","sep","oct","nov","dec"]
+FILES = "climatearchive_sample_data/data/tfgzn/climate/tfgzna.pdcl{month}.nc"
+VARIABLES = ["temp_mm_1_5m","precip_mm_srf","p_mm_msl"]
+
+
+def load(variable:str) -> np.ndarray:
+    months = []
+    for month in MONTHS:
+        with Dataset(FILES.format(month=month),"r",format="NETCDF4") as dataset:
+            months.append(dataset[variable][:].reshape(1,1,*dataset[variable].shape[-2:]))
+    return np.ma.concatenate(months,axis=1)
+
+
+def main(repeats:int):
+    channels = []
+    for variable in VARIABLES:
+        data = load(variable)
+        channel = Channel(metadata=VariableSpecificMetadata(), data=data, shape=Shape.build(data.shape))
+        channels.append(channel.convert(nan_encoding=255, threshold=3.0))
+    print(f"field : {len(channels)} x {channels[0].shape.tuple()}")
+    
+    metadata = Metadata()
+    with tempfile.TemporaryDirectory() as directory:
+        for name,build in (("png",PNG_Provider.build),("webp",WEBP_Provider.build)):
+            for mode,n in ((Mode.L,1),(Mode.RGB,3)):
+                for profile in [None,*EncodingProfile]:
+                    profile_name = "default" if profile is None else profile.value
+                    provider = build(mode=mode, lossless=True, profile=profile)
+                    start = time.perf_counter()
+                    for _ in range(repeats):
+                        file = provider.save(os.path.join(directory,f"{name}.{profile_name}"), channels[:n], metadata)
+                    elapsed = (time.perf_counter() - start)/repeats
+                    print(f"{name:<5}{mode.name:<4}{profile_name:<10}: {elapsed*1000:8.2f}ms {os.path.getsize(file):8d} bytes")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -1,17 +1,28 @@
+from contextlib import contextmanager
+from dataclasses import replace
 import functools
 import os.path as path
-from os import mkdir,listdir,system,remove,link
+from os import mkdir,listdir,remove,link,stat,utime,access,W_OK
 import shutil
-from typing import Any, Generator, List,Dict, Union, Tuple
+from typing import Any, Generator, List,Dict, Set, Union, Tuple
 from supported_variables.utils.utils import default_preprocessing
 from utils.config import Config
 from utils.logger import Logger,_Logger
 if __name__ == "__main__" :
     from output_folder import OutputFolder
+    from scratch import Scratch
+    from intermediates import Intermediates
 else :
     from file_managers.output_folder import OutputFolder
+    from file_managers.scratch import Scratch
+    from file_managers.intermediates import Intermediates
 
 from utils.import_cdo import cdo
+import utils.variables.info_cache as info_cache
+from utils.variables.pipelines.horizontal_pipeline import REMAPPINGS
+from utils.variables.info import InfoBackend
+from utils.build_manifest import BuildManifest
+from utils.preprocessing_cache import PREPROCESSING
 from netCDF4 import Dataset
 
 
@@ -25,6 +36,102 @@ def file_name(filepath:str)->str:
 def assert_nc_extension(file:str):
     return path.basename(file).split(".")[-1] == "nc"
 
+"""
+    key of the files of a variable, the same for every variable reading these files
+    param :
+        files : Union[str,set,list]
+    return :
+        Union[str,tuple]
+"""
+def files_key(files:Union[str,set,list]) -> Union[str,tuple]:
+    if type(files) is str:
+        return files
+    # the files of a regex are merged by time, their order does not matter
+    if type(files) is set:
+        return tuple(sorted(files))
+    return tuple(files)
+
+# attributes cdo uses to mask the values out of their range, hidden before any merge
+VALID_RANGE_ATTRIBUTES = ("valid_min","valid_max")
+
+"""
+    valid range attributes of every variable of a file which has some
+    param :
+        file : str
+    return :
+        Dict[str,List[str]]
+"""
+def valid_range_attributes(file:str) -> Dict[str,List[str]]:
+    with Dataset(file,"r") as dataset:
+        stripped = {name:[attribute for attribute in VALID_RANGE_ATTRIBUTES if attribute in variable.ncattrs()]\
+            for name,variable in dataset.variables.items()}
+    return {name:attributes for name,attributes in stripped.items() if len(attributes) > 0}
+
+"""
+    rename the valid range attributes of a file in place, to their upper case name to hide
+    them from cdo or back to their name. only the header is written, the names keep their
+    length and the access and modification times of the file are kept, so the caches keyed
+    on the file still match
+    param :
+        file : str
+        stripped : Dict[str,List[str]], as returned by valid_range_attributes
+        hide : bool, True to hide the attributes, False to restore them
+    return :
+        
+"""
+def rename_valid_range(file:str,stripped:Dict[str,List[str]],hide:bool):
+    times = stat(file)
+    with Dataset(file,"a") as dataset:
+        for name,attributes in stripped.items():
+            for attribute in attributes:
+                old,new = (attribute,attribute.upper()) if hide else (attribute.upper(),attribute)
+                if old in dataset[name].ncattrs():
+                    dataset[name].renameAttribute(old,new)
+    utime(file,ns=(times.st_atime_ns,times.st_mtime_ns))
+
+"""
+    input files without the valid_min and valid_max attributes, for the time of a merge.
+    a file without them is used as it is. the attributes of a file that can be written
+    are hidden in place and restored after the merge, without any copy. a file that cannot
+    be written still costs a full copy : it is copied in its tmp path, the attributes are
+    deleted in the copy and the copy is removed after the merge. an interrupted process
+    leaves the attributes of a written file hidden under their upper case name
+    param :
+        files : List[str]
+        tmp_paths : List[str], the path of the copy of every file
+    return :
+        Generator[List[str]] (the files to merge)
+"""
+@contextmanager
+def strip_valid_range(files:List[str],tmp_paths:List[str]) -> Generator[List[str],None,None]:
+    stripped_files = []
+    hidden = []
+    copies = []
+    try:
+        for file,tmp_path in zip(files,tmp_paths):
+            stripped = valid_range_attributes(file)
+            if len(stripped) == 0:
+                stripped_files.append(file)
+            elif access(file,W_OK):
+                hidden.append((file,stripped))
+                rename_valid_range(file,stripped,hide=True)
+                stripped_files.append(file)
+            else :
+                copies.append(tmp_path)
+                shutil.copyfile(file,tmp_path)
+                with Dataset(tmp_path,"a") as dataset:
+                    for name,attributes in stripped.items():
+                        for attribute in attributes:
+                            dataset[name].delncattr(attribute)
+                stripped_files.append(tmp_path)
+        yield stripped_files
+    finally:
+        for file,stripped in hidden:
+            rename_valid_range(file,stripped,hide=False)
+        for tmp_path in copies:
+            if path.isfile(tmp_path):
+                remove(tmp_path)
+
 def memoize(f):
     cache = {}
     def memoized(files,output_file_name,output_folder):
@@ -42,57 +149,171 @@ def memoize(f):
 
 
 class FileManager:
-    def __init__(self,main_folder:OutputFolder,io_bind:Dict[str,Dict[Any,Dict[str,Tuple[OutputFolder,Union[str,List[str]]]]]], black_list : dict):
+    def __init__(self,main_folder:OutputFolder,io_bind:Dict[str,Dict[Any,Dict[str,Tuple[OutputFolder,Union[str,List[str]]]]]], black_list : dict, info_backend : InfoBackend = InfoBackend.CDO, preprocessing_cache_size : float = 0,\
+        scratch_dir : str = None, scratch_size : float = 0):
         self.main_folder = main_folder
         self.io_bind = io_bind
         self.black_list = black_list
+        self.info_backend = info_backend
+        self.preprocessing_cache_size = preprocessing_cache_size
+        self.scratch_dir = scratch_dir
+        self.scratch_size = scratch_size
+        self.scratch = None
+        self.intermediates = None
+        self.manifest = None
     
     def __enter__(self):
+        self.scratch = Scratch.build(self.scratch_dir,int(self.scratch_size*2**30))
+        volatile = [self.main_folder.tmp_dir] + ([] if self.scratch is None else [self.scratch.directory])
+        info_cache.mount(path.join(self.main_folder.main_dir,"info_cache.db"),self.info_backend,volatile)
+        REMAPPINGS.mount(path.join(self.main_folder.main_dir,"remappings"))
+        PREPROCESSING.mount(path.join(self.main_folder.main_dir,"preprocessing_cache"),int(self.preprocessing_cache_size*2**30))
+        self.manifest = BuildManifest(path.join(self.main_folder.main_dir,"build_manifest.db"))
         return self
     
     def __exit__(self,*args,**kwargs):
+        info_cache.unmount()
+        REMAPPINGS.unmount()
+        PREPROCESSING.unmount()
+        if self.manifest is not None:
+            self.manifest.close()
+        self.manifest = None
+        if self.scratch is not None:
+            self.scratch.remove()
+        self.scratch = None
         if path.exists(self.main_folder.tmp_dir):
             shutil.rmtree(self.main_folder.tmp_dir)
     
     
+    """
+        plan the preprocessing shared by the variables of each experiment : the variables
+        read from the same files with the default preprocessing form a cluster, whose files
+        are merged once and whose variables are all extracted by a single cdo pass
+        param :
+            None
+        return :
+            None
+    """
     def clusterize(self):
-        cluster_file = {}
         self.cluster = {}
         self.file_cluster_binder = {}
-        groups = {}
-        uid = 1
-        for id in self.io_bind.keys():
-            if id in self.black_list and self.black_list[id] == True:
-                continue
-            
+        for id in self.iter_id():
+            groups = {}
             for variable,binder in self.io_bind[id].items() :
                 if variable in self.black_list[id] and self.black_list[id][variable]:
                     continue
-                
-                if id not in self.cluster :
-                    cluster_file[id]:set = {}
-                    self.cluster[id]:set = {}
-                    self.file_cluster_binder[id]:set = {}
-                
-                if variable.preprocess == default_preprocessing:
-                    files = "#".join(*binder['binder'].values())
-                    if files in groups:
-                        groups[files].extend(binder['binder'].keys())
-                    else :
-                        groups[files] = [*binder['binder'].keys()]
-                        
-        for id in cluster_file:
-            for key in groups:
-                for value in groups[key]:
-                    cluster_file[id][value] = uid  
-                uid += 1
-            for name in cluster_file[id]:
-                uid = cluster_file[id][name]
-                self.cluster[id][name] = [n for n,v in cluster_file[id].items() if v == uid]
+                if variable.preprocess != default_preprocessing:
+                    continue
+                for nc_var_name,files in binder['binder'].items():
+                    group = groups.setdefault(files_key(files),[])
+                    if nc_var_name not in group:
+                        group.append(nc_var_name)
+            # a single variable does not share its pass with anyone
+            self.cluster[id] = {key:names for key,names in groups.items() if len(names) > 1}
+            self.file_cluster_binder[id] = {}
+
+    """
+        folder of the intermediate files of an experiment during its conversion : the scratch
+        while the files of the experiment fit in its budget, the tmp folder of the outputs
+        otherwise. the folder is removed once the experiment is converted
+        param :
+            id : str
+        return :
+            Generator[str]
+    """
+    @contextmanager
+    def workspace(self,id):
+        tmp_dir = self.main_folder.tmp_dir
+        if self.scratch is not None:
+            size = sum(path.getsize(file) for variable in self.io_bind[id] for file in self.input_files(id,variable))
+            if self.scratch.has_room(size):
+                tmp_dir = self.scratch.directory
+            else :
+                Logger.console().info(f"scratch budget exceeded, intermediate files of {id} spilled to disk")
+        output_folder = None
+        for binder in self.io_bind[id].values():
+            if binder['folder'] is None:
+                continue
+            output_folder = replace(binder['folder'],tmp_dir=tmp_dir)
+            binder['folder'] = output_folder
+            output_folder.mount()
+        if output_folder is not None:
+            self.intermediates = Intermediates(output_folder.tmp())
+        try :
+            yield None if output_folder is None else output_folder.tmp()
+        finally :
+            if self.intermediates is not None:
+                self.intermediates.measure()
+                Logger.console().info(f"peak size of the intermediate files of {id} : {self.intermediates.peak/2**20:.1f} MiB")
+            if output_folder is not None and path.isdir(output_folder.tmp()):
+                shutil.rmtree(output_folder.tmp())
+
+    """
+        units of work which need the files made from the inputs of a variable : every variable of
+        the experiment reading one of its files, or for the preprocessed files the variables sharing
+        its preprocessing (see clusterize)
+        param :
+            id : str
+            variable : Variable
+            preprocessed : bool
+        return :
+            Set[tuple]
+    """
+    def readers(self,id,variable,preprocessed:bool=False) -> Set[tuple]:
+        keys = {files_key(files) for files in self.io_bind[id][variable]['binder'].values()}
+        if preprocessed and (variable.preprocess != default_preprocessing or len(keys & set(self.cluster[id])) == 0):
+            return {(id,variable.name)}
+        readers = set()
+        for other,binder in self.io_bind[id].items():
+            if other in self.black_list[id] and self.black_list[id][other]:
+                continue
+            if preprocessed and other.preprocess != default_preprocessing:
+                continue
+            if len(keys & {files_key(files) for files in binder['binder'].values()}) > 0:
+                readers.add((id,other.name))
+        return readers
+
+    """
+        register the preprocessed files of a variable, deleted once its readers are released
+        param :
+            id : str
+            variable : Variable
+            inputs : List[Tuple[str,str]]
+        return :
+            None
+    """
+    def preprocessed(self,id,variable,inputs:List[Tuple[str,str]]):
+        if self.intermediates is None:
+            return
+        readers = self.readers(id,variable,preprocessed=True)
+        for file,_ in inputs:
+            self.intermediates.add(file,readers)
+
+    """
+        register a file made by a unit of work for itself, like the resized and level
+        selected files of a resolution, deleted once the unit is released
+        param :
+            unit : tuple
+            file : str
+        return :
+            None
+    """
+    def produced(self,unit:tuple,file:str):
+        if self.intermediates is not None:
+            self.intermediates.add(file,{unit})
+
+    """
+        a unit of work (exp_id, variable) or (exp_id, variable, resolution) has finished,
+        the intermediate files nobody needs anymore are deleted
+        param :
+            unit : tuple
+        return :
+            None
+    """
+    def release(self,*unit):
+        if self.intermediates is not None:
+            self.intermediates.release(unit)
 
-                    
-            
-    
     def iter_id(self) : 
         for id in self.io_bind.keys():
             if id in self.black_list and self.black_list[id] == True:
@@ -100,6 +321,23 @@ class FileManager:
             else :
                 yield id
             
+    """
+        input files of a variable of an experiment, before any merge or concatenation
+        param :
+            id : str
+            variable : Variable
+        return :
+            List[str]
+    """
+    def input_files(self,id,variable) -> List[str]:
+        files = []
+        for input_files in self.io_bind[id][variable]['binder'].values():
+            if type(input_files) is str:
+                files.append(input_files)
+            else :
+                files.extend(input_files)
+        return files
+    
     def iter_variables_from(self,id):
         for variable,binder in self.io_bind[id].items() :
             if variable in self.black_list[id] and self.black_list[id][variable]:
@@ -111,11 +349,13 @@ class FileManager:
                 if len(binder['binder'].items()) == 0 :
                     raise FilesNotFoundError("No file found")
                 for nc_var_name,files in binder['binder'].items():
+                    key = files_key(files)
                     # FILE REGEX
                     if type(files) is set:
                         output_file_name = f"{id}.{variable.name}.nc"
-                        files = "#@#".join(file for file in files)
+                        files = "#@#".join(key)
                         input_file,real = FileManager.__mergetime(files,output_file_name,output_folder)
+                        PREPROCESSING.source(input_file,files.split("#@#"))
                     # FILE DESCRIPTOR
                     elif type(files) is str:
                         input_file,real = files,files
@@ -124,8 +364,12 @@ class FileManager:
                         output_file_name = f"{id}.{variable.name}.nc"
                         files = "#@#".join(file for file in files)
                         input_file,real = FileManager.__concatenate(files,output_file_name,output_folder)
-                    if nc_var_name in self.cluster[id]:
-                        self.file_cluster_binder[id][input_file] = (real,self.cluster[id][nc_var_name])    
+                        PREPROCESSING.source(input_file,files.split("#@#"))
+                    if self.intermediates is not None:
+                        self.intermediates.add(real,self.readers(id,variable))
+                        self.intermediates.add(input_file,{(id,variable.name)})
+                    if variable.preprocess == default_preprocessing and key in self.cluster[id]:
+                        self.file_cluster_binder[id][input_file] = (real,self.cluster[id][key])
                     
                     yield input_file,nc_var_name
             yield variable,output_folder,bind
@@ -133,32 +377,19 @@ class FileManager:
     @memoize
     def __concatenate(files:List[str],output_file_name,output_folder):
         files = files.split("#@#")
-        tmp_files = []
-        for file in files:
-            tmp_path = output_folder.tmp_nc_file(file_name(file).replace(".nc",".tmp.nc"))
-            system(f"ncatted -a valid_min,,d,, -a valid_max,,d,, {file} {tmp_path}")
-            tmp_files.append(tmp_path)
-            
+        tmp_paths = [output_folder.tmp_nc_file(file_name(file).replace(".nc",".tmp.nc")) for file in files]
         output_path = output_folder.tmp_nc_file(output_file_name)
-        cdo.cat(input = tmp_files, output = output_path)
-        for tmp_path in tmp_files:
-            remove(tmp_path)
+        with strip_valid_range(files,tmp_paths) as stripped_files:
+            cdo.cat(input = stripped_files, output = output_path)
         return output_path
     
     @memoize     
     def __mergetime(files:List[str],output_file_name,output_folder):
         files = files.split("#@#")
-        tmp_files = []
-        for file in files:
-            tmp_path = output_folder.tmp_nc_file(file_name(file).replace(".nc",".tmp.nc"))
-            if not path.isfile(tmp_path):
-                system(f"ncatted -a valid_min,,d,, -a valid_max,,d,, {file} {tmp_path}")
-            tmp_files.append(tmp_path)
-            
+        tmp_paths = [output_folder.tmp_nc_file(file_name(file).replace(".nc",".tmp.nc")) for file in files]
         output_path = output_folder.tmp_nc_file(output_file_name)
-        cdo.mergetime(input = tmp_files, output = output_path)
-        for tmp_path in tmp_files:
-            remove(tmp_path)
+        with strip_valid_range(files,tmp_paths) as stripped_files:
+            cdo.mergetime(input = stripped_files, output = output_path)
         return output_path
     @staticmethod
     def __mount_output(output:str):
@@ -203,7 +434,10 @@ class FileManager:
                 black_list[id] = True
                 Logger.console().warning(f"variable {id} will not be processed")
             
-        return FileManager(main_folder=main_folder,io_bind=io_bind, black_list = black_list)
+        return FileManager(main_folder=main_folder,io_bind=io_bind, black_list = black_list, info_backend = config.hyper_parameters.info_backend,\
+            preprocessing_cache_size = config.hyper_parameters.preprocessing_cache_size,\
+            scratch_dir = config.hyper_parameters.scratch_dir,\
+            scratch_size = config.hyper_parameters.scratch_size)
     
     @staticmethod
     def mount(input:str,config,variables,ids,output:str="./") -> 'FileManager':
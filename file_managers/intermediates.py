@@ -0,0 +1,96 @@
+import os
+import os.path as path
+from typing import Dict, Iterable, Set
+
+
+"""
+    size of the files of a directory, the hard links of a file are counted once
+    param :
+        directory : str
+    return :
+        int (bytes)
+"""
+def unique_size(directory:str) -> int:
+    size = 0
+    inodes = set()
+    for root,_,files in os.walk(directory):
+        for file in files:
+            try :
+                stat = os.stat(path.join(root,file))
+            except OSError:
+                continue
+            if (stat.st_dev,stat.st_ino) not in inodes:
+                inodes.add((stat.st_dev,stat.st_ino))
+                size += stat.st_size
+    return size
+
+
+"""
+    class Intermediates, registry of the intermediate files of an experiment and of the units
+    of work which still need them. a unit is a tuple (exp_id, variable) or (exp_id, variable,
+    resolution). a registered file is deleted once all its consumers are released, the files
+    nobody registered are left to the removal of the directory at the end of the experiment
+"""
+class Intermediates:
+    def __init__(self,directory:str):
+        self.directory = path.realpath(directory)
+        self.consumers : Dict[str,Set[tuple]] = {}
+        self.released : Set[tuple] = set()
+        self.peak = 0
+
+    """
+        check if a file is in the directory of the registry, the input files never are
+        param :
+            file : str
+        return :
+            bool
+    """
+    def owns(self,file:str) -> bool:
+        real = path.realpath(file)
+        return path.isfile(real) and path.commonpath([self.directory,real]) == self.directory
+
+    """
+        register the units which need a file, the units already released are ignored
+        param :
+            file : str
+            consumers : Iterable[tuple]
+        return :
+            None
+    """
+    def add(self,file:str,consumers:Iterable[tuple]):
+        if not self.owns(file):
+            return
+        file = path.realpath(file)
+        self.consumers.setdefault(file,set()).update(set(consumers) - self.released)
+        if len(self.consumers[file]) == 0:
+            self.delete(file)
+
+    """
+        a unit has finished : the registered files no other unit needs anymore are deleted.
+        the size of the directory is measured before, when it is the largest
+        param :
+            unit : tuple
+        return :
+            None
+    """
+    def release(self,unit:tuple):
+        self.released.add(unit)
+        self.measure()
+        for file,consumers in list(self.consumers.items()):
+            consumers.discard(unit)
+            if len(consumers) == 0:
+                self.delete(file)
+
+    def delete(self,file:str):
+        if path.isfile(file):
+            os.remove(file)
+        del self.consumers[file]
+
+    def measure(self):
+        self.peak = max(self.peak,unique_size(self.directory))
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
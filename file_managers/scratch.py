@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+import os
+import os.path as path
+import shutil
+import tempfile
+from typing import Union
+
+
+"""
+    size of the files of a directory
+    param :
+        directory : str
+    return :
+        int (bytes)
+"""
+def directory_size(directory:str) -> int:
+    size = 0
+    for root,_,files in os.walk(directory):
+        for file in files:
+            try :
+                size += path.getsize(path.join(root,file))
+            except OSError:
+                # removed by another process in the meantime
+                pass
+    return size
+
+
+""" class Scratch, directory of this run on a memory backed filesystem, holding the intermediate files while they fit in the budget """
+@dataclass
+class Scratch:
+    directory : str
+    budget : int
+
+    """
+        check if intermediate files of the given size still fit in the budget
+        and in the free space of the filesystem
+        param :
+            size : int (bytes)
+        return :
+            bool
+    """
+    def has_room(self,size:int) -> bool:
+        used = directory_size(self.directory)
+        return used + size <= self.budget and size < shutil.disk_usage(self.directory).free
+
+    def remove(self):
+        if path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+    """
+        create the scratch directory of this run in the given folder, a budget of 0
+        or a missing folder disables the scratch and every file stays on the disk
+        param :
+            folder : str
+            budget : int (bytes)
+        return :
+            Union[Scratch,None]
+    """
+    @staticmethod
+    def build(folder:Union[str,None],budget:int) -> Union['Scratch',None]:
+        if folder is None or budget <= 0 or not path.isdir(folder):
+            return None
+        return Scratch(directory=tempfile.mkdtemp(prefix="nimbus.",dir=folder),budget=budget)
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
@@ -1,9 +1,11 @@
 from api.archive_db import ArchiveDB
+from api.experiment_index import ExperimentIndex, output_index
 from utils.config import Config
 from utils.converters.converter import Converter
 from typing import List
 import os
 import shutil
+import functools
 from typing import Tuple
 import argparse
 from argparse import RawDescriptionHelpFormatter
@@ -11,6 +13,8 @@ import utils.variables.variable_builder as vb
 from utils.variables.variable import VariableNotFoundError, retrieve_data,preprocess
 import file_managers.default_manager as default
 from utils.logger import Logger
+from utils.scheduler import schedule
+from utils.build_manifest import fingerprint, files_fingerprint, function_fingerprint, hyper_parameters_fingerprint
 import time
 
 VERSION = '1.8'
@@ -34,6 +38,16 @@ def save(directory:str):
         return outputs
     return f
 
+def verify_jobs(jobs) :
+    try:
+        jobs = 1 if jobs is None else int(jobs)
+        if jobs < 1 :
+            raise Exception
+    except Exception :
+        Logger.console().warning(f"the value {jobs} is not valid as a number of jobs. Please retry with a positive integer.")
+        jobs = 1
+    return jobs
+
 def verify_chunks(chunks) :
     try:
         if chunks is not None :
@@ -48,6 +62,173 @@ def verify_chunks(chunks) :
     return chunks
 
 
+"""
+    fingerprint of the conversion of a variable of an experiment : its input files,
+    its description and hyper parameters in the config, its preprocessing and processing
+    functions, the chunks given in the command line and the version of nimbus
+    param :
+        id : str
+        variable : Variable
+        config : Config
+        file_manager : FileManager
+        hyper_parameters : dict
+    return :
+        str
+"""
+def conversion_fingerprint(id,variable,config:Config,file_manager,hyper_parameters) -> str:
+    description = config.supported_variables.get(variable.name)
+    return fingerprint(
+        files_fingerprint(file_manager.input_files(id,variable)),
+        config.name,
+        None if description is None else repr(description.nc_file_var_binder),
+        hyper_parameters_fingerprint(config.get_hp(variable.name)),
+        repr(config.get_realm_hp(variable)),
+        variable.realm,
+        function_fingerprint(variable.preprocess),
+        function_fingerprint(variable.process),
+        hyper_parameters['chunks_t'],
+        hyper_parameters['chunks_v'],
+        VERSION)
+
+def convert_id(id,config:Config,file_manager,archive_db:ArchiveDB,hyper_parameters):
+    Logger.console().status("Starting conversion of", id=id)
+    success = 0
+    total = 0
+    status = 0
+    
+    id_metadata = {"exp_id":id}
+    id_metadata["labels"] = []
+    id_metadata["labels"].extend(hyper_parameters["labels"])
+    if config.id_metadata is not None:
+        parse = config.id_metadata.handle(id)
+        id_metadata["metadata"] = parse()
+        id_metadata["labels"].extend(config.id_metadata.labels)
+    
+    var_note = {}
+    for variable,output_folder,bind in file_manager.iter_variables_from(id):
+        hp = config.get_hp(variable.name)
+        Logger.console().progress_bar(var_name=variable.name,id = id)  
+        total += 1
+        Logger.console().status("\tStarting conversion of", id=id)
+        logger = Logger.file(output_folder.out_log(),variable.name)
+        output_file = output_folder.out_img_file(f"{config.name.lower()}.{id}.{variable.name}")
+        index = ExperimentIndex(output_folder.out_img_file(f"{config.name.lower()}.{id}.index.json"),id)
+        hyper_parameters['tmp_directory'] = output_folder.tmp_nc()
+        hyper_parameters['logger'] = logger
+        
+        try:
+            conversion = conversion_fingerprint(id,variable,config,file_manager,hyper_parameters)
+            row = None if hyper_parameters['force'] else file_manager.manifest.get(id,variable.name,config.name,output_file,conversion)
+            if row is not None and index.has(variable.name):
+                Logger.console().info(f"{variable.name} of {id} is up to date, conversion skipped")
+                row["id_metadata"] = id_metadata
+                archive_db.add(**row)
+                success += 1
+                var_note[variable.name] = status
+                continue
+            file_manager.manifest.remove(id,variable.name,config.name,output_file)
+            index.remove(variable.name)
+            
+            files_var_binder = list(bind(id))
+            files_var_binder = preprocess(files_var_binder,variable,output_folder.tmp_nc(),file_manager.file_cluster_binder[id])
+            file_manager.preprocessed(id,variable,files_var_binder)
+        
+            resolutions = []
+            for resolution in config.get_realm_hp(variable)['resolutions']:
+                hyper_parameters['resolution'] = resolution
+                hyper_parameters['produced'] = functools.partial(file_manager.produced,(id,variable.name,resolution))
+                    
+                res_suffixe = ""
+                if resolution[0] is not None and resolution[1] is not None:
+                    res_suffixe = f".rx{resolution[0]}.ry{resolution[1]}"
+                _output_file = output_file + res_suffixe
+                
+                data,metadata = retrieve_data(inputs=files_var_binder,\
+                    variable=variable,\
+                    hyper_parameters=hyper_parameters,\
+                    config=config,\
+                    output_file = _output_file,\
+                    save=save(output_folder.out_nc()))
+                
+                
+                metadata.extends(version = VERSION)
+                
+                chunks_t = hp.chunks_time
+                if hyper_parameters['chunks_t'] is not None:
+                    chunks_t = hyper_parameters['chunks_t']
+                
+                chunks_v = hp.chunks_vertical
+                if hyper_parameters['chunks_v'] is not None:
+                    chunks_v = hyper_parameters['chunks_v']
+                
+                converters = Converter.build_all(
+                    inputs = data,
+                    threshold = hp.threshold,
+                    bounds_engine = hp.bounds_engine,
+                    metadata = metadata,
+                    chunks_t =  chunks_t,
+                    chunks_v =  chunks_v,
+                    extension = hp.extension,
+                    nan_encoding = hp.nan_encoding, 
+                    lossless = hp.lossless,
+                    streaming = hp.streaming,
+                    legacy_quantization = hp.legacy_quantization,
+                    encoders = hp.encoders,
+                    encoding_profile = hp.encoding_profile,
+                    bounds_encoding = hp.bounds_encoding,
+                    block_size = hp.read_chunk_size
+                )
+                list_ts_files = []
+                list_mean_files =[]
+                outputs = []
+                for converter in converters:
+                    ts_files,mean_file = converter.exec()
+                    list_ts_files.append(ts_files)
+                    list_mean_files.append(mean_file)
+                    chunks_t, chunks_v = converter.chunks_t, converter.chunks_v
+                    outputs.append(output_index(ts_files,mean_file,chunks_t,chunks_v,\
+                        [channel.metadata for channel in converter.channels]))
+                    Logger.console().debug(f"Time series : {ts_files}\nMean : {mean_file}","SAVE")
+                
+                resolutions.append(dict(rx=resolution[0],ry=resolution[1],chunks_t=chunks_t,chunks_v=chunks_v,outputs=outputs))
+                logger.info(metadata.log())
+                file_manager.release(id,variable.name,resolution)
+
+            success += 1
+            row = dict(exp_id=id,
+                       variable_name=variable.name,
+                       config_name=config.name,
+                       list_files_ts=list_ts_files,
+                       list_files_mean=list_mean_files,
+                       rx=resolution[0],
+                       ry=resolution[1],
+                       extension=hp.extension.value,
+                       lossless=hp.lossless,
+                       chunks_t= chunks_t, 
+                       chunks_v = chunks_v,
+                       metadata=metadata,
+                       id_metadata=id_metadata
+                       )
+            archive_db.add(**row)
+            index.put(variable.name,resolutions)
+            file_manager.manifest.put(id,variable.name,config.name,output_file,conversion,row)
+        except VariableNotFoundError as e :
+            Logger.console().warning(f"Variable {e.args[0]} not found for {id} in {variable.name}")
+            status = 1
+        except Exception as e:
+            status = -1
+            trace = Logger.trace() 
+            Logger.console().error(trace, "PNG CONVERTER")
+            logger.error(e.__repr__(), "PNG CONVERTER")   
+        finally :
+            file_manager.release(id,variable.name)
+        Logger.console().status("conversion finished for",id=id)
+        var_note[variable.name] = status
+
+    Logger.console().status("conversion finished for",variable=variable.name)
+    return (success,total),var_note
+
+
 def convert_variables(config:Config,variables,ids,files,output,hyper_parameters):
     if files is None:
         files = config.hyper_parameters.dir
@@ -70,115 +251,27 @@ def convert_variables(config:Config,variables,ids,files,output,hyper_parameters)
         file_manager.clusterize()
 
         note = {}
-            
-        for id in file_manager.iter_id():
-            Logger.console().status("Starting conversion of", id=id)
-            success = 0
-            total = 0
-            status = 0
-            
-            id_metadata = {"exp_id":id}
-            id_metadata["labels"] = []
-            id_metadata["labels"].extend(hyper_parameters["labels"])
-            if config.id_metadata is not None:
-                parse = config.id_metadata.handle(id)
-                id_metadata["metadata"] = parse()
-                id_metadata["labels"].extend(config.id_metadata.labels)
-            
-            var_note = {}
-            for variable,output_folder,bind in file_manager.iter_variables_from(id):
-                hp = config.get_hp(variable.name)
-                Logger.console().progress_bar(var_name=variable.name,id = id)  
-                total += 1
-                Logger.console().status("\tStarting conversion of", id=id)
-                logger = Logger.file(output_folder.out_log(),variable.name)
-                output_file = output_folder.out_img_file(f"{config.name.lower()}.{id}.{variable.name}")
-                hyper_parameters['tmp_directory'] = output_folder.tmp_nc()
-                hyper_parameters['logger'] = logger
-                
-                try:
-                    files_var_binder = list(bind(id))
-                    files_var_binder = preprocess(files_var_binder,variable,output_folder.tmp_nc(),file_manager.file_cluster_binder[id])
-                
-                    
-                    for resolution in config.get_realm_hp(variable)['resolutions']:
-                        hyper_parameters['resolution'] = resolution
-                            
-                        res_suffixe = ""
-                        if resolution[0] is not None and resolution[1] is not None:
-                            res_suffixe = f".rx{resolution[0]}.ry{resolution[1]}"
-                        _output_file = output_file + res_suffixe
-                        
-                        data,metadata = retrieve_data(inputs=files_var_binder,\
-                            variable=variable,\
-                            hyper_parameters=hyper_parameters,\
-                            config=config,\
-                            output_file = _output_file,\
-                            save=save(output_folder.out_nc()))
-                        
-                        
-                        metadata.extends(version = VERSION)
-                        
-                        chunks_t = hp.chunks_time
-                        if hyper_parameters['chunks_t'] is not None:
-                            chunks_t = hyper_parameters['chunks_t']
-                        
-                        chunks_v = hp.chunks_vertical
-                        if hyper_parameters['chunks_v'] is not None:
-                            chunks_v = hyper_parameters['chunks_v']
-                        
-                        converters = Converter.build_all(
-                            inputs = data,
-                            threshold = hp.threshold,
-                            metadata = metadata,
-                            chunks_t =  chunks_t,
-                            chunks_v =  chunks_v,
-                            extension = hp.extension,
-                            nan_encoding = hp.nan_encoding, 
-                            lossless = hp.lossless
-                        )
-                        list_ts_files = []
-                        list_mean_files =[]
-                        for converter in converters:
-                            ts_files,mean_file = converter.exec()
-                            list_ts_files.append(ts_files)
-                            list_mean_files.append(mean_file)
-                            chunks_t, chunks_v = converter.chunks_t, converter.chunks_v
-                            Logger.console().debug(f"Time series : {ts_files}\nMean : {mean_file}","SAVE")
-                        
-                        logger.info(metadata.log())
-
-                    success += 1
-                    archive_db.add(exp_id=id,
-                                   variable_name=variable.name,
-                                   config_name=config.name,
-                                   list_files_ts=list_ts_files,
-                                   list_files_mean=list_mean_files,
-                                   rx=resolution[0],
-                                   ry=resolution[1],
-                                   extension=hp.extension.value,
-                                   lossless=hp.lossless,
-                                   chunks_t= chunks_t, 
-                                   chunks_v = chunks_v,
-                                   metadata=metadata,
-                                   id_metadata=id_metadata
-                                   )
-                except VariableNotFoundError as e :
-                    Logger.console().warning(f"Variable {e.args[0]} not found for {id} in {variable.name}")
-                    status = 1
-                except Exception as e:
-                    status = -1
-                    trace = Logger.trace() 
-                    Logger.console().error(trace, "PNG CONVERTER")
-                    logger.error(e.__repr__(), "PNG CONVERTER")   
-                Logger.console().status("conversion finished for",id=id)
-                var_note[variable.name] = status
-
+        
+        # the intermediate files of an experiment are shared by its variables,
+        # so an experiment is the unit of work given to a process
+        def task(id):
+            with file_manager.workspace(id):
+                result = convert_id(id=id,config=config,file_manager=file_manager,archive_db=archive_db,hyper_parameters=hyper_parameters)
+            return result,0 if file_manager.intermediates is None else file_manager.intermediates.peak
+        
+        exp_ids = list(file_manager.iter_id())
+        results = schedule(task,exp_ids,hyper_parameters['jobs'])
+        peaks = {}
+        for id,(((success,total),var_note),peak) in zip(exp_ids,results):
             note[id] = ((success,total),var_note)
-            Logger.console().status("conversion finished for",variable=variable.name)
+            peaks[id] = peak
+        if len(peaks) > 0:
+            id = max(peaks,key=peaks.get)
+            Logger.console().info(f"peak size of the intermediate files : {peaks[id]/2**20:.1f} MiB for {id}")
 
+    # the rows are already in the journal, a failed run pushes them with the next one or with --resume
+    archive_db.commit()
     if all( all(status != -1 for status in var_note.values()) for (_,_),var_note in note.values()):
-        archive_db.commit()
         return note,archive_db.push()
     else :
         return note,False
@@ -195,13 +288,15 @@ def main(args):
 
     chunks_t = verify_chunks(args.chunks_t)
     chunks_v = verify_chunks(args.chunks_v)
+    jobs = verify_jobs(args.jobs)
     
     labels = []
     if args.labels is not None :
         labels.extend(args.labels.split(","))
 
     hyper_parameters = {'clean':bool(args.clean),
-                         'chunks_t':chunks_t, 'chunks_v':chunks_v,"labels":labels}
+                         'chunks_t':chunks_t, 'chunks_v':chunks_v,"labels":labels,
+                         'jobs':jobs,'force':bool(args.force)}
     
     note,push_success = convert_variables(config=config,\
         variables=variables,\
@@ -232,6 +327,9 @@ if __name__ == "__main__" :
     parser.add_argument('--chunkstime',"-ct", dest = 'chunks_t', help = 'specify the number of chunks (in time)') 
     parser.add_argument('--chunksvertical',"-cv", dest = 'chunks_v', help = 'specify the number of chunks (in vertical)') 
     parser.add_argument('--labels',"-l", dest = 'labels', help = 'specify labels') 
+    parser.add_argument('--jobs',"-j", dest = 'jobs', help = 'specify the number of experiments converted in parallel') 
+    parser.add_argument('--force',"-fo", action = 'store_true', help = 'convert the variables even if their inputs and config did not change') 
+    parser.add_argument('--resume',"-r", action = 'store_true', help = 'push the rows left in the journal by an interrupted or failed run') 
     parser.add_argument('--publication',"-p", dest = 'publication', help = 'fill the database with publications information')   
     parser.add_argument('--publicationfolder',"-pf", dest = 'publication_folder', help = 'specify the folder in which to search files')   
     args = parser.parse_args()
@@ -242,6 +340,14 @@ if __name__ == "__main__" :
         if api is not None :
             api.send()
         
+    elif args.resume:
+        archive_db = ArchiveDB.build()
+        Logger.console().info(f"{len(archive_db.journal())} rows pending in the journal")
+        if archive_db.push():
+            Logger.console().info("all the pending rows were pushed")
+        else :
+            Logger.console().warning("some rows could not be pushed, they stay in the journal")
+        
     elif args.variables is not None and args.config is not None and (args.expids is not None or args.files is not None):
         main(args)
     else :
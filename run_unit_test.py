@@ -7,9 +7,22 @@ from unit_tests.utils.test_config import TestConfig
 from unit_tests.utils.test_metadata import TestMetadata
 from unit_tests.utils.variables.test_variable_builder import TestVariableBuilder
 from unit_tests.supported_variables.utils.test_supported_variable import TestSupportedVariable
-from unit_tests.utils.variables.pipelines.test_horizontal_pipelines import TestHorizontalPipeLine
+from unit_tests.utils.variables.pipelines.test_horizontal_pipelines import TestHorizontalPipeLine, TestRemapping
 from unit_tests.utils.variables.pipelines.test_vertical_pipelines import TestVerticalPipeLine
 from unit_tests.utils.variables.test_info import TestInfo
+from unit_tests.utils.converters.utils.test_channel import TestChannel
+from unit_tests.utils.converters.providers.test_default_provider import TestImageProvider
+from unit_tests.utils.converters.test_converter import TestConverter
+from unit_tests.utils.test_scheduler import TestScheduler
+from unit_tests.utils.test_build_manifest import TestBuildManifest
+from unit_tests.utils.test_preprocessing_cache import TestPreprocessingCache
+from unit_tests.file_managers.test_default_manager import TestDefaultManager
+from unit_tests.file_managers.test_intermediates import TestIntermediates
+from unit_tests.api.test_push_engine import TestPushEngine
+from unit_tests.api.test_commit_journal import TestCommitJournal
+from unit_tests.api.test_experiment_index import TestExperimentIndex
+from unit_tests.utils.variables.test_info_cache import TestInfoCache
+from unit_tests.utils.variables.test_info_parity import TestInfoParity
 import sys
 
 test_classes = [
@@ -19,9 +32,23 @@ test_classes = [
     TestVariableBuilder,
     TestSupportedVariable,
     TestHorizontalPipeLine,
+    TestRemapping,
     TestVerticalPipeLine,
     TestCleaningPipeLine,
-    TestInfo
+    TestInfo,
+    TestChannel,
+    TestImageProvider,
+    TestConverter,
+    TestScheduler,
+    TestBuildManifest,
+    TestPreprocessingCache,
+    TestDefaultManager,
+    TestIntermediates,
+    TestPushEngine,
+    TestCommitJournal,
+    TestExperimentIndex,
+    TestInfoCache,
+    TestInfoParity
 ]
 
 Logger.debug(False)
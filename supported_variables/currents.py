@@ -31,12 +31,12 @@ def preprocessing(
 
     name = path.basename(u_file).replace(".nc", ".u.out.nc")
     out = path.join(output_directory, name)
-    cdo.sellonlatbox("-180,180,90,-90", input = f"-selvar,{u_var} {u_file}", output=out)
+    utils.cached_cdo("sellonlatbox", "-180,180,90,-90", input = f"-selvar,{u_var} {u_file}", output=out)
     outputs.append((out, u_var))
 
     name = path.basename(v_file).replace(".nc", ".v.out.nc")
     out = path.join(output_directory, name)
-    cdo.sellonlatbox("-180,180,90,-90", input = f"-selvar,{v_var} {v_file}", output=out)
+    utils.cached_cdo("sellonlatbox", "-180,180,90,-90", input = f"-selvar,{v_var} {v_file}", output=out)
     outputs.append((out, v_var))
 
     return outputs
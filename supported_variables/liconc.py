@@ -20,6 +20,6 @@ def preprocessing(inputs:List[Tuple[str,str]],output_directory:str) -> List[Tupl
     for input_file,var_name in inputs:
         name = path.basename(input_file).replace(".nc",".out.nc")
         out = path.join(output_directory,name)
-        cdo.sellonlatbox('-180,180,90,-90', input = f"-selvar,{var_name} -sellevel,9 {input_file}", output = out)
+        utils.cached_cdo('sellonlatbox', '-180,180,90,-90', input = f"-selvar,{var_name} -sellevel,9 {input_file}", output = out)
         outputs.append((out,var_name))
     return outputs
\ No newline at end of file
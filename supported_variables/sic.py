@@ -29,7 +29,7 @@ def preprocessing_1(
     name = path.basename(file).replace(".nc", ".out.nc")
     output = path.join(output_directory, name)
 
-    cdo.sellonlatbox("-180,180,90,-90", input=f"-selvar,{var} {file}", output=output)
+    utils.cached_cdo("sellonlatbox", "-180,180,90,-90", input=f"-selvar,{var} {file}", output=output)
 
     return [(output, var)]
 
@@ -45,8 +45,8 @@ def preprocessing_2(
     name = path.basename(file).replace(".nc", ".out.nc")
     output = path.join(output_directory, name)
 
-    cdo.sellonlatbox(
-        "-180,180,90,-90", input=f" -yearmean -selvar,{var} {file}", output=output
+    utils.cached_cdo(
+        "sellonlatbox", "-180,180,90,-90", input=f" -yearmean -selvar,{var} {file}", output=output
     )
 
     return [(output, var)]
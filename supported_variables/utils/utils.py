@@ -3,6 +3,21 @@ from utils.import_cdo import cdo
 import numpy as np
 from typing import Any, List,Union,Tuple
 import os.path as path
+from utils.preprocessing_cache import PREPROCESSING
+
+"""
+    execute a cdo operator through the preprocessing cache : its output is reused
+    when the same operator was applied to the same input files by a previous run
+    param :
+        operator : str
+        *arguments : Any
+        input : str
+        output : str
+    return :
+        str
+"""
+def cached_cdo(operator:str,*arguments:Any,input:str,output:str) -> str:
+    return PREPROCESSING.cdo(operator,*arguments,input=input,output=output)
 
 def default_preprocessing(inputs:List[Tuple[str,str]],output_directory:str) -> List[Tuple[str,str]]:
     outputs = []
@@ -10,7 +25,7 @@ def default_preprocessing(inputs:List[Tuple[str,str]],output_directory:str) -> L
         #selvar = cdo.selvar(var_name, input=input_file)
         name = path.basename(input_file).replace(".nc",".out.nc")
         out = path.join(output_directory,name)
-        cdo.sellonlatbox('-180,180,90,-90', input = f"-selvar,{var_name} {input_file}", output = out)
+        cached_cdo('sellonlatbox','-180,180,90,-90', input = f"-selvar,{var_name} {input_file}", output = out)
         outputs.append((out,var_name))
     return outputs
 
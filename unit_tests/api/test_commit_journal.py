@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from api.commit_journal import CommitJournal
+
+
+class TestCommitJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = CommitJournal(os.path.join(self.directory.name, "journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def entry(self, exp_id, variable, value, rx=None, ry=None, config_name="BRIDGE"):
+        return (CommitJournal.key(exp_id, variable, config_name, "png", True, rx, ry), exp_id, {"name": variable, "value": value})
+
+    def test_append_success(self):
+        self.journal.append([self.entry("texpa", "tas", 1), self.entry("texpb", "tas", 1)])
+        self.journal.append([self.entry("texpa", "pr", 1), self.entry("texpa", "tas", 1, 0.5, 0.5)])
+        # a reconversion replaces the pending row of the variable, the default resolution is 0
+        self.journal.append([self.entry("texpa", "tas", 2, 0, 0)])
+        # another config is another row
+        self.journal.append([self.entry("texpa", "tas", 3, config_name="OTHER")])
+        self.assertEqual(len(self.journal), 5)
+        self.assertEqual(list(self.journal.pending()), ["texpb", "texpa"])
+        self.assertEqual([entry["value"] for _, entry in self.journal.entries("texpa")], [1, 1, 2, 3])
+        # the entries persist between runs
+        self.journal.close()
+        self.journal = CommitJournal(os.path.join(self.directory.name, "journal.db"))
+        self.assertEqual(len(self.journal), 5)
+
+    def test_remove_success(self):
+        self.journal.append([self.entry("texpa", "tas", 1), self.entry("texpa", "pr", 1)])
+        seqs = [seq for seq, _ in self.journal.keys("texpa")]
+        self.assertEqual([entry["name"] for _, entry in self.journal.entries("texpa", seqs[1:])], ["pr"])
+        # committed while the experiment was being inserted
+        self.journal.append([self.entry("texpa", "pr", 2), self.entry("texpa", "clt", 1)])
+        self.journal.remove(seqs)
+        self.assertEqual([(entry["name"], entry["value"]) for _, entry in self.journal.entries("texpa")], [("pr", 2), ("clt", 1)])
+
+    def test_pending_pages_success(self):
+        self.journal.append([self.entry(f"texp{i:02}", "tas", i) for i in range(10)])
+        pending = []
+        for exp_id in self.journal.pending(page=3):
+            pending.append(exp_id)
+            self.journal.remove([seq for seq, _ in self.journal.keys(exp_id)])
+        self.assertEqual(pending, [f"texp{i:02}" for i in range(10)])
+        self.assertEqual(len(self.journal), 0)
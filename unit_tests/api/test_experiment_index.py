@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from api.experiment_index import ExperimentIndex, INDEX_VERSION, output_index
+from utils.metadata.bounds_encoding import decode_bounds
+from utils.metadata.metadata import VariableSpecificMetadata
+
+
+class TestExperimentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def touch(self, name, content):
+        file = os.path.join(self.directory.name, name)
+        with open(file, "wb") as f:
+            f.write(content)
+        return file
+
+    def bounds(self, vertical, time):
+        return [[{"min": str(v * 10 + t), "max": str(v * 10 + t + 1)} for t in range(time)] for v in range(vertical)]
+
+    def test_output_index_success(self):
+        ts_files = [self.touch(f"cfg.texpa.tas.ts.t{t}of2.v{v}of2.png", bytes(t * 10 + v)) for v in (1, 2) for t in (1, 2)]
+        mean_files = [self.touch(f"cfg.texpa.tas.avg.v{v}of2.png", bytes(v)) for v in (1, 2)]
+        vs = VariableSpecificMetadata.build(bounds_matrix_ts=self.bounds(4, 5), bounds_matrix_avg=self.bounds(4, 1))
+        index = output_index(ts_files, mean_files, 2, 2, [vs])
+
+        self.assertEqual((index["ts"]["rows"], index["ts"]["columns"]), (2, 2))
+        chunk = next(c for c in index["ts"]["chunks"] if c["file"] == "cfg.texpa.tas.ts.t2of2.v1of2.png")
+        self.assertEqual((chunk["t"], chunk["v"]), (1, 0))
+        self.assertEqual(chunk["size"], 21)
+        self.assertEqual(chunk["sha1"], hashlib.sha1(bytes(21)).hexdigest())
+        # levels 0 and 1, time steps 3 and 4, the same split as the images
+        bounds = decode_bounds(chunk["bounds"][0])
+        self.assertEqual(bounds.shape, (2, 2, 2))
+        np.testing.assert_array_equal(bounds[:, :, 0], [[3, 4], [13, 14]])
+
+        self.assertEqual((index["mean"]["rows"], index["mean"]["columns"]), (2, 1))
+        chunk = index["mean"]["chunks"][1]
+        self.assertEqual((chunk["file"], chunk["t"], chunk["v"]), ("cfg.texpa.tas.avg.v2of2.png", 0, 1))
+        np.testing.assert_array_equal(decode_bounds(chunk["bounds"][0])[:, :, 1], [[21], [31]])
+
+    def test_put_success(self):
+        file = os.path.join(self.directory.name, "cfg.texpa.index.json")
+        index = ExperimentIndex(file, "texpa")
+        self.assertFalse(index.has("tas"))
+        index.put("tas", [{"rx": None, "ry": None, "outputs": []}])
+        index.put("pr", [{"rx": None, "ry": None, "outputs": []}])
+        index.remove("tas")
+        with open(file) as f:
+            content = json.load(f)
+        self.assertEqual(content["version"], INDEX_VERSION)
+        self.assertEqual(content["exp_id"], "texpa")
+        self.assertEqual(list(content["variables"]), ["pr"])
+        self.assertEqual(os.listdir(self.directory.name), ["cfg.texpa.index.json"])
+        # an index of another version is started again
+        content["version"] = INDEX_VERSION + 1
+        with open(file, "w") as f:
+            json.dump(content, f)
+        self.assertFalse(ExperimentIndex(file, "texpa").has("pr"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from api.archive_db import ArchiveDB
+from api.push_engine import PushEngine
+from utils.metadata.metadata import Metadata
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        server = self.server
+        with server.lock:
+            server.received.append((self.path, json.loads(data), self.headers.get("Cookie")))
+            status = server.statuses.pop(0) if len(server.statuses) > 0 else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPushEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.received = []
+        self.server.statuses = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def engine(self, **kwargs):
+        return PushEngine(url=self.url, api_key="key", backoff=0.01, **kwargs)
+
+    def test_push_success(self):
+        experiments = [(f"texp{i}", lambda i=i: {"request": {"i": i}}) for i in range(10)]
+        self.assertEqual(self.engine().push(experiments), [True] * 10)
+        received = sorted(self.server.received)
+        self.assertEqual(received[0], ("/insert/texp0", {"request": {"i": 0}}, "access_token=key"))
+        self.assertEqual(len(received), 10)
+
+    def test_push_retry_success(self):
+        self.server.statuses = [503, 429]
+        self.assertEqual(self.engine(workers=1).push([("texpa", lambda: {"request": {}})]), [True])
+        self.assertEqual(len(self.server.received), 3)
+        # a refused request is not retried
+        self.server.statuses = [400]
+        self.assertEqual(self.engine(workers=1, compress=False).push([("texpa", lambda: {"request": {}})]), [False])
+        self.assertEqual(len(self.server.received), 4)
+        # nor a request the server may have processed
+        self.server.statuses = [500]
+        self.assertEqual(self.engine(workers=1).push([("texpa", lambda: {"request": {}})]), [False])
+        self.assertEqual(len(self.server.received), 5)
+
+    def test_push_retry_connection_success(self):
+        for error, attempts in ((requests.ConnectionError("refused"), 2), (requests.ReadTimeout("no answer"), 1)):
+            with mock.patch("requests.Session.post", side_effect=error) as post:
+                self.assertEqual(self.engine(workers=1, retries=1).push([("texpa", lambda: {"request": {}})]), [False])
+            # a request which may have reached the server is not sent again
+            self.assertEqual(post.call_count, attempts)
+
+    def test_push_bulk_success(self):
+        experiments = [(f"texp{i}", lambda i=i: {"request": {"i": i}}) for i in range(5)]
+        self.assertEqual(self.engine(bulk=2).push(experiments), [True] * 5)
+        self.assertEqual(len(self.server.received), 3)
+        bodies = sorted((body for _, body, _ in self.server.received), key=lambda body: body["requests"][0]["exp_id"])
+        self.assertEqual(self.server.received[0][0], "/insert")
+        self.assertEqual(bodies[0], {"requests": [{"exp_id": "texp0", "request": {"i": 0}}, {"exp_id": "texp1", "request": {"i": 1}}]})
+
+    def test_archive_db_push_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def legacy(exp_id, body):
+                with open(os.path.join(directory, f"commit_{exp_id}_18_10_2026_12:00.json"), "w") as f:
+                    f.write(json.dumps({"date": "2026-10-18T12:00:00", "exp_id": exp_id, "body": body}))
+            execution = {"config_name": "BRIDGE", "extension": "png", "lossless": True, "rx": 0, "ry": 0}
+            for exp_id in ("texp_a", "texp_b"):
+                legacy(exp_id, {"request": {"table_nimbus_execution": execution, "exp_metadata": {},
+                                            "table_variable": [{"name": "tas"}, {"name": "pr"}]}})
+            legacy("texp_c", {"request": "not an experiment"})
+            archive_db = ArchiveDB(url=self.url, experiments={}, commit_dir=directory, api_key="key", engine=self.engine())
+            self.assertTrue(archive_db.push())
+            received = sorted((path, body) for path, body, _ in self.server.received)
+            self.assertEqual(received[0], ("/insert/texp_a", {"request": {"table_nimbus_execution": execution, "exp_metadata": {},
+                                                                          "table_variable": [{"name": "tas"}, {"name": "pr"}]}}))
+            self.assertEqual([path for path, _ in received], ["/insert/texp_a", "/insert/texp_b"])
+            # the legacy commits are moved to the journal, the unreadable ones are left as they are
+            self.assertEqual(sorted(file for file in os.listdir(directory) if file.endswith(".json")),
+                             ["commit_texp_c_18_10_2026_12:00.json"])
+            self.assertEqual(len(archive_db.journal()), 0)
+
+    def test_archive_db_add_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metadata = Metadata()
+            metadata.extends(threshold=3.0, nan_value_encoding=255, xsize=96, ysize=73)
+            id_metadata = {"exp_id": "texpa", "labels": ["realistic", "bridge"], "metadata": {}}
+
+            def add(archive_db, variable_name, config_name="BRIDGE"):
+                archive_db.add(exp_id="texpa", variable_name=variable_name, list_files_ts=[["texpa.tas.ts.png"]],
+                               list_files_mean=[["texpa.tas.avg.png"]], config_name=config_name, rx=None, ry=None,
+                               extension="png", lossless=True, id_metadata=id_metadata, chunks_t=1, chunks_v=1,
+                               metadata=metadata)
+
+            archive_db = ArchiveDB(url=self.url, experiments={}, commit_dir=directory, api_key="key", engine=self.engine())
+            add(archive_db, "tas")
+            add(archive_db, "pr")
+            # the rows are in the journal as soon as they are added
+            self.assertEqual(len(archive_db.journal()), 2)
+            self.assertEqual(len(archive_db.experiments["texpa"]), 2)
+            archive_db.commit()
+
+            # an interrupted run is resumed from the journal
+            archive_db = ArchiveDB(url=self.url, experiments={}, commit_dir=directory, api_key="key", engine=self.engine())
+            self.assertTrue(archive_db.push())
+            self.assertEqual(len(self.server.received), 1)
+            path, body, _ = self.server.received[0]
+            self.assertEqual(path, "/insert/texpa")
+            self.assertEqual([row["name"] for row in body["request"]["table_variable"]], ["tas", "pr"])
+            self.assertEqual(body["request"]["exp_metadata"]["metadata"], {"realistic": True})
+            self.assertEqual(len(archive_db.journal()), 0)
+
+    def test_archive_db_push_executions_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metadata = Metadata()
+            metadata.extends(threshold=3.0, nan_value_encoding=255, xsize=96, ysize=73)
+            archive_db = ArchiveDB(url=self.url, experiments={}, commit_dir=directory, api_key="key", engine=self.engine())
+            for config_name, variable_name in (("BRIDGE", "tas"), ("OTHER", "tas"), ("BRIDGE", "pr")):
+                archive_db.add(exp_id="texpa", variable_name=variable_name, list_files_ts=[["texpa.tas.ts.png"]],
+                               list_files_mean=[["texpa.tas.avg.png"]], config_name=config_name, rx=None, ry=None,
+                               extension="png", lossless=True, id_metadata={"exp_id": "texpa", "labels": [], "metadata": {}},
+                               chunks_t=1, chunks_v=1, metadata=metadata)
+            # a commit of a previous version of the same row, with the default resolution stored as 0
+            with open(os.path.join(directory, "commit_texpa_18_10_2026_12:00.json"), "w") as f:
+                execution = {"exp_id": "texpa", "config_name": "OTHER", "extension": "png", "lossless": True, "rx": 0, "ry": 0}
+                f.write(json.dumps({"date": "2026-10-18T12:00:00", "exp_id": "texpa", "body": {"request": {
+                    "table_nimbus_execution": execution, "exp_metadata": {}, "table_variable": [{"name": "tas"}]}}}))
+            self.assertTrue(archive_db.push())
+            # a request per config, with the rows of that config only
+            received = sorted((body["request"]["table_nimbus_execution"]["config_name"],
+                               [row["name"] for row in body["request"]["table_variable"]]) for _, body, _ in self.server.received)
+            self.assertEqual(received, [("BRIDGE", ["tas", "pr"]), ("OTHER", ["tas"])])
+            self.assertEqual(len(archive_db.journal()), 0)
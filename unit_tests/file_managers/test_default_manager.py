@@ -1,5 +1,182 @@
+import functools
+import os
+import tempfile
 import unittest
+from unittest import mock
+import numpy as np
+from netCDF4 import Dataset
+from file_managers.default_manager import FileManager, strip_valid_range
+from file_managers.output_folder import OutputFolder
+from file_managers.scratch import Scratch
+from supported_variables.utils.utils import default_preprocessing, default_processing
+from utils.variables.variable import Variable, memoize
+
+
+def custom_preprocessing(inputs, output_directory):
+    return inputs
 
 
 class TestDefaultManager(unittest.TestCase):
-    pass
\ No newline at end of file
+
+    def setUp(self):
+        self.tas = Variable(name="tas", realm="a", preprocess=default_preprocessing, process=default_processing)
+        self.pr = Variable(name="pr", realm="a", preprocess=default_preprocessing, process=default_processing)
+        self.clt = Variable(name="clt", realm="a", preprocess=default_preprocessing, process=default_processing)
+        self.winds = Variable(name="winds", realm="a", preprocess=custom_preprocessing, process=default_processing)
+        monthly = {f"texpaa.pdcl{m}.nc" for m in ("jan", "feb", "mar")}
+        io_bind = {
+            "texpa": {
+                self.tas: {"binder": {"temp_mm_1_5m": set(monthly)}, "folder": None},
+                self.pr: {"binder": {"precip_mm_srf": set(sorted(monthly, reverse=True))}, "folder": None},
+                self.clt: {"binder": {"totCloud_mm_ua": "texpaa.pdclann.nc"}, "folder": None},
+                self.winds: {"binder": {"u_mm_p": set(monthly), "v_mm_p": set(monthly)}, "folder": None},
+            },
+            "texpb": {
+                self.tas: {"binder": {"temp_mm_1_5m": {"texpba.pdcljan.nc"}}, "folder": None},
+            },
+        }
+        self.file_manager = FileManager(main_folder=None, io_bind=io_bind, black_list={"texpa": {}, "texpb": {}})
+
+    def test_clusterize_success(self):
+        self.file_manager.clusterize()
+        monthly = tuple(sorted(f"texpaa.pdcl{m}.nc" for m in ("jan", "feb", "mar")))
+        # only the variables with the default preprocessing share the pass over the files
+        self.assertEqual(self.file_manager.cluster["texpa"], {monthly: ["temp_mm_1_5m", "precip_mm_srf"]})
+        self.assertEqual(self.file_manager.cluster["texpb"], {})
+        self.assertEqual(self.file_manager.file_cluster_binder, {"texpa": {}, "texpb": {}})
+
+    def test_readers_success(self):
+        self.file_manager.clusterize()
+        # the merged files are read by every variable, the preprocessed ones by the cluster only
+        self.assertEqual(self.file_manager.readers("texpa", self.tas),
+                         {("texpa", "tas"), ("texpa", "pr"), ("texpa", "winds")})
+        self.assertEqual(self.file_manager.readers("texpa", self.tas, preprocessed=True),
+                         {("texpa", "tas"), ("texpa", "pr")})
+        self.assertEqual(self.file_manager.readers("texpa", self.winds, preprocessed=True), {("texpa", "winds")})
+        self.assertEqual(self.file_manager.readers("texpa", self.clt, preprocessed=True), {("texpa", "clt")})
+
+    def test_memoize_success(self):
+        calls = []
+
+        @memoize
+        def preprocess(inputs, variable, tmp_directory, cluster):
+            calls.append(inputs)
+            return [(f"{file}.out", var) for file, var in inputs]
+
+        cluster = {"tas.nc": ("merged.nc", ["tas", "pr"]), "pr.nc": ("merged.nc", ["tas", "pr"])}
+        self.assertEqual(preprocess([("tas.nc", "tas")], self.tas, "tmp", cluster), [("tas.nc.out", "tas")])
+        self.assertEqual(preprocess([("pr.nc", "pr"), ("clt.nc", "clt")], self.pr, "tmp", cluster),
+                         [("tas.nc.out", "pr"), ("clt.nc.out", "clt")])
+        self.assertEqual(calls, [[("tas.nc", "tas,pr")], [("clt.nc", "clt")]])
+
+    def test_strip_valid_range_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def write(name, **attributes):
+                file = os.path.join(directory, name)
+                with Dataset(file, "w") as dataset:
+                    dataset.createDimension("t", 3)
+                    variable = dataset.createVariable("tas", "f4", ("t",))
+                    variable.setncatts(attributes)
+                    variable[:] = np.array([-10, 0, 10], dtype=np.float32)
+                return file
+
+            file = write("valid.nc", valid_min=-1.0, valid_max=1.0, units="K")
+            tmp_path = os.path.join(directory, "valid.tmp.nc")
+            mtime = os.stat(file).st_mtime_ns
+            # a file that can be written is merged as it is, its attributes are hidden during the merge
+            with strip_valid_range([file], [tmp_path]) as stripped_files:
+                self.assertEqual(stripped_files, [file])
+                self.assertFalse(os.path.isfile(tmp_path))
+                with Dataset(file, "r") as dataset:
+                    self.assertEqual(sorted(dataset["tas"].ncattrs()), ["VALID_MAX", "VALID_MIN", "units"])
+                    self.assertTrue(np.array_equal(dataset["tas"][:], [-10, 0, 10]))
+            with Dataset(file, "r") as dataset:
+                self.assertEqual(sorted(dataset["tas"].ncattrs()), ["units", "valid_max", "valid_min"])
+            self.assertEqual(os.stat(file).st_mtime_ns, mtime)
+
+            # restored when the merge fails
+            with self.assertRaises(RuntimeError):
+                with strip_valid_range([file], [tmp_path]):
+                    raise RuntimeError()
+            with Dataset(file, "r") as dataset:
+                self.assertEqual(sorted(dataset["tas"].ncattrs()), ["units", "valid_max", "valid_min"])
+
+            # a file that cannot be written is copied and the attributes are deleted in the copy
+            with mock.patch("file_managers.default_manager.access", return_value=False):
+                with strip_valid_range([file], [tmp_path]) as stripped_files:
+                    self.assertEqual(stripped_files, [tmp_path])
+                    with Dataset(tmp_path, "r") as dataset:
+                        self.assertEqual(dataset["tas"].ncattrs(), ["units"])
+                        self.assertTrue(np.array_equal(dataset["tas"][:], [-10, 0, 10]))
+                    with Dataset(file, "r") as dataset:
+                        self.assertEqual(sorted(dataset["tas"].ncattrs()), ["units", "valid_max", "valid_min"])
+            self.assertFalse(os.path.isfile(tmp_path))
+
+            # nothing to do when there is nothing to strip
+            file = write("plain.nc", units="K")
+            with strip_valid_range([file], [os.path.join(directory, "plain.tmp.nc")]) as stripped_files:
+                self.assertEqual(stripped_files, [file])
+            self.assertFalse(os.path.isfile(os.path.join(directory, "plain.tmp.nc")))
+
+    def test_produced_release_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            main_folder = OutputFolder(main_dir=directory, out_dir=os.path.join(directory, "output"), tmp_dir=os.path.join(directory, "tmp"))
+            os.mkdir(main_folder.out_dir)
+            os.mkdir(main_folder.tmp_dir)
+            input_file = os.path.join(directory, "texpaa.pdclann.nc")
+            with open(input_file, "wb") as f:
+                f.write(b"x")
+            io_bind = {"texpa": {self.tas: {"binder": {"temp_mm_1_5m": input_file}, "folder": main_folder.append("texpa")}}}
+            file_manager = FileManager(main_folder=main_folder, io_bind=io_bind, black_list={"texpa": {}})
+
+            with file_manager.workspace("texpa"):
+                folder = io_bind["texpa"][self.tas]["folder"]
+                files = {}
+                for resolution in ((1.0, 1.0), (2.0, 2.0)):
+                    # the resized and level selected files made by the load of the resolution
+                    produced = functools.partial(file_manager.produced, ("texpa", self.tas.name, resolution))
+                    resized = folder.tmp_nc_file(f"texpaa.pdclann.rx{resolution[0]}.ry{resolution[1]}.nc")
+                    selected = resized.replace(".nc", ".zr.nc")
+                    for file in (resized, selected):
+                        with open(file, "wb") as f:
+                            f.write(b"x")
+                        produced(file)
+                    files[resolution] = (resized, selected)
+                # the input files are never registered
+                file_manager.produced(("texpa", self.tas.name, (1.0, 1.0)), input_file)
+
+                file_manager.release("texpa", self.tas.name, (1.0, 1.0))
+                self.assertFalse(any(os.path.isfile(file) for file in files[(1.0, 1.0)]))
+                self.assertTrue(all(os.path.isfile(file) for file in files[(2.0, 2.0)]))
+                self.assertTrue(os.path.isfile(input_file))
+                file_manager.release("texpa", self.tas.name, (2.0, 2.0))
+                self.assertFalse(any(os.path.isfile(file) for file in files[(2.0, 2.0)]))
+
+    def test_workspace_success(self):
+        with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as memory:
+            main_folder = OutputFolder(main_dir=directory, out_dir=os.path.join(directory, "output"), tmp_dir=os.path.join(directory, "tmp"))
+            os.mkdir(main_folder.out_dir)
+            os.mkdir(main_folder.tmp_dir)
+            input_file = os.path.join(directory, "texpaa.pdclann.nc")
+            with open(input_file, "wb") as f:
+                f.write(b"x" * 1000)
+            io_bind = {"texpa": {self.tas: {"binder": {"temp_mm_1_5m": input_file}, "folder": main_folder.append("texpa")}}}
+            file_manager = FileManager(main_folder=main_folder, io_bind=io_bind, black_list={"texpa": {}})
+
+            # without scratch the intermediate files stay on disk
+            with file_manager.workspace("texpa") as tmp:
+                self.assertEqual(tmp, os.path.join(main_folder.tmp_dir, "texpa"))
+                self.assertTrue(os.path.isdir(io_bind["texpa"][self.tas]["folder"].tmp_nc()))
+            self.assertFalse(os.path.isdir(tmp))
+
+            file_manager.scratch = Scratch.build(memory, 2000)
+            with file_manager.workspace("texpa") as tmp:
+                self.assertEqual(tmp, os.path.join(file_manager.scratch.directory, "texpa"))
+                with open(io_bind["texpa"][self.tas]["folder"].tmp_nc_file("texpa.out.nc"), "wb") as f:
+                    f.write(b"x" * 1500)
+                # the next experiment does not fit in the budget anymore
+                self.assertFalse(file_manager.scratch.has_room(1000))
+            self.assertFalse(os.path.isdir(tmp))
+            self.assertTrue(file_manager.scratch.has_room(1000))
+            file_manager.scratch.remove()
+            self.assertIsNone(Scratch.build(memory, 0))
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from file_managers.intermediates import Intermediates, unique_size
+
+
+class TestIntermediates(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.intermediates = Intermediates(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, size=100):
+        file = os.path.join(self.directory.name, name)
+        with open(file, "wb") as f:
+            f.write(b"x" * size)
+        return file
+
+    def test_release_success(self):
+        merged = self.write("texpa.tas.nc")
+        # the hard link of a merged file made by the memoize of the file manager
+        linked = os.path.join(self.directory.name, "texpa.pr.nc")
+        os.link(merged, linked)
+        self.intermediates.add(merged, {("texpa", "tas"), ("texpa", "pr")})
+        self.intermediates.add(linked, {("texpa", "pr")})
+        preprocessed = self.write("texpa.tas.out.nc")
+        self.intermediates.add(preprocessed, {("texpa", "tas")})
+
+        # the files nobody registered are left to the removal of the directory
+        resized = self.write("texpa.tas.out.rx1.0.ry1.0.nc")
+        self.intermediates.release(("texpa", "tas", (1.0, 1.0)))
+        self.assertTrue(os.path.isfile(resized))
+        self.assertTrue(os.path.isfile(preprocessed))
+
+        self.intermediates.release(("texpa", "tas"))
+        self.assertFalse(os.path.isfile(preprocessed))
+        self.assertTrue(os.path.isfile(merged))
+        self.intermediates.release(("texpa", "pr"))
+        self.assertFalse(os.path.isfile(merged))
+        self.assertFalse(os.path.isfile(linked))
+        self.assertTrue(os.path.isfile(resized))
+        # the hard link is counted once
+        self.assertEqual(self.intermediates.peak, 300)
+
+    def test_add_released_success(self):
+        self.intermediates.release(("texpa", "tas"))
+        merged = self.write("texpa.pr.nc")
+        self.intermediates.add(merged, {("texpa", "tas"), ("texpa", "pr")})
+        self.assertTrue(os.path.isfile(merged))
+        self.intermediates.release(("texpa", "pr"))
+        self.assertFalse(os.path.isfile(merged))
+
+    def test_add_input_success(self):
+        with tempfile.TemporaryDirectory() as inputs:
+            file = os.path.join(inputs, "texpaa.pdclann.nc")
+            with open(file, "wb") as f:
+                f.write(b"x")
+            self.intermediates.add(file, set())
+            self.intermediates.release(("texpa", "tas"))
+            self.assertTrue(os.path.isfile(file))
+            self.assertEqual(unique_size(inputs), 1)
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+from utils.converters.providers.default_provider import *
+from utils.converters.providers.png_provider import PNG_Provider
+from utils.converters.providers.webp_provider import WEBP_Provider
+from utils.converters.utils.utils import EncodingProfile
+
+
+def reduce_per_tile(channels, mode):
+    shape = channels[0].shape
+    image = np.zeros((shape.vertical * shape.latitude, shape.time * shape.longitude, mode.value))
+    latitude,longitude = shape.latitude,shape.longitude
+    for vertical in range(shape.vertical):
+        for time in range(shape.time):
+            for index,channel in enumerate(channels):
+                image[vertical*latitude:(vertical+1)*latitude ,
+                    time*longitude:(time+1)*longitude , index ] = channel.data[vertical,time,:,:]
+    return np.int8(np.squeeze(image)).view(np.uint8)
+
+
+class TestImageProvider(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        shape = Shape(vertical = 3, time = 5, latitude = 4, longitude = 6)
+        self.channels = [Channel(metadata = None,
+                                 data = rng.integers(0, 256, size = shape.tuple(), dtype = np.uint8),
+                                 shape = shape) for _ in range(3)]
+        return super().setUp()
+
+    def test_reduce_success(self):
+        for n in (1,2,3):
+            channels = self.channels[:n]
+            mode = Mode.get(channels)
+            image = ImageProvider.reduce(channels, mode, np.uint8)
+            self.assertEqual(image.dtype, np.uint8)
+            self.assertTrue(np.array_equal(image, reduce_per_tile(channels, mode)))
+
+    def test_save_png_success(self):
+        provider = PNG_Provider.build(mode = Mode.RGB, lossless = True)
+        metadata = Metadata()
+        with tempfile.TemporaryDirectory() as directory:
+            file = provider.save(os.path.join(directory, "test"), self.channels, metadata)
+            with Image.open(file) as image:
+                decoded = np.asarray(image)
+        self.assertTrue(np.array_equal(decoded, reduce_per_tile(self.channels, Mode.RGB)))
+
+    def test_save_profiles_success(self):
+        metadata = Metadata()
+        expected = reduce_per_tile(self.channels, Mode.RGB)
+        for build in (PNG_Provider.build, WEBP_Provider.build):
+            sizes = {}
+            for profile in EncodingProfile:
+                provider = build(mode = Mode.RGB, lossless = True, profile = profile)
+                with tempfile.TemporaryDirectory() as directory:
+                    file = provider.save(os.path.join(directory, "test"), self.channels, metadata)
+                    sizes[profile] = os.path.getsize(file)
+                    with Image.open(file) as image:
+                        decoded = np.asarray(image)
+                self.assertTrue(np.array_equal(decoded, expected))
+            if build is PNG_Provider.build:
+                # smallest keeps the smallest of the encodings it tries, fast is one of them
+                self.assertLessEqual(sizes[EncodingProfile.SMALLEST], sizes[EncodingProfile.FAST])
+
+    def test_save_balanced_as_default_success(self):
+        metadata = Metadata()
+        for build,lossless in ((PNG_Provider.build,True),(WEBP_Provider.build,True),(WEBP_Provider.build,False)):
+            images = []
+            for profile in (None, EncodingProfile.BALANCED):
+                provider = build(mode = Mode.RGB, lossless = lossless, profile = profile)
+                with tempfile.TemporaryDirectory() as directory:
+                    file = provider.save(os.path.join(directory, "test"), self.channels, metadata)
+                    with open(file, "rb") as image:
+                        images.append(image.read())
+            self.assertEqual(images[0], images[1])
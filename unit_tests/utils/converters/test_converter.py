@@ -0,0 +1,147 @@
+import unittest
+import json
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+from utils.converters.converter import *
+from utils.metadata.bounds_encoding import decode_bounds
+
+
+class LazyProxy:
+    """time steps indexed by the converter, like a TimeChunks input"""
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.reads = []
+    
+    def reshape(self, shape, order = "C"):
+        assert(tuple(shape) == self.shape)
+        return self
+    
+    def __getitem__(self, index):
+        time_steps = index[1].indices(self.shape[1])
+        self.reads.append(time_steps[1] - time_steps[0])
+        return self.data[index]
+
+
+class TestConverter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        data = rng.normal(10, 5, size = (4,30,9,12)).astype(np.float32)
+        data[0,0,::2,:] = np.nan
+        data[1,17,:,:] = np.nan
+        data[2,25,:,:] = 4.5
+        self.inputs = [(np.ma.masked_invalid(data * (i + 1)), VariableSpecificMetadata()) for i in range(2)]
+        return super().setUp()
+
+    def convert(self, directory, streaming, chunks_t, chunks_v, bounds_engine = BoundsEngine.PARTITION, encoders = 1, name = None,
+                bounds_encoding = BoundsEncoding.JSON):
+        inputs = [(data, VariableSpecificMetadata()) for data,_ in self.inputs]
+        converter = Converter.build(inputs = inputs,
+                                    extension = Extension.PNG,
+                                    nan_encoding = 255,
+                                    threshold = 3.0,
+                                    bounds_engine = bounds_engine,
+                                    filename = os.path.join(directory, name or ("streaming" if streaming else "memory")),
+                                    chunks_t = chunks_t,
+                                    chunks_v = chunks_v,
+                                    metadata = Metadata(),
+                                    lossless = True,
+                                    streaming = streaming,
+                                    encoders = encoders,
+                                    bounds_encoding = bounds_encoding)
+        ts_files,mean_files = converter.exec()
+        return converter,ts_files,mean_files
+
+    def test_streaming_same_as_memory_success(self):
+        for chunks_t,chunks_v,bounds_engine in ((0,0,BoundsEngine.PARTITION),(4,0,BoundsEngine.PARTITION),
+                                                (0,2,BoundsEngine.PARTITION),(0.5,0.5,BoundsEngine.EXACT),
+                                                (3,2,BoundsEngine.PARTITION)):
+            with tempfile.TemporaryDirectory() as directory:
+                memory,memory_ts,memory_mean = self.convert(directory, False, chunks_t, chunks_v, bounds_engine)
+                streaming,streaming_ts,streaming_mean = self.convert(directory, True, chunks_t, chunks_v, bounds_engine)
+                self.assertEqual([os.path.basename(f).replace("memory","") for f in memory_ts],
+                                 [os.path.basename(f).replace("streaming","") for f in streaming_ts])
+                for memory_file,streaming_file in zip(memory_ts + memory_mean, streaming_ts + streaming_mean):
+                    with Image.open(memory_file) as memory_image, Image.open(streaming_file) as streaming_image:
+                        self.assertTrue(np.array_equal(np.asarray(memory_image), np.asarray(streaming_image)))
+                for memory_channel,streaming_channel in zip(memory.channels, streaming.channels):
+                    self.assertEqual(memory_channel.metadata.bounds_matrix_ts, streaming_channel.metadata.bounds_matrix_ts)
+                    self.assertEqual(memory_channel.metadata.bounds_matrix_avg, streaming_channel.metadata.bounds_matrix_avg)
+
+    def test_streaming_lazy_inputs_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            _,memory_ts,memory_mean = self.convert(directory, False, 4, 0)
+            proxies = [LazyProxy(data) for data,_ in self.inputs]
+            converter = Converter.build(inputs = [(proxy, VariableSpecificMetadata()) for proxy in proxies],
+                                        extension = Extension.PNG,
+                                        nan_encoding = 255,
+                                        threshold = 3.0,
+                                        bounds_engine = BoundsEngine.PARTITION,
+                                        filename = os.path.join(directory, "streaming"),
+                                        chunks_t = 4,
+                                        chunks_v = 0,
+                                        metadata = Metadata(),
+                                        lossless = True,
+                                        streaming = True,
+                                        block_size = 5)
+            streaming_ts,streaming_mean = converter.exec()
+            for proxy in proxies:
+                # the data is read only by blocks, once for the bounds and once for the conversion
+                self.assertTrue(all(0 < steps <= 5 for steps in proxy.reads))
+                self.assertEqual(sum(proxy.reads), 2 * 30)
+            for memory_file,streaming_file in zip(memory_ts + memory_mean, streaming_ts + streaming_mean):
+                with Image.open(memory_file) as memory_image, Image.open(streaming_file) as streaming_image:
+                    self.assertTrue(np.array_equal(np.asarray(memory_image), np.asarray(streaming_image)))
+
+    def test_slices_both_axes_success(self):
+        channel,_ = Converter.resolve_channels(self.inputs)
+        slices = channel[0].slices(3,2)
+        self.assertEqual([suffixe for _,suffixe in slices],
+                         [f".t{t}of3.v{v}of2" for t in range(1,4) for v in range(1,3)])
+        for sliced,suffixe in slices:
+            t,v = int(suffixe[2]) - 1,int(suffixe[8]) - 1
+            self.assertTrue(np.array_equal(np.ma.getdata(sliced.data),np.ma.getdata(channel[0].data)[v*2:(v+1)*2,t*10:(t+1)*10],equal_nan=True))
+
+    def test_mean_slices_success(self):
+        for streaming in (False,True):
+            with tempfile.TemporaryDirectory() as directory:
+                _,_,mean_files = self.convert(directory, streaming, 0, 2)
+                # the levels of the first slice only, converted on their own
+                inputs = self.inputs
+                self.inputs = [(data[:2], metadata) for data,metadata in inputs]
+                _,_,expected_files = self.convert(directory, streaming, 0, 0, name = "expected")
+                self.inputs = inputs
+                with Image.open(mean_files[0]) as image, Image.open(expected_files[0]) as expected:
+                    self.assertTrue(np.array_equal(np.asarray(image), np.asarray(expected)))
+
+    def test_encoders_same_as_single_encoder_success(self):
+        for streaming in (False,True):
+            with tempfile.TemporaryDirectory() as directory:
+                _,single_ts,single_mean = self.convert(directory, streaming, 5, 0, name = "single")
+                _,pool_ts,pool_mean = self.convert(directory, streaming, 5, 0, encoders = 4, name = "pool")
+                self.assertEqual(len(single_ts), 5)
+                self.assertEqual([f.replace("single","pool") for f in single_ts + single_mean], pool_ts + pool_mean)
+                for single_file,pool_file in zip(single_ts + single_mean, pool_ts + pool_mean):
+                    with Image.open(single_file) as single_image, Image.open(pool_file) as pool_image:
+                        self.assertTrue(np.array_equal(np.asarray(single_image), np.asarray(pool_image)))
+
+    def test_binary_bounds_same_as_json_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            _,json_ts,json_mean = self.convert(directory, False, 0, 0, name = "json")
+            _,binary_ts,binary_mean = self.convert(directory, False, 0, 0, name = "binary", bounds_encoding = BoundsEncoding.BINARY)
+            for json_file,binary_file in zip(json_ts + json_mean, binary_ts + binary_mean):
+                with Image.open(json_file) as json_image, Image.open(binary_file) as binary_image:
+                    self.assertTrue(np.array_equal(np.asarray(json_image), np.asarray(binary_image)))
+                    json_variables = json.loads(json_image.text["variables"])
+                    binary_variables = json.loads(binary_image.text["variables"])
+                for json_variable,binary_variable in zip(json_variables, binary_variables):
+                    self.assertEqual(binary_variable["bounds_encoding"], "binary")
+                    for key in ("bounds_matrix_ts","bounds_matrix_avg"):
+                        self.assertEqual(binary_variable[key]["version"], 1)
+                        expected = decode_bounds(json_variable[key])
+                        self.assertEqual(decode_bounds(binary_variable[key]).shape, expected.shape)
+                        self.assertTrue(np.array_equal(decode_bounds(binary_variable[key]), expected))
+                self.assertLess(os.path.getsize(binary_file), os.path.getsize(json_file))
@@ -0,0 +1,108 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+from utils.converters.providers.png_provider import PNG_Provider
+from utils.converters.utils.utils import Mode
+from utils.metadata.metadata import Metadata
+from utils.converters.utils.channel import *
+from utils.converters.utils.utils import bounds, clean, normalize
+
+
+def convert_per_tile(data, nan_encoding, threshold):
+    converted_data = np.zeros(data.shape)
+    bounds_matrix = np.empty(shape = data.shape[:2], dtype = dict)
+    for vertical in range(data.shape[0]):
+        for time in range(data.shape[1]):
+            min,max = bounds(arr=data[vertical,time,:,:],threshold=threshold)
+            normalized = normalize(input=data[vertical,time,:,:],min = min, max = max )
+            if nan_encoding == 0 :
+                normalized = normalized * 254 + 1
+            else :
+                normalized = normalized * 254
+            converted_data[vertical,time,:,:] = normalized
+            bounds_matrix[vertical,time] = {"min" : str(min), "max" : str(max)}
+    converted_data = clean(converted_data,nan_encoding=nan_encoding)
+    return np.int8(converted_data).view(np.uint8),bounds_matrix.tolist()
+
+
+class TestChannel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        data = rng.normal(10, 5, size = (3,4,9,12)).astype(np.float32)
+        data[0,0,::2,:] = np.nan
+        data[0,1,:,:] = np.nan
+        data[1,2,:,:] = 4.5
+        data[2,3,0,0] = 1e6
+        data[2,2,:,:3] = np.nan
+        # netCDF4 returns masked arrays
+        self.data = np.ma.masked_invalid(data)
+        return super().setUp()
+
+    def build(self, data) -> Channel:
+        return Channel(metadata = VariableSpecificMetadata(),
+                       data = data,
+                       shape = Shape.build(data.shape))
+
+    def test_convert_same_as_per_tile_success(self):
+        for nan_encoding in (0,255):
+            for threshold in (None,3.0,0.5):
+                converted = self.build(self.data).convert(nan_encoding = nan_encoding, threshold = threshold, legacy_quantization = True)
+                expected,bounds_matrix = convert_per_tile(self.data, nan_encoding, threshold)
+                self.assertEqual(converted.data.dtype, np.uint8)
+                self.assertTrue(np.array_equal(converted.data, expected))
+                self.assertEqual(converted.metadata.bounds_matrix_ts, bounds_matrix)
+
+    def test_convert_float64_same_as_per_tile_success(self):
+        data = np.ma.masked_invalid(self.data.filled(np.nan).astype(np.float64))
+        converted = self.build(data).convert(nan_encoding = 255, threshold = 3.0, legacy_quantization = True)
+        expected,bounds_matrix = convert_per_tile(data, 255, 3.0)
+        self.assertTrue(np.array_equal(converted.data, expected))
+        self.assertEqual(converted.metadata.bounds_matrix_ts, bounds_matrix)
+
+    def test_convert_masked_success(self):
+        data = np.ma.masked_greater(self.data, 15)
+        converted = self.build(data).convert(nan_encoding = 255, threshold = 3.0, legacy_quantization = True)
+        expected,bounds_matrix = convert_per_tile(np.ma.masked_invalid(data.filled(np.nan)), 255, 3.0)
+        self.assertTrue(np.array_equal(converted.data, expected))
+        self.assertEqual(converted.metadata.bounds_matrix_ts, bounds_matrix)
+
+    def test_convert_exact_same_as_partition_success(self):
+        exact = self.build(self.data).convert(nan_encoding = 255, threshold = 3.0, bounds_engine = BoundsEngine.EXACT)
+        partition = self.build(self.data).convert(nan_encoding = 255, threshold = 3.0, bounds_engine = BoundsEngine.PARTITION)
+        self.assertTrue(np.array_equal(exact.data, partition.data))
+        self.assertEqual(exact.metadata.bounds_matrix_ts, partition.metadata.bounds_matrix_ts)
+
+    def test_convert_rounded_decoded_success(self):
+        for nan_encoding in (0,255):
+            converted = self.build(self.data).convert(nan_encoding = nan_encoding, threshold = 3.0)
+            legacy = self.build(self.data).convert(nan_encoding = nan_encoding, threshold = 3.0, legacy_quantization = True)
+            self.assertEqual(converted.data.dtype, np.uint8)
+            self.assertEqual(converted.metadata.bounds_matrix_ts, legacy.metadata.bounds_matrix_ts)
+            # the pixels are decoded from a png like the clients of the archive
+            provider = PNG_Provider.build(mode = Mode.L, lossless = True)
+            with tempfile.TemporaryDirectory() as directory:
+                file = provider.save(os.path.join(directory, "test"), [converted], Metadata())
+                with Image.open(file) as image:
+                    decoded = np.asarray(image).reshape(3,9,4,12).transpose(0,2,1,3)
+            self.assertTrue(np.array_equal(decoded, converted.data))
+            
+            data = self.data.filled(np.nan).astype(np.float64)
+            nan = np.isnan(data)
+            self.assertTrue((decoded[nan] == nan_encoding).all())
+            self.assertTrue((np.abs(decoded.astype(int) - legacy.data.astype(int))[~nan] <= 1).all())
+            offset = 1 if nan_encoding == 0 else 0
+            for vertical in range(3):
+                for time in range(4):
+                    bounds = converted.metadata.bounds_matrix_ts[vertical][time]
+                    min,max = float(bounds["min"]),float(bounds["max"])
+                    tile,valid = data[vertical,time],~nan[vertical,time]
+                    inside = valid & (tile >= min) & (tile <= max)
+                    if min == max or not inside.any():
+                        continue
+                    values = min + (decoded[vertical,time].astype(np.float64) - offset)/254*(max - min)
+                    # rounding : the decoded values are at most half a step away
+                    error = np.abs(values - tile)[inside]
+                    self.assertTrue((error <= (max - min)/254/2 * (1 + 1e-3)).all())
@@ -1,4 +1,6 @@
 from typing import List
+import numpy as np
+from netCDF4 import Dataset
 from utils.variables.info import *
 class MockInfo:
     
@@ -25,6 +27,34 @@ class MockInfo:
         "6750-06-01 00:00:00"]
         return to_parse, 2, 3
 
+    @staticmethod
+    def info_data_dataset(file:str):
+        # netCDF4 file described by info_data
+        with Dataset(file, "w") as dataset:
+            dataset.createDimension("t", None)
+            coordinates = {
+                "longitude" : (np.arange(96) * 3.75 - 180, "degrees_east"),
+                "latitude" : (np.arange(73) * 2.5 - 90, "degrees_north"),
+                "longitude_1" : (np.arange(96) * 3.75 - 178.125, "degrees_east"),
+                "latitude_1" : (np.arange(72) * 2.5 - 88.75, "degrees_north"),
+                "depth" : (np.geomspace(10, 4885, 19), "m"),
+                "unspecified" : ([-1], "unspecified"),
+                "depth_1" : (np.geomspace(5, 5192.65, 20), "m"),
+            }
+            for name,(values,units) in coordinates.items():
+                dataset.createDimension(name, len(values))
+                variable = dataset.createVariable(name, "f4", (name,))
+                variable.units = units
+                variable[:] = values
+            time = dataset.createVariable("t", "f4", ("t",))
+            time.units = "days since 1850-12-00 00:00:00"
+            time.calendar = "360_day"
+            time[:] = [1763821]
+            dataset.createVariable("temp", "f4", ("t", "depth", "latitude", "longitude"))
+            dataset.createVariable("mixed", "f4", ("t", "unspecified", "latitude", "longitude"))
+            dataset.createVariable("salinity", "f4", ("t", "depth_1", "latitude_1", "longitude_1"))
+        return file
+
     @staticmethod
     def info_2_data():
         to_parse = [
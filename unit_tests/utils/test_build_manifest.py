@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from utils.build_manifest import *
+from utils.config import HyperParametersConfig
+
+
+def processing(inputs):
+    return inputs
+
+
+class TestBuildManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, "data.nc")
+        with open(self.input, "w") as f:
+            f.write("data")
+        self.image = os.path.join(self.directory.name, "tas.ts.png")
+        with open(self.image, "w") as f:
+            f.write("image")
+        self.row = dict(exp_id = "texpa", variable_name = "tas",
+                        list_files_ts = [[self.image]], list_files_mean = [[self.image]])
+        self.output = os.path.join(self.directory.name, "config.texpa.tas")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_success(self):
+        conversion = fingerprint(files_fingerprint([self.input]), "config")
+        manifest = BuildManifest(os.path.join(self.directory.name, "build_manifest.db"))
+        self.assertIsNone(manifest.get("texpa", "tas", "config", self.output, conversion))
+        manifest.put("texpa", "tas", "config", self.output, conversion, self.row)
+        manifest.close()
+        # the entries persist between runs
+        manifest = BuildManifest(os.path.join(self.directory.name, "build_manifest.db"))
+        self.assertEqual(manifest.get("texpa", "tas", "config", self.output, conversion), self.row)
+        self.assertIsNone(manifest.get("texpa", "pr", "config", self.output, conversion))
+        # another config or another output directory has its own entry
+        other = os.path.join(self.directory.name, "other", "config.texpa.tas")
+        self.assertIsNone(manifest.get("texpa", "tas", "other", self.output, conversion))
+        manifest.put("texpa", "tas", "config", other, conversion, self.row)
+        self.assertEqual(manifest.get("texpa", "tas", "config", self.output, conversion), self.row)
+        manifest.remove("texpa", "tas", "config", self.output)
+        self.assertIsNone(manifest.get("texpa", "tas", "config", self.output, conversion))
+        self.assertEqual(manifest.get("texpa", "tas", "config", other, conversion), self.row)
+        manifest.close()
+
+    def test_get_changed_failure(self):
+        conversion = fingerprint(files_fingerprint([self.input]), "config")
+        manifest = BuildManifest(os.path.join(self.directory.name, "build_manifest.db"))
+        manifest.put("texpa", "tas", "config", self.output, conversion, self.row)
+        self.assertNotEqual(fingerprint(files_fingerprint([self.input]), "other config"), conversion)
+        with open(self.input, "a") as f:
+            f.write("more data")
+        self.assertNotEqual(fingerprint(files_fingerprint([self.input]), "config"), conversion)
+        os.remove(self.image)
+        self.assertIsNone(manifest.get("texpa", "tas", "config", self.output, conversion))
+        manifest.close()
+
+    def test_fingerprints_success(self):
+        self.assertEqual(files_fingerprint([self.input, self.input]), files_fingerprint([self.input]))
+        name,source = function_fingerprint(processing)
+        self.assertEqual(name, f"{__name__}.processing")
+        self.assertEqual(len(source), 40)
+        # the helpers of the module are part of the fingerprint
+        self.assertEqual(function_fingerprint(TestBuildManifest.setUp)[1], source)
+        hp = HyperParametersConfig.build()
+        self.assertEqual(hyper_parameters_fingerprint(hp), hyper_parameters_fingerprint(HyperParametersConfig.build(encoders = 4)))
+        self.assertNotEqual(hyper_parameters_fingerprint(hp), hyper_parameters_fingerprint(HyperParametersConfig.build(nan_encoding = 0)))
@@ -54,6 +54,30 @@ class TestConfig(unittest.TestCase):
         hp = HyperParametersConfig.build(preprocessing = "NEW")
         assert(hp.preprocessing == "NEW")
         
+    def test_HyperParametersConfig_bounds_engine_success(self):
+        hp = HyperParametersConfig.build(bounds_engine = "exact")
+        assert(hp.bounds_engine == BoundsEngine.EXACT)
+        hp = HyperParametersConfig.build(bounds_engine = "unknown")
+        assert(hp.bounds_engine == BoundsEngine.PARTITION)
+
+    def test_HyperParametersConfig_info_backend_success(self):
+        hp = HyperParametersConfig.build(info_backend = "netcdf")
+        assert(hp.info_backend == InfoBackend.NETCDF)
+        hp = HyperParametersConfig.build(info_backend = "unknown")
+        assert(hp.info_backend == InfoBackend.CDO)
+    
+    def test_HyperParametersConfig_encoding_profile_success(self):
+        hp = HyperParametersConfig.build(encoding_profile = "fast")
+        assert(hp.encoding_profile == EncodingProfile.FAST)
+        hp = HyperParametersConfig.build(encoding_profile = "unknown")
+        assert(hp.encoding_profile is None)
+    
+    def test_HyperParametersConfig_vertical_engine_success(self):
+        hp = HyperParametersConfig.build(vertical_engine = "numpy")
+        assert(hp.vertical_engine == VerticalEngine.NUMPY)
+        hp = HyperParametersConfig.build(vertical_engine = "unknown")
+        assert(hp.vertical_engine == VerticalEngine.CDO)
+        
     def test_get_hp_success(self):
         hp = HyperParametersConfig.build(preprocessing = "NEW")
         config = Config(name="",
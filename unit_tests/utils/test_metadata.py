@@ -1,5 +1,7 @@
 import unittest
+import numpy as np
 from utils.metadata.metadata import *
+from utils.metadata.bounds_encoding import *
 from unit_tests.utils.mock_metadata import MockMetadata
 
 class TestMetadata(unittest.TestCase):
@@ -59,4 +61,20 @@ class TestMetadata(unittest.TestCase):
         self.data.metadata.push([self.data.var_s_1, self.data.var_s_2])
         self.assertIn(self.data.var_s_1, self.data.metadata.vs_metadata)
         self.assertIn(self.data.var_s_2, self.data.metadata.vs_metadata)
-        self.assertEqual(len(self.data.metadata.vs_metadata), 2)
\ No newline at end of file
+        self.assertEqual(len(self.data.metadata.vs_metadata), 2)
+
+    def test_bounds_encoding_success(self):
+        bounds = [[{"min" : "0.5", "max" : "1.25"}, {"min" : "0", "max" : "0"}],
+                  [{"min" : "-3.5", "max" : "1e+20"}, {"min" : "2", "max" : "4"}]]
+        vs_metadata = VariableSpecificMetadata()
+        vs_metadata.extends(bounds_matrix_ts = bounds, bounds_encoding = BoundsEncoding.BINARY.value)
+        encoded = vs_metadata.to_dict()["bounds_matrix_ts"]
+        self.assertEqual(encoded["shape"], [2, 2, 2])
+        self.assertEqual(encoded["version"], BOUNDS_FORMAT_VERSION)
+        self.assertTrue(np.array_equal(decode_bounds(encoded), decode_bounds(bounds)))
+        self.assertTrue(np.array_equal(decode_bounds(encoded)[1, 0], np.array([-3.5, 1e20], dtype = np.float32)))
+        self.assertEqual(bounds_matrix(encoded)[0][0], {"min" : "0.5", "max" : "1.25"})
+        # the internal bounds keep their json form
+        self.assertEqual(vs_metadata.bounds_matrix_ts, bounds)
+        with self.assertRaises(ValueError):
+            decode_bounds(dict(encoded, version = BOUNDS_FORMAT_VERSION + 1))
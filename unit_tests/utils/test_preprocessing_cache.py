@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from utils.preprocessing_cache import *
+
+
+class FakeCdo:
+    def __init__(self):
+        self.calls = 0
+
+    def sellonlatbox(self, box, input, output):
+        self.calls += 1
+        with open(output, "w") as f:
+            f.write(f"{box} {input} " + "x" * 100)
+
+
+class TestPreprocessingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputs = []
+        for name in ("a.nc", "b.nc", "c.nc"):
+            file = os.path.join(self.directory.name, name)
+            with open(file, "w") as f:
+                f.write(name)
+            self.inputs.append(file)
+        self.cdo = FakeCdo()
+        self.patch = mock.patch("utils.preprocessing_cache.cdo", self.cdo)
+        self.patch.start()
+        self.cache = PreprocessingCache()
+
+    def tearDown(self):
+        self.cache.unmount()
+        self.patch.stop()
+        self.directory.cleanup()
+
+    def output(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_cdo_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 2**20)
+        input = f"-selvar,tas {self.inputs[0]}"
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output("1.nc"))
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output("2.nc"))
+        self.assertEqual(self.cdo.calls, 1)
+        with open(self.output("1.nc")) as f1, open(self.output("2.nc")) as f2:
+            self.assertEqual(f1.read(), f2.read())
+        # another variable or operator chain is another entry
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=f"-selvar,pr {self.inputs[0]}", output=self.output("3.nc"))
+        self.assertEqual(self.cdo.calls, 2)
+        # the entries persist between runs
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 2**20)
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output("4.nc"))
+        self.assertEqual(self.cdo.calls, 2)
+
+    def test_cdo_modified_input_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 2**20)
+        input = f"-selvar,tas {self.inputs[0]}"
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output("1.nc"))
+        with open(self.inputs[0], "w") as f:
+            f.write("modified input")
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output("2.nc"))
+        self.assertEqual(self.cdo.calls, 2)
+
+    def test_cdo_source_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 2**20)
+        # a merged file made again from the same sources reuses the entry
+        for i in range(2):
+            merged = self.output(f"merged.{i}.nc")
+            with open(merged, "w") as f:
+                f.write(f"merged {i}")
+            self.cache.source(merged, self.inputs[:2])
+            self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=f"-selvar,tas {merged}", output=self.output(f"{i}.nc"))
+        self.assertEqual(self.cdo.calls, 1)
+
+    def test_evict_success(self):
+        # room for two entries only
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 300)
+        for i, input in enumerate(self.inputs):
+            self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output(f"{i}.nc"))
+            if i == 1:
+                # the first entry becomes the most recently used
+                self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("0.nc"))
+        self.assertEqual(self.cdo.calls, 3)
+        self.assertLessEqual(self.cache.size(), 300)
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("0.nc"))
+        self.assertEqual(self.cdo.calls, 3)
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[1], output=self.output("1.nc"))
+        self.assertEqual(self.cdo.calls, 4)
+
+    def test_evict_over_limit_only_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 300)
+        with mock.patch.object(self.cache, "evict", wraps = self.cache.evict) as evict:
+            for i, input in enumerate(self.inputs[:2]):
+                self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=input, output=self.output(f"{i}.nc"))
+            self.assertEqual(evict.call_count, 0)
+            self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[2], output=self.output("2.nc"))
+            self.assertEqual(evict.call_count, 1)
+        self.assertEqual(self.cache.total, self.cache.size())
+
+    def test_cdo_other_filesystem_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 2**20)
+        self.assertTrue(self.cache.same_filesystem(self.output("1.nc")))
+        with mock.patch.object(self.cache, "same_filesystem", return_value = False):
+            self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("1.nc"))
+            self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("2.nc"))
+        self.assertEqual(self.cdo.calls, 2)
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_cdo_disabled_success(self):
+        self.cache.mount(os.path.join(self.directory.name, "cache"), 0)
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("1.nc"))
+        self.cache.cdo("sellonlatbox", "-180,180,90,-90", input=self.inputs[0], output=self.output("2.nc"))
+        self.assertEqual(self.cdo.calls, 2)
+        self.assertFalse(os.path.isdir(os.path.join(self.directory.name, "cache")))
@@ -0,0 +1,22 @@
+import os
+import unittest
+from utils.scheduler import *
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_schedule_sequential_success(self):
+        pids = set()
+        def task(item):
+            pids.add(os.getpid())
+            return item * 2
+        self.assertEqual(schedule(task, [1,2,3], 1), [2,4,6])
+        self.assertEqual(pids, {os.getpid()})
+
+    def test_schedule_parallel_success(self):
+        offset = 10
+        def task(item):
+            return item + offset,os.getpid()
+        results = schedule(task, list(range(8)), 3)
+        self.assertEqual([value for value,_ in results], list(range(10,18)))
+        self.assertNotIn(os.getpid(), [pid for _,pid in results])
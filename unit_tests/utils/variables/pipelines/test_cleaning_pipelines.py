@@ -113,4 +113,90 @@ class TestCleaningPipeLine(unittest.TestCase):
         
         self.lon_incorrect.flip((-180,180),data,logger,True)
         assert(logger.flip)
-        
\ No newline at end of file
+            
+    def test_chunks_success(self):
+        import os.path as path
+        import tempfile
+        from netCDF4 import Dataset
+        from utils.variables.info import Axis, Grid, Vertical, Time
+        info = Info(
+            grids = [Grid(category="lonlat",points=(12*7,(12,7)),axis=[
+                Axis(name="lon",bounds=(165,-165),step=-30),
+                Axis(name="lat",bounds=(-90,90),step=30)])],
+            verticals = [Vertical(category="generic",name="lev",levels=3,bounds=(1,3),unit=None)],
+            time = Time(name="time",step=10))
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as directory:
+            file = path.join(directory,"chunks.nc")
+            with Dataset(file,"w",format="NETCDF4") as dataset:
+                for name,size in (("time",10),("lev",3),("lat",7),("lon",12),("surface",1)):
+                    dataset.createDimension(name,size)
+                dataset.createVariable("lon","f8",("lon",))[:] = np.linspace(165,-165,num=12)
+                dataset.createVariable("lat","f8",("lat",))[:] = np.linspace(-90,90,num=7)
+                variable = dataset.createVariable("tas","f4",("time","lev","lat","lon","surface"),fill_value=1e20)
+                data = rng.normal(size=(10,3,7,12,1)).astype(np.float32)
+                data[0,0,0,0,0] = 1e20
+                variable[:] = data
+            
+            with Dataset(file,"r",format="NETCDF4") as dataset:
+                expected = CleaningPipeline.build(dataset,info,"tas",LoggerProxy()).exec()
+                for chunk_size in (1,3,10,20):
+                    logger = LoggerProxy()
+                    pipeline = CleaningPipeline.build(dataset,info,"tas",logger,chunk_size=chunk_size)
+                    assert(pipeline.data is None)
+                    chunks = list(pipeline.chunks())
+                    assert(logger.flip)
+                    assert([time_steps.stop for time_steps,_ in chunks][-1] == 10)
+                    assert(all(chunk.shape[1] <= chunk_size for _,chunk in chunks))
+                    data = np.ma.concatenate([chunk for _,chunk in chunks],axis=1)
+                    assert(data.shape == expected.shape == (3,10,7,12))
+                    assert(np.array_equal(np.ma.filled(data,np.nan),np.ma.filled(expected,np.nan),equal_nan=True))
+                
+                lazy = TimeChunks.build(file,"tas",info,CleaningPipeline.build(dataset,info,"tas",LoggerProxy(),chunk_size=3))
+            assert(lazy.shape == (3,10,7,12))
+            for index in ((slice(None),slice(2,7)),(slice(None),slice(8,20)),(slice(1,2),slice(None,None,3))):
+                assert(np.array_equal(np.ma.filled(lazy[index],np.nan),np.ma.filled(expected[index],np.nan),equal_nan=True))
+            
+            levels = np.array([2,0,2])
+            expected = np.take(expected,levels,axis=0)
+            with Dataset(file,"r",format="NETCDF4") as dataset:
+                data = CleaningPipeline.build(dataset,info,"tas",LoggerProxy(),levels=levels).exec()
+                lazy = TimeChunks.build(file,"tas",info,CleaningPipeline.build(dataset,info,"tas",LoggerProxy(),chunk_size=3,levels=levels))
+            assert(data.shape == lazy.shape == (3,10,7,12))
+            assert(np.array_equal(np.ma.filled(data,np.nan),np.ma.filled(expected,np.nan),equal_nan=True))
+            assert(np.array_equal(np.ma.filled(lazy[:,4:9],np.nan),np.ma.filled(expected[:,4:9],np.nan),equal_nan=True))
+    
+    def test_time_chunks_reshape_success(self):
+        import os.path as path
+        import tempfile
+        from netCDF4 import Dataset
+        from utils.variables.info import Axis, Grid, Time
+        info = Info(
+            grids = [Grid(category="lonlat",points=(4*3,(4,3)),axis=[
+                Axis(name="lon",bounds=(-135,135),step=90),
+                Axis(name="lat",bounds=(60,-60),step=-60)])],
+            verticals = [],
+            time = Time(name="time",step=5))
+        with tempfile.TemporaryDirectory() as directory:
+            file = path.join(directory,"dropped.nc")
+            with Dataset(file,"w",format="NETCDF4") as dataset:
+                for name,size in (("time",5),("lat",3),("lon",4),("surface",1),("member",1)):
+                    dataset.createDimension(name,size)
+                dataset.createVariable("lon","f8",("lon",))[:] = np.linspace(-135,135,num=4)
+                dataset.createVariable("lat","f8",("lat",))[:] = np.linspace(60,-60,num=3)
+                variable = dataset.createVariable("tas","f4",("time","lat","lon","surface","member"))
+                data = np.arange(5*3*4,dtype=np.float32).reshape(5,3,4,1,1)
+                variable[:] = data
+            
+            with Dataset(file,"r",format="NETCDF4") as dataset:
+                expected = CleaningPipeline.build(dataset,info,"tas",LoggerProxy()).exec()
+                lazy = TimeChunks.build(file,"tas",info,CleaningPipeline.build(dataset,info,"tas",LoggerProxy(),chunk_size=2))
+            assert(expected.shape == lazy.shape == (5,3,4))
+            assert(np.array_equal(expected,data[...,0,0]))
+            assert(np.array_equal(lazy[1:4],expected[1:4]))
+            
+            reshaped = np.reshape(lazy,(1,5,3,4))
+            assert(isinstance(reshaped,TimeChunks))
+            assert(np.array_equal(reshaped[:,3:5],expected[np.newaxis,3:5]))
+            with self.assertRaises(ValueError):
+                np.reshape(lazy,(5,12))
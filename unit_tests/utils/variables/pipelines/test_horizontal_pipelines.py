@@ -1,6 +1,7 @@
+import tempfile
 import unittest
 from utils.variables.pipelines.horizontal_pipeline import *
-from utils.variables.info import Axis,Grid
+from utils.variables.info import Axis,Grid,Info,RegridEngine
 
 
 class TestHorizontalPipeLine(unittest.TestCase):
@@ -20,4 +21,116 @@ class TestHorizontalPipeLine(unittest.TestCase):
         assert(grid.points[1][0] == 90)
         assert(grid.points[1][1] == 90)
         
-        assert(abs(grid.axis[0].bounds[0] + (grid.points[1][0]-1)*grid.axis[0].step) <= self.grid.axis[0].bounds[1])
\ No newline at end of file
+        assert(abs(grid.axis[0].bounds[0] + (grid.points[1][0]-1)*grid.axis[0].step) <= self.grid.axis[0].bounds[1])
+
+    def test_compute_keeps_grid_success(self):
+        HorizontalPipeline(self.resolution,self.grid).compute()
+        assert(self.grid.axis[0].step == 2)
+        assert(self.grid.axis[1].step == 1)
+
+
+class TestRemapping(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.grid = Grid(category='lonlat',points=(96*73,(96,73)),axis=(
+            Axis(name='longitude',bounds=(-180,176.25),step=3.75,direction='degrees_east'),
+            Axis(name='latitude',bounds=(90,-90),step=-2.5,direction='degrees_north')))
+        self.coordinates = (-180 + np.arange(96)*3.75, 90 - np.arange(73)*2.5)
+        self.data = np.random.default_rng(0).normal(size=(2,3,73,96)).astype(np.float32)
+        return super().setUp()
+
+    def test_nearest_identity_success(self):
+        remapping = Remapping.nearest(self.coordinates,self.coordinates)
+        assert(np.array_equal(remapping.apply(self.data),self.data))
+
+    def test_nearest_subsampling_success(self):
+        lon,lat = self.coordinates
+        remapping = Remapping.nearest(self.coordinates,(lon[::2],lat[::2]))
+        assert(np.array_equal(remapping.apply(self.data),self.data[...,::2,::2]))
+
+    def test_nearest_masked_success(self):
+        data = np.ma.masked_invalid(np.where(self.data > 1,np.nan,self.data))
+        remapping = Remapping.nearest(self.coordinates,self.coordinates)
+        remapped = remapping.apply(data)
+        assert(np.array_equal(np.ma.getmaskarray(remapped),np.ma.getmaskarray(data)))
+
+    def test_bilinear_success(self):
+        lon,lat = self.coordinates
+        field = np.broadcast_to(lat[:,None] + 0*lon[None,:],(73,96))
+        target = (np.linspace(-170,170,30),np.linspace(80,-80,20))
+        remapped = Remapping.bilinear(self.coordinates,target).apply(field)
+        assert(np.allclose(remapped,np.broadcast_to(target[1][:,None],(20,30))))
+
+    def test_bilinear_missing_values_success(self):
+        data = self.data.copy()
+        data[...,10,10] = np.nan
+        remapped = Remapping.bilinear(self.coordinates,self.coordinates).apply(data)
+        # a missing value only hides the target points it contributes to
+        assert(np.isnan(remapped[...,10,10]).all())
+        assert(np.allclose(remapped[...,10,11],data[...,10,11]))
+
+    def test_regrid_success(self):
+        REMAPPINGS.clear()
+        info = Info(grids=[self.grid],verticals=[],time=None)
+        hp = HorizontalPipeline((7.5,5),self.grid)
+        data,regridded_info = hp.regrid(self.data,self.coordinates,info,RegridEngine.NEAREST)
+        assert(data.shape == (2,3,37,48))
+        assert(regridded_info.grids[0].points == (37*48,(48,37)))
+        assert(regridded_info.grids[0].axis[0].step == 7.5)
+        assert(regridded_info.grids[0].axis[1].step == -5)
+        hp.regrid(self.data,self.coordinates,info,RegridEngine.NEAREST)
+        # the remapping is computed once
+        assert(len(REMAPPINGS.remappings) == 1)
+
+    def test_remap_store_success(self):
+        store = RemapStore()
+        key = HorizontalPipeline.key(self.grid,(7.5,5),RegridEngine.BILINEAR)
+        lon,lat = self.coordinates
+        build = lambda : Remapping.bilinear(self.coordinates,(lon[::2],lat[::2]))
+        with tempfile.TemporaryDirectory() as directory:
+            store.mount(directory)
+            remapping = store.remapping(key,build)
+            # a following run reads the remapping saved in the directory
+            store = RemapStore()
+            store.mount(directory)
+            def fail():
+                raise Exception("the remapping should not be built again")
+            stored = store.remapping(key,fail)
+        assert(np.array_equal(stored.indexes,remapping.indexes))
+        assert(np.array_equal(stored.weights,remapping.weights))
+        assert(stored.shape == remapping.shape)
+
+    def test_remap_store_weights_success(self):
+        store = RemapStore()
+        key = HorizontalPipeline.key(self.grid,(7.5,5),RegridEngine.CDO)
+        assert(store.weights(key,lambda file : None) is None)
+        calls = []
+        def build(file):
+            calls.append(file)
+            open(file,"w").close()
+        with tempfile.TemporaryDirectory() as directory:
+            store.mount(directory)
+            weights = store.weights(key,build)
+            assert(store.weights(key,build) == weights)
+            assert(path.isfile(weights))
+        assert(len(calls) == 1)
+
+    def test_mask_fingerprint_success(self):
+        from netCDF4 import Dataset
+        def write(file, masked):
+            with Dataset(file, "w") as dataset:
+                dataset.createDimension("time", 2)
+                dataset.createDimension("lat", 4)
+                dataset.createDimension("lon", 5)
+                variable = dataset.createVariable("tos", "f4", ("time","lat","lon"), fill_value = -1e20)
+                data = np.ma.masked_array(np.ones((2,4,5)), mask = np.zeros((2,4,5), dtype = bool))
+                data.mask[0,:masked,:] = True
+                variable[:] = data
+            return file
+        with tempfile.TemporaryDirectory() as directory:
+            ocean = write(path.join(directory, "ocean.nc"), 2)
+            other_ocean = write(path.join(directory, "other_ocean.nc"), 2)
+            land = write(path.join(directory, "land.nc"), 0)
+            assert(mask_fingerprint(ocean) == mask_fingerprint(other_ocean))
+            # the cdo weights of a grid are not shared by variables with another mask
+            assert(mask_fingerprint(ocean) != mask_fingerprint(land))
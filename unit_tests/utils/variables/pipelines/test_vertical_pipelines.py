@@ -17,37 +17,41 @@ class TestVerticalPipeLine(unittest.TestCase):
             1000 : [125,250]
         })
 
-    def test_select_indexes_success(self):
+    def test_match_levels_success(self):
         vp = VerticalPipeline(desired_levels=[10,100,500,1000],desired_unit="hPa",vertical_name="",vertical_unit="mbar")
-        distances = [
-            {
-                0 : 1,
-                2 : 3,
-                3 : 5, 
-            },
-            {
-                4 : 10,
-                5 : 9
-            },
-            {
-                8 : 25,
-                9 : 100
-            },
-            {
-                10 : 0
-            }
-        ]
-        
-        indexes = vp.select_indexes(distances)
-        assert(indexes == ",1,6,9,11")
-        
-        
-    def test_eval_distances_success(self):
-        vp = VerticalPipeline(desired_levels=[10,100,500,1000],desired_unit="hPa",vertical_name="",vertical_unit="mbar")
-        levels = [12,40,114,300,590,800,1002]
-        
-        distances = vp.eval_distances(levels)
-        assert(distances == [{0: 2}, {2: 14}, {4: 90}, {6: 2}])
+        indexes = vp.match_levels([12,40,114,300,590,800,1002])
+        assert(list(indexes) == [0,2,4,6])
+        # 100 has no level in its window [77.5,200]
+        indexes = vp.match_levels([12,40,300,590,800,1002])
+        assert(list(indexes) == [0,3,5])
+    
+    def test_match_levels_closest_success(self):
+        vp = VerticalPipeline(desired_levels=[1000, 850, 700, 500, 200, 100, 10],desired_unit="hPa",vertical_name="",vertical_unit="mbar")
+        epsilons = vp.epsilons(vp.desired_levels)
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            levels = np.sort(rng.uniform(0,1100,rng.integers(2,40)))
+            expected = []
+            for desired in vp.desired_levels:
+                window = [i for i,level in enumerate(levels) \
+                    if desired - epsilons[desired][0] <= level <= desired + epsilons[desired][1]]
+                if len(window) > 0:
+                    expected.append(min(window,key=lambda i : abs(desired - levels[i])))
+            assert(list(vp.match_levels(levels)) == expected)
+    
+    def test_select_success(self):
+        vp = VerticalPipeline(desired_levels=[1000,500,100],desired_unit="hPa",vertical_name="lev",vertical_unit="hPa")
+        with Dataset("select.nc","w",format="NETCDF4",diskless=True) as dataset:
+            dataset.createDimension("lev",5)
+            lev = dataset.createVariable("lev","f8",("lev",))
+            lev.units = "hPa"
+            lev[:] = [1000,850,500,200,100]
+            info = Info(grids=[],verticals=[Vertical(category="pressure",name="lev",levels=5,bounds=(1000,100),unit="hPa")],time=None)
+            indexes,selected_info = vp.select(dataset,info)
+        assert(list(indexes) == [0,2,4])
+        assert(selected_info.verticals[0].levels == 3)
+        assert(selected_info.verticals[0].bounds == (1000,100))
+        assert(selected_info.verticals[0].category == "pressure")
         
     def test_convert_success(self):
         uc = UnitConverter.build("kPa","mbar")
@@ -1,4 +1,7 @@
+import os
+import tempfile
 import unittest
+from netCDF4 import Dataset
 from utils.variables.info import *
 from unit_tests.utils.mock_info import MockInfo
 
@@ -68,3 +71,30 @@ class TestInfo(unittest.TestCase):
     def test_get_grid_success(self):
         info = MockInfo.get_info()
         self.assertEqual(info.get_grid(('t', 'p', 'latitude', 'longitude')), MockInfo.get_grid())
+
+    def test_from_dataset_success(self):
+        to_parse,_,_ = MockInfo.info_data()
+        with tempfile.TemporaryDirectory() as directory:
+            file = MockInfo.info_data_dataset(os.path.join(directory, "info.nc"))
+            with Dataset(file, "r") as dataset:
+                info = Info.from_dataset(dataset)
+        self.assertEqual(info, Info.parse(to_parse))
+
+    def test_from_dataset_regular_levels_success(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "levels.nc")
+            with Dataset(file, "w") as dataset:
+                for name,size in (("lon", 4), ("lat", 3), ("level", 4), ("plev", 3)):
+                    dataset.createDimension(name, size)
+                dataset.createVariable("level", "f4", ("level",))[:] = [1, 2, 3, 4]
+                plev = dataset.createVariable("plev", "f8", ("plev",))
+                plev.units = "hPa"
+                plev[:] = [1000, 850, 500]
+                dataset.createVariable("a", "f4", ("level", "lat", "lon"))
+                dataset.createVariable("b", "f4", ("plev", "lat", "lon"))
+            with Dataset(file, "r") as dataset:
+                info = Info.from_dataset(dataset)
+        self.assertEqual(info.grids[0].category, "generic")
+        self.assertEqual(info.verticals[0], Vertical(category="generic", name="level", levels=4, bounds=(1, 4), unit=None))
+        self.assertEqual(info.verticals[1], Vertical(category="generic", name="plev", levels=3, bounds=(1000, 500), unit="hPa"))
+        self.assertIsNone(info.time)
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+import utils.variables.info_cache as info_cache
+from utils.variables.info import Info, InfoBackend
+from utils.variables.info_cache import InfoCache
+from unit_tests.utils.mock_info import MockInfo
+
+
+class TestInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "data.nc")
+        with open(self.file, "w") as f:
+            f.write("data")
+        to_parse,_,_ = MockInfo.info_data()
+        self.info = Info.parse(to_parse)
+
+    def tearDown(self):
+        info_cache.unmount()
+        self.directory.cleanup()
+
+    def test_get_success(self):
+        cache = InfoCache(os.path.join(self.directory.name, "info_cache.db"))
+        self.assertIsNone(cache.get(self.file))
+        cache.put(self.file, self.info)
+        self.assertEqual(cache.get(self.file), self.info)
+        cache.close()
+        # the entries persist between runs
+        cache = InfoCache(os.path.join(self.directory.name, "info_cache.db"))
+        self.assertEqual(cache.get(self.file), self.info)
+        cache.close()
+
+    def test_get_modified_file_failure(self):
+        cache = InfoCache(os.path.join(self.directory.name, "info_cache.db"))
+        cache.put(self.file, self.info)
+        with open(self.file, "a") as f:
+            f.write("more data")
+        self.assertIsNone(cache.get(self.file))
+        cache.close()
+
+    def test_load_info_success(self):
+        cache_file = os.path.join(self.directory.name, "info_cache.db")
+        cache = InfoCache(cache_file)
+        cache.put(self.file, self.info)
+        cache.close()
+        info_cache.mount(cache_file)
+        # served from the cache, without cdo
+        self.assertEqual(info_cache.load_info(self.file), self.info)
+
+    def test_load_info_netcdf_backend_success(self):
+        to_parse,_,_ = MockInfo.info_data()
+        file = MockInfo.info_data_dataset(os.path.join(self.directory.name, "info.nc"))
+        cache_file = os.path.join(self.directory.name, "info_cache.db")
+        info_cache.mount(cache_file, InfoBackend.NETCDF)
+        self.assertEqual(info_cache.load_info(file), Info.parse(to_parse))
+        cache = InfoCache(cache_file)
+        self.assertEqual(cache.get(file, InfoBackend.NETCDF), Info.parse(to_parse))
+        # the backends are cached separately
+        self.assertIsNone(cache.get(file, InfoBackend.CDO))
+        cache.close()
+
+    def test_prune_success(self):
+        cache = InfoCache(os.path.join(self.directory.name, "info_cache.db"))
+        cache.put(self.file, self.info)
+        removed = os.path.join(self.directory.name, "removed.nc")
+        with open(removed, "w") as f:
+            f.write("data")
+        cache.put(removed, self.info)
+        os.remove(removed)
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(cache.connection().execute("SELECT COUNT(*) FROM info").fetchone()[0], 1)
+        cache.close()
+
+    def test_load_info_volatile_not_cached_success(self):
+        to_parse,_,_ = MockInfo.info_data()
+        tmp = os.path.join(self.directory.name, "tmp")
+        os.mkdir(tmp)
+        file = MockInfo.info_data_dataset(os.path.join(tmp, "info.out.nc"))
+        cache_file = os.path.join(self.directory.name, "info_cache.db")
+        info_cache.mount(cache_file, InfoBackend.NETCDF, [tmp])
+        self.assertEqual(info_cache.load_info(file), Info.parse(to_parse))
+        cache = InfoCache(cache_file)
+        self.assertIsNone(cache.get(file, InfoBackend.NETCDF))
+        cache.close()
@@ -0,0 +1,44 @@
+import glob
+import shutil
+import unittest
+from dataclasses import replace
+from netCDF4 import Dataset
+from utils.variables.info import *
+
+SAMPLE_FILES = sorted(glob.glob("external_sample_data/*.nc")) +\
+    sorted(glob.glob("climatearchive_sample_data/data/*/*/*.nc"))
+
+
+@unittest.skipUnless(shutil.which("cdo"), "the parity with cdo sinfo needs the cdo binary")
+class TestInfoParity(unittest.TestCase):
+
+    def assert_parity(self, file:str):
+        from utils.import_cdo import cdo
+        parsed = Info.parse(cdo.sinfo(input=file))
+        with Dataset(file, "r") as dataset:
+            info = Info.from_dataset(dataset)
+            variables = [variable for name,variable in dataset.variables.items() if name not in dataset.dimensions]
+            for variable in variables:
+                dimensions = variable.dimensions
+                expected = parsed.get_grid(dimensions)
+                if expected is None:
+                    continue
+                self.assertEqual(info.get_grid(dimensions), expected, f"{file} {variable.name}")
+                vertical = parsed.get_vertical(dimensions)
+                if vertical is not None:
+                    # the category of a vertical is not derived from the netCDF4 header
+                    self.assertEqual(replace(info.get_vertical(dimensions), category=None),\
+                        replace(vertical, category=None), f"{file} {variable.name}")
+                self.assertEqual(info.get_time(dimensions), parsed.get_time(dimensions), f"{file} {variable.name}")
+
+    def test_external_sample_data_parity(self):
+        files = [file for file in SAMPLE_FILES if file.startswith("external_sample_data")]
+        self.assertGreater(len(files), 0)
+        for file in files:
+            self.assert_parity(file)
+
+    def test_climatearchive_sample_data_parity(self):
+        files = [file for file in SAMPLE_FILES if file.startswith("climatearchive_sample_data")]
+        self.assertGreater(len(files), 0)
+        for file in files:
+            self.assert_parity(file)
@@ -0,0 +1,166 @@
+import hashlib
+import inspect
+import os
+import os.path as path
+import pickle
+import sqlite3
+from dataclasses import fields
+from typing import Any, Callable, Iterable, List, Union
+
+# to increase when the fingerprints or the stored rows change, the entries of another version are ignored
+MANIFEST_VERSION = 2
+
+# hyper parameters that change how the images are made but not the images
+IGNORED_HYPER_PARAMETERS = {"encoders","read_chunk_size","streaming","preprocessing_cache_size","scratch_dir","scratch_size"}
+
+"""
+    fingerprint of the input files : their real path, their size and their modification time
+    param :
+        files : Iterable[str]
+    return :
+        List[Tuple[str,int,int]]
+"""
+def files_fingerprint(files:Iterable[str]) -> list:
+    fingerprint = []
+    for file in sorted(set(files)):
+        stat = os.stat(file)
+        fingerprint.append((path.realpath(file),stat.st_size,stat.st_mtime_ns))
+    return fingerprint
+
+"""
+    fingerprint of a function : its qualified name and the hash of the source of its module,
+    so a change of a helper defined next to the function is seen too. the helpers imported
+    from other modules are covered by the version of nimbus
+    param :
+        function : Callable
+    return :
+        Tuple[str,str]
+"""
+def function_fingerprint(function:Callable) -> tuple:
+    name = f"{function.__module__}.{function.__qualname__}"
+    try :
+        source = inspect.getsource(inspect.getmodule(function))
+    except (OSError,TypeError):
+        source = ""
+    return name,hashlib.sha1(source.encode()).hexdigest()
+
+"""
+    fingerprint of the hyper parameters that change the images
+    param :
+        hyper_parameters : HyperParametersConfig
+    return :
+        List[Tuple[str,str]]
+"""
+def hyper_parameters_fingerprint(hyper_parameters) -> list:
+    return [(field.name,repr(getattr(hyper_parameters,field.name))) for field in fields(hyper_parameters)\
+        if field.name not in IGNORED_HYPER_PARAMETERS]
+
+"""
+    hash of the fingerprint of every part of a work unit
+    param :
+        parts : Any
+    return :
+        str
+"""
+def fingerprint(*parts:Any) -> str:
+    return hashlib.sha1(repr((MANIFEST_VERSION,parts)).encode()).hexdigest()
+
+
+""" class BuildManifest, sqlite table mapping an experiment, a variable, a config and an output to the fingerprint of its last conversion and its ArchiveDB row """
+class BuildManifest:
+    def __init__(self,file:str):
+        self.file = file
+        self.__connection = None
+        self.__pid = None
+
+    """
+        connection to the database, a new connection is opened in a forked process
+        param :
+            None
+        return :
+            sqlite3.Connection
+    """
+    def connection(self) -> sqlite3.Connection:
+        if self.__connection is None or self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(self.file,timeout=60)
+            self.__pid = os.getpid()
+            with self.__connection:
+                columns = [row[1] for row in self.__connection.execute("PRAGMA table_info(manifest)")]
+                if len(columns) > 0 and "output" not in columns:
+                    self.__connection.execute("DROP TABLE manifest")
+                self.__connection.execute("""CREATE TABLE IF NOT EXISTS manifest (
+                    exp_id TEXT,
+                    variable TEXT,
+                    config_name TEXT,
+                    output TEXT,
+                    fingerprint TEXT,
+                    version INTEGER,
+                    row BLOB,
+                    PRIMARY KEY (exp_id,variable,config_name,output))""")
+        return self.__connection
+
+    """
+        ArchiveDB row of the last conversion of a variable, if its fingerprint did not change
+        and all its images still exist
+        param :
+            exp_id : str
+            variable : str
+            config_name : str
+            output : str (the prefix of the images)
+            fingerprint : str
+        return :
+            Union[dict,None]
+    """
+    def get(self,exp_id:str,variable:str,config_name:str,output:str,fingerprint:str) -> Union[dict,None]:
+        row = self.connection().execute("SELECT row FROM manifest WHERE exp_id = ? AND variable = ? AND config_name = ? AND output = ? AND fingerprint = ? AND version = ?",\
+            (exp_id,variable,config_name,output,fingerprint,MANIFEST_VERSION)).fetchone()
+        if row is None:
+            return None
+        row = pickle.loads(row[0])
+        files = [file for list_files in (row["list_files_ts"],row["list_files_mean"]) for files in list_files for file in files]
+        if not all(path.isfile(file) for file in files):
+            return None
+        return row
+
+    """
+        record the fingerprint and the ArchiveDB row of the conversion of a variable
+        param :
+            exp_id : str
+            variable : str
+            config_name : str
+            output : str
+            fingerprint : str
+            row : dict
+        return :
+            None
+    """
+    def put(self,exp_id:str,variable:str,config_name:str,output:str,fingerprint:str,row:dict):
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO manifest (exp_id,variable,config_name,output,fingerprint,version,row) VALUES (?,?,?,?,?,?,?)",\
+                (exp_id,variable,config_name,output,fingerprint,MANIFEST_VERSION,pickle.dumps(row)))
+
+    """
+        forget the conversion of a variable by a config to an output
+        param :
+            exp_id : str
+            variable : str
+            config_name : str
+            output : str
+        return :
+            None
+    """
+    def remove(self,exp_id:str,variable:str,config_name:str,output:str):
+        with self.connection() as connection:
+            connection.execute("DELETE FROM manifest WHERE exp_id = ? AND variable = ? AND config_name = ? AND output = ?",\
+                (exp_id,variable,config_name,output))
+
+    def close(self):
+        if self.__connection is not None and self.__pid == os.getpid():
+            self.__connection.close()
+        self.__connection = None
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
@@ -7,7 +7,9 @@ from typing import Any, Dict, Generator, List, Tuple, Union
 import numpy as np
 import tomli
 
-from utils.converters.utils.utils import Extension
+from utils.converters.utils.utils import BoundsEngine, EncodingProfile, Extension
+from utils.variables.info import InfoBackend, RegridEngine, VerticalEngine
+from utils.metadata.bounds_encoding import BoundsEncoding
 if __name__ == "__main__":
     from logger import Logger,_Logger
 else :
@@ -119,6 +121,7 @@ class HyperParametersConfig:
     processing : str = 'default'
     realm : str = None
     threshold : Union[float,None] = 3.0
+    bounds_engine : BoundsEngine = BoundsEngine.PARTITION
     Atmosphere : dict = field(default_factory=lambda: {'levels':[1000, 850, 700, 500, 200, 100, 10],'unit':'hPa','resolutions':[(None,None)]}) 
     Ocean : dict = field(default_factory=lambda: {'levels':[0, 100, 200, 500, 1000, 2000, 4000],'unit':'m','resolutions':[(None,None)]})
     nan_encoding : int = 255
@@ -126,6 +129,18 @@ class HyperParametersConfig:
     chunks_vertical : float = 0
     extension : Extension = Extension.PNG
     lossless : bool = True
+    info_backend : InfoBackend = InfoBackend.CDO
+    regrid_engine : RegridEngine = RegridEngine.CDO
+    vertical_engine : VerticalEngine = VerticalEngine.CDO
+    read_chunk_size : int = 0
+    streaming : bool = False
+    legacy_quantization : bool = False
+    encoders : int = 1
+    encoding_profile : EncodingProfile = None
+    preprocessing_cache_size : float = 0
+    scratch_dir : str = "/dev/shm"
+    scratch_size : float = 0
+    bounds_encoding : BoundsEncoding = BoundsEncoding.JSON
 
     """
         check if the value provided for the key correct
@@ -163,10 +178,40 @@ class HyperParametersConfig:
         if key == "extension" :
             return value in Extension._value2member_map_
         
+        if key == "encoding_profile" :
+            return value in EncodingProfile._value2member_map_
+        
+        if key == "bounds_encoding" :
+            return value in BoundsEncoding._value2member_map_
+        
+        if key == "bounds_engine" :
+            return value in BoundsEngine._value2member_map_
+        
+        if key == "info_backend" :
+            return value in InfoBackend._value2member_map_
+        
+        if key == "regrid_engine" :
+            return value in RegridEngine._value2member_map_
+        
+        if key == "vertical_engine" :
+            return value in VerticalEngine._value2member_map_
+        
         if key == "nan_encoding" :
             return type(value) is int
         
-        if key == "lossless":
+        if key == "read_chunk_size" :
+            return type(value) is int and value >= 0
+        
+        if key == "encoders" :
+            return type(value) is int and value >= 1
+        
+        if key == "preprocessing_cache_size" or key == "scratch_size" :
+            return (type(value) is int or type(value) is float) and value >= 0
+        
+        if key == "scratch_dir" :
+            return type(value) is str
+        
+        if key == "lossless" or key == "streaming" or key == "legacy_quantization":
             return type(value) is bool
         if key == "threshold":
             return type(value) is float or type(value) is str
@@ -192,7 +237,19 @@ class HyperParametersConfig:
 
         if key == "extension" :
             value = Extension(value)   
-        if key == "lossless" :
+        if key == "encoding_profile" :
+            value = EncodingProfile(value)
+        if key == "bounds_encoding" :
+            value = BoundsEncoding(value)
+        if key == "bounds_engine" :
+            value = BoundsEngine(value)
+        if key == "info_backend" :
+            value = InfoBackend(value)
+        if key == "regrid_engine" :
+            value = RegridEngine(value)
+        if key == "vertical_engine" :
+            value = VerticalEngine(value)
+        if key == "lossless" or key == "streaming" or key == "legacy_quantization" :
             value = bool(value)
         if key == "threshold" :
             if type(value) is str:
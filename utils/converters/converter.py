@@ -5,16 +5,20 @@ from PIL.PngImagePlugin import PngInfo
 import os
 import json
 from datetime import datetime
+from utils.converters.encoder_pool import EncoderPool
 from utils.converters.providers.default_provider import ImageProvider
 from utils.converters.providers.png_provider import PNG_Provider
 from utils.converters.providers.webp_provider import WEBP_Provider
 from utils.converters.utils.channel import Channel
-from utils.converters.utils.utils import ChannelDimensionException, Extension, Mode, Shape, bounds, clean, normalize
+from utils.converters.utils.utils import BoundsEngine, ChannelDimensionException, EncodingProfile, Extension, Mode, Shape, bounds, clean, normalize
 from utils.metadata.metadata import Metadata,VariableSpecificMetadata
+from utils.metadata.bounds_encoding import BoundsEncoding
 from utils.logger import Logger,_Logger
 from typing import List, Tuple, Dict, Union
 from enum import Enum
 
+# default number of time steps converted at once by the streaming conversion
+STREAM_TIME_STEPS = 12
 
 @dataclass
 class Converter:
@@ -24,33 +28,178 @@ class Converter:
     shape : Shape
     nan_encoding : int
     threshold : float
+    bounds_engine : BoundsEngine
     chunks_t : int
     chunks_v : int
     filename : str
+    streaming : bool = False
+    legacy_quantization : bool = False
+    encoders : int = 1
+    bounds_encoding : BoundsEncoding = BoundsEncoding.JSON
+    block_size : int = STREAM_TIME_STEPS
     
     def exec(self) -> Tuple[List[str],List[str]]:
+        if self.streaming:
+            return self.exec_streaming()
         converted_channels = self.convert()
         
         mean_channels = self.mean(converted_channels)
         
         self.metadata.extends( nan_value_encoding = self.nan_encoding,
+                              bounds_engine = self.bounds_engine.value,
                               created_at = datetime.now().strftime("%d/%m/%Y_%H:%M:%S") )
 
+        for channel in converted_channels:
+            channel.metadata.extends(bounds_encoding = self.bounds_encoding.value)
         self.metadata.push((channel.metadata for channel in converted_channels))
         
-        ts_files = []
-        for channels,suffixe in self.slices(converted_channels):
-            ts_files.append(self.provider.save(filename = f"{self.filename}.ts{suffixe}" ,
-                                   channels = channels,
-                                   metadata = self.metadata))
+        with EncoderPool(provider = self.provider, metadata = self.metadata, encoders = self.encoders) as pool:
+            for channels,suffixe in self.slices(converted_channels):
+                pool.save(filename = f"{self.filename}.ts{suffixe}" ,
+                          channels = channels)
+            ts_files = pool.files()
+            
+            for channels,suffixe in self.slices_vertical(mean_channels):
+                pool.save(filename = f"{self.filename}.avg{suffixe}",
+                          channels = channels)
+            mean_files = pool.files()
+        
+        return ts_files,mean_files
+
+    """
+        streaming conversion, the output files are the same as exec. a first pass computes
+        the bounds of every tile, needed by the metadata of every file. a second pass converts
+        the data one time slice of the time series files at a time, saves the files of the
+        slice and accumulates the running sums of the mean. the input data is only indexed
+        by blocks of at most block_size time steps (data[:,block]) : with a TimeChunks input
+        every block is read from the file when it is used, twice, and the memory is bounded
+        by the block size. with an array input only the working copies and the converted
+        data are bounded, the input is held in memory in full
+        param :
+            
+        return :
+            Tuple[List[str],List[str]]
+    """
+    def exec_streaming(self) -> Tuple[List[str],List[str]]:
+        channels_bounds = [self.stream_bounds(channel) for channel in self.channels]
+        
+        mean_channels = []
+        for channel,(mins,maxs,empty) in zip(self.channels,channels_bounds):
+            bounds_matrix = Channel.bounds_matrix(mins,maxs,empty)
+            channel.metadata.extends(bounds_matrix_ts = bounds_matrix)
+            sums = np.zeros((self.shape.vertical,1,self.shape.latitude,self.shape.longitude),dtype=int)
+            mean_channels.append(channel.mean_channel(sums,bounds_matrix))
+        
+        self.metadata.extends( nan_value_encoding = self.nan_encoding,
+                              bounds_engine = self.bounds_engine.value,
+                              created_at = datetime.now().strftime("%d/%m/%Y_%H:%M:%S") )
+
+        for channel in self.channels:
+            channel.metadata.extends(bounds_encoding = self.bounds_encoding.value)
+        self.metadata.push((channel.metadata for channel in self.channels))
         
-        mean_files = []
-        for channels,suffixe in self.slices_vertical(mean_channels):
-            mean_files.append(self.provider.save(filename = f"{self.filename}.avg{suffixe}",
-                                        channels = mean_channels,
-                                   metadata = self.metadata))
+        with EncoderPool(provider = self.provider, metadata = self.metadata, encoders = self.encoders) as pool:
+            ts_files = self.stream_time_series(pool,channels_bounds,mean_channels)
+            
+            for mean_channel in mean_channels:
+                # same truncation as np.mean with an int dtype
+                mean_channel.data //= self.shape.time
+            
+            for channels,suffixe in self.slices_vertical(mean_channels):
+                pool.save(filename = f"{self.filename}.avg{suffixe}",
+                          channels = channels)
+            mean_files = pool.files()
         
         return ts_files,mean_files
+    
+    """
+        convert and save the time series files one time slice at a time, the running
+        sums of the mean channels are accumulated
+        param :
+            pool : EncoderPool
+            channels_bounds : list (the bounds of every channel)
+            mean_channels : List[Channel]
+        return :
+            List[str]
+    """
+    def stream_time_series(self, pool : EncoderPool, channels_bounds : list, mean_channels : List[Channel]) -> List[str]:
+        for time_steps,time_suffixe in self.time_slices():
+            converted_channels = []
+            for channel,(mins,maxs,_),mean_channel in zip(self.channels,channels_bounds,mean_channels):
+                converted = self.stream_convert(channel,time_steps,mins,maxs)
+                mean_channel.data += converted.sum(axis = 1, dtype = int, keepdims = True)
+                converted_channels.append(Channel(
+                    metadata = channel.metadata,
+                    data = converted,
+                    shape = Shape(time = converted.shape[1],
+                                  vertical = self.shape.vertical,
+                                  latitude = self.shape.latitude,
+                                  longitude = self.shape.longitude)))
+            for channels,vertical_suffixe in self.slices_vertical(converted_channels):
+                pool.save(filename = f"{self.filename}.ts{time_suffixe}{vertical_suffixe}" ,
+                          channels = channels)
+        return pool.files()
+    
+    """
+        time steps and suffixes of the time series files, like Channel.slices
+        param :
+            
+        return :
+            List[Tuple[slice,str]]
+    """
+    def time_slices(self) -> List[Tuple[slice,str]]:
+        if self.chunks_t <= 0 or self.chunks_t > self.shape.time:
+            return [(slice(0,self.shape.time),"")]
+        # same boundaries as np.array_split
+        size,extra = divmod(self.shape.time,self.chunks_t)
+        starts = np.cumsum([0] + [size + 1 if i < extra else size for i in range(self.chunks_t)])
+        return [(slice(starts[i],starts[i+1]),f".t{i+1}of{self.chunks_t}") for i in range(self.chunks_t)]
+    
+    """
+        time blocks of at most block_size time steps covering the given time steps
+        param :
+            time_steps : slice
+        return :
+            List[slice]
+    """
+    def blocks(self, time_steps : slice) -> List[slice]:
+        return [slice(start,min(start + self.block_size,time_steps.stop)) 
+                for start in range(time_steps.start,time_steps.stop,self.block_size)]
+    
+    """
+        bounds of every tile of a channel, computed block by block
+        param :
+            channel : Channel
+        return :
+            tuple of ndarray (vertical,time) (the min and max values and True for the tiles without values)
+    """
+    def stream_bounds(self, channel : Channel) -> Tuple[np.ndarray,np.ndarray,np.ndarray]:
+        blocks = [Channel.tile_bounds(Channel.prepare(channel.data[:,block]),self.threshold,self.bounds_engine)
+                  for block in self.blocks(slice(0,self.shape.time))]
+        mins,maxs,empty = zip(*blocks)
+        return np.concatenate(mins, axis = 1),np.concatenate(maxs, axis = 1),np.concatenate(empty, axis = 1)
+    
+    """
+        converted data of the given time steps of a channel, quantized block by block
+        param :
+            channel : Channel
+            time_steps : slice
+            mins : ndarray (vertical,time)
+            maxs : ndarray (vertical,time)
+        return :
+            ndarray of uint8 (vertical,time,latitude,longitude)
+    """
+    def stream_convert(self, channel : Channel, time_steps : slice, mins : np.ndarray, maxs : np.ndarray) -> np.ndarray:
+        converted = np.empty((self.shape.vertical,time_steps.stop - time_steps.start,
+                              self.shape.latitude,self.shape.longitude),dtype=np.uint8)
+        for block in self.blocks(time_steps):
+            converted[:,block.start - time_steps.start:block.stop - time_steps.start] = Channel.quantize(
+                data = Channel.prepare(channel.data[:,block]),
+                mins = mins[:,block],
+                maxs = maxs[:,block],
+                nan_encoding = self.nan_encoding,
+                legacy_quantization = self.legacy_quantization)
+        return converted
 
     def slices(self, converted_channels : List[Channel]):
         sliced_channels = [ch.slices(self.chunks_t, self.chunks_v) for ch in converted_channels]
@@ -70,7 +219,9 @@ class Converter:
         converted_channels : List[Channel] = []
         for channel in self.channels : 
             converted_channels.append(channel.convert(nan_encoding=self.nan_encoding,
-                                                      threshold = self.threshold)) 
+                                                      threshold = self.threshold,
+                                                      bounds_engine = self.bounds_engine,
+                                                      legacy_quantization = self.legacy_quantization)) 
         return converted_channels
     
     def mean(self,channels:List[Channel]) -> List[Channel]:
@@ -92,6 +243,7 @@ class Converter:
         shape = Shape.build(shape)
         channels = []
         for data,metadata in inputs:
+            # a TimeChunks input is reshaped without being read
             data = np.reshape(data, shape.tuple())
             channels.append(
                 Channel(
@@ -106,18 +258,25 @@ class Converter:
             extension : Extension,
             nan_encoding : int,
             threshold : float,
+            bounds_engine : BoundsEngine,
             filename : str,            
             chunks_t : Union[int , float] , 
             chunks_v : Union[int , float],
             metadata : Metadata,
-            lossless : bool) -> 'Converter':
+            lossless : bool,
+            streaming : bool = False,
+            legacy_quantization : bool = False,
+            encoders : int = 1,
+            encoding_profile : EncodingProfile = None,
+            bounds_encoding : BoundsEncoding = BoundsEncoding.JSON,
+            block_size : int = STREAM_TIME_STEPS) -> 'Converter':
         
         channels , shape = Converter.resolve_channels(inputs=inputs)
         
         if extension == Extension.PNG :
-            provider = PNG_Provider.build(mode=Mode.get(channels), lossless = lossless)
+            provider = PNG_Provider.build(mode=Mode.get(channels), lossless = lossless, profile = encoding_profile)
         elif extension == Extension.WEBP :
-            provider = WEBP_Provider.build(mode=Mode.get(channels), lossless = lossless)
+            provider = WEBP_Provider.build(mode=Mode.get(channels), lossless = lossless, profile = encoding_profile)
         else :
             provider = ImageProvider.build(mode=Mode.get(channels),extension=extension, lossless = lossless)
         if type(chunks_t) is float:
@@ -129,11 +288,17 @@ class Converter:
                          shape = shape,
                          nan_encoding = nan_encoding,
                          threshold = threshold,
+                         bounds_engine = bounds_engine,
                          filename = filename,
                          chunks_t = chunks_t,
                          chunks_v = chunks_v,
                          metadata = metadata,
-                         provider = provider)
+                         provider = provider,
+                         streaming = streaming,
+                         legacy_quantization = legacy_quantization,
+                         encoders = encoders,
+                         bounds_encoding = bounds_encoding,
+                         block_size = block_size if block_size > 0 else STREAM_TIME_STEPS)
     
     @staticmethod
     def build_all(inputs:List[Tuple[List[Tuple[np.ndarray,VariableSpecificMetadata]],str]],
@@ -141,9 +306,16 @@ class Converter:
             nan_encoding : int,
             extension : Extension,
             threshold : float,
+            bounds_engine : BoundsEngine,
             chunks_t : Union[int , float],
             chunks_v : Union[int , float],
-            lossless : bool) -> List['Converter']:
+            lossless : bool,
+            streaming : bool = False,
+            legacy_quantization : bool = False,
+            encoders : int = 1,
+            encoding_profile : EncodingProfile = None,
+            bounds_encoding : BoundsEncoding = BoundsEncoding.JSON,
+            block_size : int = STREAM_TIME_STEPS) -> List['Converter']:
             
         for input,output_filename in inputs:  
             yield Converter.build(inputs=input,
@@ -154,5 +326,12 @@ class Converter:
                                   metadata=metadata,
                                   nan_encoding=nan_encoding,
                                   threshold=threshold,
-                                  lossless = lossless
+                                  bounds_engine=bounds_engine,
+                                  lossless = lossless,
+                                  streaming = streaming,
+                                  legacy_quantization = legacy_quantization,
+                                  encoders = encoders,
+                                  encoding_profile = encoding_profile,
+                                  bounds_encoding = bounds_encoding,
+                                  block_size = block_size
                                   )
\ No newline at end of file
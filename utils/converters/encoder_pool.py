@@ -0,0 +1,61 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Union
+from utils.converters.providers.default_provider import ImageProvider
+from utils.converters.utils.channel import Channel
+from utils.metadata.metadata import Metadata
+
+
+"""
+    class EncoderPool, save the images of a converter with a pool of threads.
+    Pillow releases the GIL while the images are compressed, so the png and webp
+    encodings run concurrently. the files are returned in the order of the calls
+    to save, whatever the order in which the encodings end
+"""
+class EncoderPool:
+    def __init__(self,provider:ImageProvider,metadata:Metadata,encoders:int):
+        self.provider = provider
+        self.metadata = metadata
+        self.encoders = encoders
+        self.__executor = None
+        self.__files : List[Union[str,Future]] = []
+
+    def __enter__(self) -> 'EncoderPool':
+        if self.encoders > 1:
+            self.__executor = ThreadPoolExecutor(max_workers=self.encoders)
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True,cancel_futures=exc_type is not None)
+        self.__executor = None
+
+    """
+        save the channels in an image, in the current thread with a single encoder.
+        at most twice as many images as encoders wait to be encoded, so the memory
+        used by the pending images stays bounded
+        param :
+            filename : str
+            channels : List[Channel]
+        return :
+            None
+    """
+    def save(self,filename:str,channels:List[Channel]):
+        if self.__executor is None:
+            self.__files.append(self.provider.save(filename=filename,channels=channels,metadata=self.metadata))
+            return
+        pending = [file for file in self.__files if isinstance(file,Future) and not file.done()]
+        if len(pending) >= 2*self.encoders:
+            pending[0].result()
+        self.__files.append(self.__executor.submit(self.provider.save,filename=filename,channels=channels,metadata=self.metadata))
+
+    """
+        files saved since the last call, in the order of the calls to save
+        param :
+            None
+        return :
+            List[str]
+    """
+    def files(self) -> List[str]:
+        files = [file.result() if isinstance(file,Future) else file for file in self.__files]
+        self.__files = []
+        return files
@@ -3,7 +3,7 @@ from typing import List
 
 import numpy as np
 from utils.converters.utils.channel import Channel
-from utils.converters.utils.utils import Extension, Mode, Shape
+from utils.converters.utils.utils import EncodingProfile, Extension, Mode, Shape
 from utils.metadata.metadata import Metadata
 import os.path as path
 from PIL import Image as img
@@ -15,22 +15,32 @@ class ImageProvider:
     extension : Extension
     encoding : type
     lossless : bool
+    profile : EncodingProfile = None
     
+    """
+        build the mosaic image of the channels, each (latitude,longitude) tile is placed
+        at row vertical and column time. the tiles are written directly in the image buffer
+        param :
+            channels : List[Channel]
+            mode : Mode
+            encoding : type
+        return :
+            np.ndarray
+    """
     @staticmethod
     def reduce(channels : List[Channel],mode:Mode,encoding:type) -> np.ndarray:
         shape : Shape = channels[0].shape
         
-        image = np.zeros((shape.vertical * shape.latitude,
-                          shape.time * shape.longitude , 
-                          mode.value))
+        image = np.zeros((shape.vertical, shape.latitude,
+                          shape.time, shape.longitude,
+                          mode.value), dtype = encoding)
+        for index,channel in enumerate(channels):
+            # (vertical,time,latitude,longitude) -> (vertical,latitude,time,longitude)
+            image[...,index] = channel.data.transpose(0,2,1,3)
         
-        latitude,longitude = shape.latitude,shape.longitude
-        for vertical in range(shape.vertical):
-            for time in range(shape.time):
-                for index,channel in enumerate(channels):
-                    image[vertical*latitude:(vertical+1)*latitude ,
-                        time*longitude:(time+1)*longitude , index ] = channel.data[vertical,time,:,:]
-        return encoding(np.squeeze(image))
+        return np.squeeze(image.reshape(shape.vertical * shape.latitude,
+                                        shape.time * shape.longitude,
+                                        mode.value))
     
     def save(self,filename:str,channels : List[Channel],metadata:Metadata) -> str:
         image:np.ndarray = ImageProvider.reduce(channels,self.mode,self.encoding)
@@ -45,7 +55,7 @@ class ImageProvider:
         if mode == Mode.RGBA:
             raise Exception("can't use RGBA by default, only png is supported")
         return ImageProvider(
-            encoding=np.int8,
+            encoding=np.uint8,
             extension=extension,
             mode=mode,
             lossless = lossless
@@ -6,9 +6,31 @@ from utils.converters.utils.channel import Channel
 from utils.converters.utils.utils import Mode,Extension
 from PIL import Image as img
 from PIL.PngImagePlugin import PngInfo
+import io
 import json
+import zlib
 
+from utils.converters.utils.utils import EncodingProfile
 from utils.metadata.metadata import Metadata
+from utils.metadata.bounds_encoding import BoundsEncoding
+
+# options without profile
+PNG_DEFAULT = [dict(optimize = True)]
+
+"""
+    zlib options tried by each profile, the smallest image is kept. Pillow chooses the png
+    filter of every row itself, so the profiles only change the zlib level and strategy.
+    the filtered rows of the quantized data compress better with the rle and filtered
+    strategies than with the default one. balanced is the options without profile,
+    smallest also tries them
+"""
+PNG_PROFILES = {
+    EncodingProfile.FAST : [dict(optimize = False, compress_level = 1, compress_type = zlib.Z_RLE)],
+    EncodingProfile.BALANCED : PNG_DEFAULT,
+    EncodingProfile.SMALLEST : [*PNG_DEFAULT,
+                                dict(optimize = False, compress_level = 9, compress_type = zlib.Z_FILTERED),
+                                dict(optimize = False, compress_level = 9, compress_type = zlib.Z_RLE)],
+}
 
 class PNG_Provider(ImageProvider):
     
@@ -18,20 +40,42 @@ class PNG_Provider(ImageProvider):
         file_path = path.join(f"{filename}.{self.extension.value}")
         
         image : img.Image = img.fromarray(image, self.mode.name)
-        image.save(file_path , pnginfo = self.to_png_info(metadata) , lossless = self.lossless, optimize=True , format='png')
+        png_info = self.to_png_info(metadata)
+        candidates = PNG_DEFAULT if self.profile is None else PNG_PROFILES[self.profile]
+        if len(candidates) == 1:
+            image.save(file_path , pnginfo = png_info , lossless = self.lossless, format='png', **candidates[0])
+            return file_path
+        
+        smallest = None
+        for options in candidates:
+            buffer = io.BytesIO()
+            image.save(buffer , pnginfo = png_info , lossless = self.lossless, format='png', **options)
+            if smallest is None or buffer.tell() < smallest.tell():
+                smallest = buffer
+        with open(file_path,"wb") as file:
+            file.write(smallest.getbuffer())
         return file_path
     
+    """
+        metadata of the image in text chunks, compressed (zTXt) when the bounds are binary encoded
+        param :
+            metadata : Metadata
+        return :
+            PngInfo
+    """
     def to_png_info(self,metadata : Metadata) -> PngInfo:
         png_info = PngInfo()
+        compressed = any(vs.bounds_encoding == BoundsEncoding.BINARY.value for vs in metadata.vs_metadata)
         for key,value in metadata.to_dict().items():
-            png_info.add_text(key,str(json.dumps(value)))
+            png_info.add_text(key,str(json.dumps(value)),zip=compressed)
         return png_info
     
     @staticmethod
-    def build(mode : Mode, lossless : bool) -> 'PNG_Provider':
+    def build(mode : Mode, lossless : bool, profile : EncodingProfile = None) -> 'PNG_Provider':
         return PNG_Provider(
-            encoding=np.int8,
+            encoding=np.uint8,
             extension=Extension.PNG,
             mode=mode,
-            lossless = lossless
+            lossless = lossless,
+            profile = profile
         )
\ No newline at end of file
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import List, Tuple
 
 import numpy as np
-from utils.converters.utils.utils import Shape, bounds, clean, normalize
+from utils.converters.utils.utils import BoundsEngine, Shape, bounds_per_tile, bounds_tiles, legacy_quantize_tiles, quantize_tiles
 
 from utils.metadata.metadata import VariableSpecificMetadata
 
@@ -17,6 +17,18 @@ class Channel:
     
     def mean(self, bounds_matrix : list) -> 'Channel':
         mean = np.mean(self.data, axis = 1, dtype = int,keepdims=True)
+        return self.mean_channel(mean, bounds_matrix)
+    
+    """
+        channel of the time mean of the converted data, the bounds of the mean are
+        the mean of the bounds of every time step
+        param :
+            mean : ndarray (vertical,1,latitude,longitude)
+            bounds_matrix : list
+        return :
+            Channel
+    """
+    def mean_channel(self, mean : np.ndarray, bounds_matrix : list) -> 'Channel':
         bounds_avg_matrix = np.empty(shape = (self.shape.vertical, 1), dtype = dict)
         
         for vertical in range(self.shape.vertical):
@@ -36,20 +48,76 @@ class Channel:
             )
         )
     
-    def convert(self,nan_encoding:int,threshold:float) -> 'Channel':
-        converted_data = np.zeros(self.data.shape)
-        bounds_matrix = np.empty(shape = (self.shape.vertical, self.shape.time), dtype = dict)
+    """
+        data as floats with nan for the missing values
+        param :
+            data : ndarray
+        return :
+            ndarray
+    """
+    @staticmethod
+    def prepare(data : np.ndarray) -> np.ndarray:
+        if not np.issubdtype(data.dtype, np.floating):
+            data = data.astype(np.float64)
+        # masked values are missing values
+        return np.ma.filled(data, np.nan)
+    
+    """
+        bounds of every (latitude,longitude) tile with the given engine
+        param :
+            data : ndarray (..., latitude, longitude) as returned by prepare
+            threshold : float
+            bounds_engine : BoundsEngine
+        return :
+            tuple of ndarray (...) (the min and max values and True for the tiles without values)
+    """
+    @staticmethod
+    def tile_bounds(data : np.ndarray, threshold : float, bounds_engine : BoundsEngine) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if bounds_engine == BoundsEngine.EXACT:
+            return bounds_per_tile(data=data,threshold=threshold)
+        return bounds_tiles(data=data,threshold=threshold)
+    
+    """
+        bounds matrix of the metadata
+        param :
+            mins : ndarray (vertical,time)
+            maxs : ndarray (vertical,time)
+            empty : ndarray (vertical,time)
+        return :
+            list
+    """
+    @staticmethod
+    def bounds_matrix(mins : np.ndarray, maxs : np.ndarray, empty : np.ndarray) -> list:
+        return [[{"min" : "0", "max" : "0"} if empty[vertical,time] 
+                 else {"min" : str(mins[vertical,time]), "max" : str(maxs[vertical,time])}
+                 for time in range(mins.shape[1])]
+                for vertical in range(mins.shape[0])]
+    
+    """
+        quantize the data to uint8, the values are rounded unless the legacy quantization
+        (truncation of the former float64 conversion) is asked
+        param :
+            data : ndarray (..., latitude, longitude) as returned by prepare
+            mins : ndarray (...)
+            maxs : ndarray (...)
+            nan_encoding : int
+            legacy_quantization : bool
+        return :
+            ndarray of uint8 (..., latitude, longitude)
+    """
+    @staticmethod
+    def quantize(data : np.ndarray, mins : np.ndarray, maxs : np.ndarray, nan_encoding : int, legacy_quantization : bool = False) -> np.ndarray:
+        if legacy_quantization:
+            return legacy_quantize_tiles(data=data,mins=mins,maxs=maxs,nan_encoding=nan_encoding)
+        return quantize_tiles(data=data,mins=mins,maxs=maxs,nan_encoding=nan_encoding)
+    
+    def convert(self,nan_encoding:int,threshold:float,bounds_engine:BoundsEngine = BoundsEngine.PARTITION,legacy_quantization:bool = False) -> 'Channel':
+        data = Channel.prepare(self.data)
         
-        for vertical in range(self.shape.vertical):
-            for time in range(self.shape.time):
-                converted_data[vertical,time,:,:],(min,max) = self.__convert_tile(vertical=vertical,
-                                                                                  time=time,
-                                                                                  threshold=threshold,
-                                                                                  nan_encoding=nan_encoding)
-                bounds_matrix[vertical,time] = {"min" : str(min), "max" : str(max)}
+        mins,maxs,empty = Channel.tile_bounds(data,threshold,bounds_engine)
         
-        self.metadata.extends(bounds_matrix_ts = bounds_matrix.tolist())
-        converted_data = clean(converted_data,nan_encoding=nan_encoding)
+        self.metadata.extends(bounds_matrix_ts = Channel.bounds_matrix(mins,maxs,empty))
+        converted_data = Channel.quantize(data,mins,maxs,nan_encoding,legacy_quantization)
         return Channel(
             metadata = self.metadata,
             data = converted_data,
@@ -87,7 +155,7 @@ class Channel:
                 res = []
                 for i in range (chunks_t):
                     for j in range(chunks_v):
-                        slice = slices[i*chunks_t +j]
+                        slice = slices[i*chunks_v +j]
                         res.append((Channel(
                         metadata=self.metadata,
                         data = slice,
@@ -98,19 +166,3 @@ class Channel:
                             longitude=self.shape.longitude)),
                     f".t{i+1}of{chunks_t}.v{j+1}of{chunks_v}"))
                 return res
-
-
-
-    def __convert_tile(self,
-                       vertical:int,
-                       time:int,
-                       nan_encoding:int,
-                       threshold:float) -> Tuple[np.ndarray,Tuple[float,float]]:
-        
-        min,max = bounds(arr=self.data[vertical,time,:,:],threshold=threshold)
-        normalized = normalize(input=self.data[vertical,time,:,:],min = min, max = max )
-        if nan_encoding == 0 :
-            normalized = normalized * 254 + 1
-        else :
-            normalized = normalized * 254
-        return normalized,(min,max)
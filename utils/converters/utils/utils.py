@@ -69,6 +69,157 @@ def reject_outliers(data, m):
     s = d/mdev if mdev else np.zeros(len(d))
     return data[s<m]
 
+"""
+    median of every tile along the last axis, nan values are ignored.
+    the result is the same as np.median applied on the non nan values of each tile
+    param :
+        tiles : ndarray (..., n)
+    return :
+        ndarray (...)
+"""
+def nanmedian_tiles(tiles : np.ndarray) -> np.ndarray:
+    valid = np.count_nonzero(~np.isnan(tiles), axis=-1)
+    flat = tiles.reshape(-1, tiles.shape[-1])
+    counts = valid.reshape(-1)
+    medians = np.full(counts.shape, np.nan, dtype=tiles.dtype)
+    # tiles sharing the same number of values (e.g. the same land sea mask) are partitioned together
+    for count in np.unique(counts):
+        if count == 0 :
+            continue
+        rows = counts == count
+        values = flat[rows]
+        values = values[~np.isnan(values)].reshape(-1, count)
+        high = count//2
+        part = np.partition(values, high, axis=-1)
+        if count % 2 == 1 :
+            medians[rows] = part[:,high]
+        else :
+            medians[rows] = (np.max(part[:,:high], axis=-1) + part[:,high])/2
+    return medians.reshape(valid.shape)
+
+"""
+    batched version of reject_outliers, for every tile along the last axis
+    param :
+        tiles : ndarray (..., n) with nan values for missing data
+        m : float
+    return :
+        ndarray of bool (..., n), True for the values that are kept
+"""
+def reject_outliers_tiles(tiles : np.ndarray, m : float) -> np.ndarray:
+    d = np.abs(tiles - nanmedian_tiles(tiles)[...,None])
+    mdev = nanmedian_tiles(d)[...,None]
+    s = np.divide(d, mdev, out=np.zeros_like(d), where=mdev != 0)
+    return s < m
+
+"""
+    min and max values of the kept values of every tile along the last axis
+    param :
+        tiles : ndarray (..., n)
+        keep : ndarray of bool (..., n)
+    return :
+        tuple of ndarray (...) (contains the min and max values of each tile, and True for the tiles without values)
+"""
+def kept_bounds_tiles(tiles : np.ndarray, keep : np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    empty = ~keep.any(axis=-1)
+    mins = np.min(np.where(keep, tiles, np.inf), axis=-1)
+    maxs = np.max(np.where(keep, tiles, -np.inf), axis=-1)
+    mins[empty] = 0
+    maxs[empty] = 0
+    return mins,maxs,empty
+
+"""
+    batched calcul of the min and max values of every (latitude,longitude) tile.
+    give the same result as bounds called on each tile
+    param :
+        data : ndarray (..., latitude, longitude)
+        threshold : float
+    return :
+        tuple of ndarray (...) (contains the min and max values of each tile, and True for the tiles without values)
+"""
+def bounds_tiles(data : np.ndarray, threshold : float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    tiles = data.reshape(*data.shape[:-2], -1)
+    keep = ~np.isnan(tiles)
+    if threshold is not None :
+        keep &= reject_outliers_tiles(tiles, threshold)
+    return kept_bounds_tiles(tiles, keep)
+
+"""
+    calcul of the min and max values of every (latitude,longitude) tile,
+    one tile at a time with bounds
+    param :
+        data : ndarray (..., latitude, longitude)
+        threshold : float
+    return :
+        tuple of ndarray (...) (contains the min and max values of each tile, and True for the tiles without values)
+"""
+def bounds_per_tile(data : np.ndarray, threshold : float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    tiles = data.reshape(-1, data.shape[-2] * data.shape[-1])
+    mins = np.zeros(tiles.shape[0], dtype=data.dtype)
+    maxs = np.zeros(tiles.shape[0], dtype=data.dtype)
+    empty = np.zeros(tiles.shape[0], dtype=bool)
+    for i,tile in enumerate(tiles):
+        arr_clean = reject_outliers(tile[~np.isnan(tile)], threshold)
+        if len(arr_clean) == 0:
+            empty[i] = True
+            continue
+        mins[i],maxs[i] = np.min(arr_clean),np.max(arr_clean)
+    shape = data.shape[:-2]
+    return mins.reshape(shape),maxs.reshape(shape),empty.reshape(shape)
+
+"""
+    normalize every (latitude,longitude) tile with its bounds and quantize the result to uint8,
+    rounded to the nearest integer. the values are scaled in place in a single buffer of the
+    data dtype and written directly as uint8. like normalize, a tile with min == max is left as is
+    param :
+        data : ndarray (..., latitude, longitude)
+        mins : ndarray (...)
+        maxs : ndarray (...)
+        nan_encoding : int
+    return :
+        ndarray of uint8 (..., latitude, longitude)
+"""
+def quantize_tiles(data : np.ndarray, mins : np.ndarray, maxs : np.ndarray, nan_encoding : int) -> np.ndarray:
+    span = (maxs - mins)[...,None,None]
+    offsets = np.where(span != 0, mins[...,None,None], 0).astype(data.dtype)
+    scales = np.divide(254, span, out=np.full(span.shape, 254, dtype=np.float64), where=span != 0).astype(data.dtype)
+    nan = np.isnan(data)
+    
+    scaled = np.subtract(data, offsets)
+    scaled *= scales
+    low,high = (1,255) if nan_encoding == 0 else (0,254)
+    if nan_encoding == 0 :
+        scaled += 1
+    np.clip(scaled, low, high, out=scaled)
+    np.rint(scaled, out=scaled)
+    scaled[nan] = nan_encoding
+    
+    output = np.empty(data.shape, dtype=np.uint8)
+    np.copyto(output, scaled, casting='unsafe')
+    return output
+
+"""
+    normalize every (latitude,longitude) tile with its bounds and quantize the result to uint8
+    with the former float64 conversion, the values are truncated.
+    give the same bytes as normalize and clean called on each tile
+    param :
+        data : ndarray (..., latitude, longitude)
+        mins : ndarray (...)
+        maxs : ndarray (...)
+        nan_encoding : int
+    return :
+        ndarray of uint8 (..., latitude, longitude)
+"""
+def legacy_quantize_tiles(data : np.ndarray, mins : np.ndarray, maxs : np.ndarray, nan_encoding : int) -> np.ndarray:
+    mins = mins[...,None,None]
+    span = (maxs[...,None,None] - mins)
+    # like normalize, a tile with min == max is left as is
+    normalized = np.divide(data - mins, span, out=data.copy(), where=span != 0)
+    # the scaling is done in float64 like the masked arrays returned by netCDF4
+    scaled = np.multiply(normalized, 254, dtype=np.float64)
+    if nan_encoding == 0 :
+        scaled += 1
+    return clean(scaled, nan_encoding=nan_encoding).astype(np.uint8)
+
 """
     enum Mode for creating an image, with the number of channels as value
 """
@@ -88,12 +239,33 @@ class Mode(Enum):
         raise NumberOfChannelException(f"Incorrect number of channels : {n} must be between 1 and 4")
          
          
+"""
+    enum BoundsEngine, algorithm used to compute the bounds of each tile :
+        exact : median and median absolute distance of each tile, one tile at a time
+        partition : same result as exact, for all the tiles at once with np.partition
+"""
+class BoundsEngine(Enum):
+    EXACT = 'exact'
+    PARTITION = 'partition'
+    
+
 class Extension(Enum):
     PNG = 'png'
     WEBP = 'webp'
     BMP = 'bmp'
     JPEG = 'jpeg'
     TGA = 'tga'
+
+"""
+    enum EncodingProfile, trade-off between the encoding time and the size of the png and webp images :
+        fast : low compression effort, for the development runs
+        balanced : default options of the encoders, the same images as without a profile
+        smallest : highest compression effort, for the published archive
+"""
+class EncodingProfile(Enum):
+    FAST = 'fast'
+    BALANCED = 'balanced'
+    SMALLEST = 'smallest'
     
     
 @dataclass
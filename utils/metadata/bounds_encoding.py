@@ -0,0 +1,87 @@
+from enum import Enum
+import base64
+from typing import Union
+import numpy as np
+
+# to increase when the binary layout of the bounds changes
+BOUNDS_FORMAT_VERSION = 1
+
+"""
+    enum BoundsEncoding, representation of the bounds matrices in the metadata :
+        json : nested lists of {"min" : str, "max" : str}, one per tile
+        binary : float32 array of shape (vertical, time, 2), little endian and base64 packed
+"""
+class BoundsEncoding(Enum):
+    JSON = 'json'
+    BINARY = 'binary'
+
+
+"""
+    float32 array of shape (vertical, time, 2) of a bounds matrix, the last axis
+    holding the min and the max of each tile
+    param :
+        bounds_matrix : list (vertical,time) of {"min" : str, "max" : str}
+    return :
+        ndarray of float32 (vertical, time, 2)
+"""
+def bounds_array(bounds_matrix:list) -> np.ndarray:
+    return np.array([[(float(e["min"]),float(e["max"])) for e in row] for row in bounds_matrix],dtype='<f4')\
+        .reshape(len(bounds_matrix),-1,2)
+
+"""
+    pack a bounds matrix with its format version
+    param :
+        bounds_matrix : list (vertical,time) of {"min" : str, "max" : str}
+    return :
+        dict
+"""
+def encode_bounds(bounds_matrix:list) -> dict:
+    return pack_bounds(bounds_array(bounds_matrix))
+
+"""
+    pack a bounds array with its format version
+    param :
+        array : ndarray (vertical, time, 2)
+    return :
+        dict
+"""
+def pack_bounds(array:np.ndarray) -> dict:
+    array = np.ascontiguousarray(array,dtype='<f4')
+    return {
+        "version" : BOUNDS_FORMAT_VERSION,
+        "dtype" : "float32",
+        "shape" : list(array.shape),
+        "data" : base64.b64encode(array.tobytes()).decode("ascii")
+    }
+
+"""
+    unpack the bounds of the metadata, whatever their encoding
+    param :
+        bounds : Union[dict,list]
+    return :
+        ndarray of float32 (vertical, time, 2)
+"""
+def decode_bounds(bounds:Union[dict,list]) -> np.ndarray:
+    if type(bounds) is list:
+        return bounds_array(bounds)
+    if bounds.get("version") != BOUNDS_FORMAT_VERSION:
+        raise ValueError(f"unsupported bounds format version {bounds.get('version')}")
+    return np.frombuffer(base64.b64decode(bounds["data"]),dtype='<f4').reshape(bounds["shape"])
+
+"""
+    bounds matrix in the json form from the bounds of the metadata, whatever their encoding
+    param :
+        bounds : Union[dict,list]
+    return :
+        list (vertical,time) of {"min" : str, "max" : str}
+"""
+def bounds_matrix(bounds:Union[dict,list]) -> list:
+    if type(bounds) is list:
+        return bounds
+    return [[{"min" : str(min), "max" : str(max)} for min,max in row] for row in decode_bounds(bounds)]
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
@@ -3,6 +3,7 @@ from PIL.PngImagePlugin import PngInfo
 from typing import Dict, Union, List, Any, Callable
 import json
 from utils.variables.info import Info
+from utils.metadata.bounds_encoding import BoundsEncoding, encode_bounds
 
 """
     Data Class VariableSpecificMetadata
@@ -24,6 +25,7 @@ class VariableSpecificMetadata:
     original_yinc : str=None
     bounds_matrix_ts : list = None             #min and max values for each variable and dimension
     bounds_matrix_avg : list = None
+    bounds_encoding : str = None               #json or binary (see bounds_encoding.py), json when None
     
     """
         function that sets values to attributes
@@ -42,7 +44,12 @@ class VariableSpecificMetadata:
         return : dict
     """
     def to_dict(self) -> dict:
-        return dict(self.__dict__.copy())
+        res = dict(self.__dict__.copy())
+        if self.bounds_encoding == BoundsEncoding.BINARY.value:
+            for key in ("bounds_matrix_ts","bounds_matrix_avg"):
+                if res[key] is not None:
+                    res[key] = encode_bounds(res[key])
+        return res
     
     """
         function that initializes a VariableSpecificMetadata object
@@ -82,6 +89,7 @@ class GeneralMetadata:
     version : str = None    #TODO version of netcdf2image converter used
     nan_value_encoding :int= None   #value in image that replace nan values (0 or 255)
     threshold :int= None            #threshold used to normalize input
+    bounds_engine : str = None      #algorithm used to compute the bounds (exact or partition)
 
     """
         function that sets values to attributes
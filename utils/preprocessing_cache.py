@@ -0,0 +1,219 @@
+import hashlib
+import os
+import os.path as path
+import shutil
+import sqlite3
+import time
+from typing import Any, List
+from utils.build_manifest import files_fingerprint
+from utils.import_cdo import cdo
+from utils.logger import Logger
+
+# to increase when the keys change, the entries of another version are ignored
+PREPROCESSING_CACHE_VERSION = 1
+
+"""
+    place a copy of file at destination, with a hard link when possible (the cache is only
+    used for the outputs on its filesystem, the copy is left for the filesystems without links)
+    param :
+        file : str
+        destination : str
+    return :
+        None
+"""
+def place(file:str,destination:str):
+    if path.exists(destination):
+        os.remove(destination)
+    try :
+        os.link(file,destination)
+    except OSError:
+        shutil.copyfile(file,destination)
+
+""" class PreprocessingCache, size bounded directory of cdo outputs, the least recently used are evicted first """
+class PreprocessingCache:
+    def __init__(self):
+        self.directory = None
+        self.max_size = 0
+        # size of the entries, read from the index when connecting and followed by the puts of this process
+        self.total = 0
+        # input files made from other files (merged or concatenated), fingerprinted by their sources
+        self.sources = {}
+        self.__connection = None
+        self.__pid = None
+
+    """
+        use the given directory for the following calls of cdo, a maximal size of 0 disables the cache
+        param :
+            directory : str
+            max_size : int (bytes)
+        return :
+            None
+    """
+    def mount(self,directory:str,max_size:int):
+        self.unmount()
+        if max_size <= 0:
+            return
+        if not path.isdir(directory):
+            os.makedirs(directory,exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+
+    def unmount(self):
+        if self.__connection is not None and self.__pid == os.getpid():
+            self.__connection.close()
+        self.__connection = None
+        self.directory = None
+        self.max_size = 0
+        self.total = 0
+        self.sources = {}
+
+    """
+        connection to the index of the cache, a new connection is opened in a forked process
+        param :
+            None
+        return :
+            sqlite3.Connection
+    """
+    def connection(self) -> sqlite3.Connection:
+        if self.__connection is None or self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(path.join(self.directory,"index.db"),timeout=60)
+            self.__pid = os.getpid()
+            with self.__connection:
+                self.__connection.execute("""CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER,
+                    last_used REAL)""")
+            self.total = self.__connection.execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+        return self.__connection
+
+    """
+        register the files a temporary input file is made from, so its cdo outputs
+        can be reused by the next runs which make it again
+        param :
+            file : str
+            sources : List[str]
+        return :
+            None
+    """
+    def source(self,file:str,sources:List[str]):
+        self.sources[path.realpath(file)] = list(sources)
+
+    """
+        key of a cdo call : the operator, its arguments and the input chain, in which
+        the files are replaced by their fingerprint
+        param :
+            operator : str
+            arguments : tuple
+            input : str
+        return :
+            str
+    """
+    def key(self,operator:str,arguments:tuple,input:str) -> str:
+        chain = []
+        for token in str(input).split():
+            if path.isfile(token):
+                real = path.realpath(token)
+                chain.append(files_fingerprint(self.sources[real] if real in self.sources else [token]))
+            else :
+                chain.append(token)
+        return hashlib.sha1(repr((PREPROCESSING_CACHE_VERSION,operator,[str(a) for a in arguments],chain)).encode()).hexdigest()
+
+    """
+        file of an entry of the cache
+        param :
+            key : str
+        return :
+            str
+    """
+    def file(self,key:str) -> str:
+        return path.join(self.directory,f"{key}.nc")
+
+    """
+        check if a file can be linked from and to the cache : the outputs written on another
+        filesystem (the scratch in memory) would be copied both ways, they are not cached
+        param :
+            file : str
+        return :
+            bool
+    """
+    def same_filesystem(self,file:str) -> bool:
+        return os.stat(path.dirname(path.abspath(file))).st_dev == os.stat(self.directory).st_dev
+
+    """
+        execute the cdo operator, or reuse its output if the same call was made before
+        param :
+            operator : str
+            *arguments : Any
+            input : str
+            output : str
+        return :
+            str
+    """
+    def cdo(self,operator:str,*arguments:Any,input:str,output:str) -> str:
+        if self.directory is None or not self.same_filesystem(output):
+            getattr(cdo,operator)(*arguments,input=input,output=output)
+            return output
+        key = self.key(operator,arguments,input)
+        entry = self.file(key)
+        with self.connection() as connection:
+            hit = connection.execute("UPDATE entries SET last_used = ? WHERE key = ?",(time.time(),key)).rowcount > 0
+        if hit:
+            try :
+                place(entry,output)
+                Logger.console().debug(f"{operator} of {input} reused from the preprocessing cache","PREPROCESSING")
+                return output
+            except OSError:
+                # evicted by another process in the meantime
+                pass
+
+        getattr(cdo,operator)(*arguments,input=input,output=output)
+        place(output,entry)
+        size = path.getsize(entry)
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO entries (key,size,last_used) VALUES (?,?,?)",\
+                (key,size,time.time()))
+        self.total += size
+        if self.total > self.max_size:
+            self.evict()
+        return output
+
+    """
+        remove the least recently used entries until the cache fits in its maximal size,
+        the total is read again from the index to count the entries of the other processes
+        param :
+            None
+        return :
+            None
+    """
+    def evict(self):
+        with self.connection() as connection:
+            total = connection.execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+            for key,size in connection.execute("SELECT key,size FROM entries ORDER BY last_used ASC").fetchall():
+                if total <= self.max_size:
+                    break
+                connection.execute("DELETE FROM entries WHERE key = ?",(key,))
+                if path.isfile(self.file(key)):
+                    os.remove(self.file(key))
+                total -= size
+        self.total = total
+
+    """
+        size of the entries of the cache
+        param :
+            None
+        return :
+            int (bytes)
+    """
+    def size(self) -> int:
+        if self.directory is None:
+            return 0
+        return self.connection().execute("SELECT COALESCE(SUM(size),0) FROM entries").fetchone()[0]
+
+
+PREPROCESSING = PreprocessingCache()
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
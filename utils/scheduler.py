@@ -0,0 +1,33 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Any, Callable, List
+
+# task executed by the forked processes, inherited from the parent process
+__task = None
+
+def run(item:Any) -> Any:
+    return __task(item)
+
+"""
+    execute the task for every item and return the results in the order of the items.
+    with one job the items are processed one after another in the current process,
+    otherwise they are spread over a pool of forked processes. the task is inherited
+    by the processes so it can use any object of the parent, but the items and
+    the results must be picklable
+    param :
+        task : Callable
+        items : List[Any]
+        jobs : int
+    return :
+        List[Any]
+"""
+def schedule(task:Callable[[Any],Any],items:List[Any],jobs:int) -> List[Any]:
+    global __task
+    if jobs is None or jobs <= 1 or len(items) <= 1:
+        return [task(item) for item in items]
+    __task = task
+    try :
+        with ProcessPoolExecutor(max_workers=min(jobs,len(items)),mp_context=multiprocessing.get_context("fork")) as executor:
+            return list(executor.map(run,items))
+    finally :
+        __task = None
@@ -21,7 +21,89 @@ YYYY-MM-DD hh:mm:ss  YYYY-MM-DD hh:mm:ss  YYYY-MM-DD hh:mm:ss  YYYY-MM-DD hh:mm:
 """
 
 from dataclasses import dataclass, field
+from datetime import timedelta
+from enum import Enum
+import re
 from typing import List,Union,Set,Callable,Tuple,Dict,Type
+import cftime
+import numpy as np
+
+"""
+    enum InfoBackend, how the Info of a file is retrieved :
+        cdo : parse the output of cdo sinfo
+        netcdf : read the dimensions and coordinates of the netCDF4 header
+"""
+class InfoBackend(Enum):
+    CDO = 'cdo'
+    NETCDF = 'netcdf'
+
+"""
+    enum RegridEngine, how a grid is resized to another resolution :
+        cdo : remapnn of the netCDF file with cdo
+        nearest : nearest neighbour remapping of the loaded data with numpy
+        bilinear : bilinear remapping of the loaded data with numpy
+"""
+class RegridEngine(Enum):
+    CDO = 'cdo'
+    NEAREST = 'nearest'
+    BILINEAR = 'bilinear'
+
+"""
+    enum VerticalEngine, how the desired levels are selected :
+        cdo : sellevidx of the netCDF file with cdo
+        numpy : slice of the loaded data, without intermediate file
+"""
+class VerticalEngine(Enum):
+    CDO = 'cdo'
+    NUMPY = 'numpy'
+
+LONGITUDE_UNITS = ("degrees_east","degree_east","degree_e","degrees_e","degreee","degreese")
+LATITUDE_UNITS = ("degrees_north","degree_north","degree_n","degrees_n","degreen","degreesn")
+DATE_FORMAT = "YYYY-MM-DD hh:mm:ss"
+
+"""
+    round a value to the number of significant digits printed by cdo,
+    7 for single precision and 15 for double precision coordinates
+    param :
+        value : float
+        dtype : np.dtype
+    return :
+        float
+"""
+def cdo_float(value:float,dtype) -> float:
+    digits = 15 if dtype == np.float64 else 7
+    return float(f"{value:.{digits}g}")
+
+"""
+    increment of regularly spaced values like cdo computes it, 0 if the values are not regular
+    param :
+        values : ndarray
+    return :
+        float
+"""
+def increment(values:np.ndarray) -> float:
+    if len(values) < 2:
+        return 0
+    inc = (values[-1] - values[0])/(len(values) - 1)
+    if np.any(np.abs(np.abs(np.diff(values)) - abs(inc)) > 0.01 * abs(inc)):
+        return 0
+    return inc
+
+"""
+    values of a coordinate variable as float64, None if there is no coordinate variable
+    param :
+        dataset : Dataset
+        name : str
+    return :
+        Tuple[ndarray,str,np.dtype]
+"""
+def coordinate(dataset,name:str):
+    if name not in dataset.variables or len(dataset.variables[name].dimensions) != 1:
+        return None,"",None
+    variable = dataset.variables[name]
+    values = np.ma.filled(variable[:].astype(np.float64),np.nan)
+    units = variable.units if "units" in variable.ncattrs() else ""
+    return values,str(units),variable.dtype
 
 """ class Axis """
 @dataclass(eq=True)
@@ -69,6 +151,29 @@ class Axis:
 
         return Axis(bounds=bounds, direction=direction, name=name, step=step)
 
+    """
+        axis of a coordinate variable of a netCDF4 dataset,
+        gives the same result as parse on the cdo sinfo output
+        param :
+            dataset : Dataset
+            name : str (name of the dimension)
+        return :
+            Axis
+    """
+    @staticmethod
+    def from_dataset(dataset,name:str):
+        values,units,dtype = coordinate(dataset,name)
+        if values is None or len(values) < 2:
+            return Axis(name=name,bounds=None,step=None,direction=None)
+        bounds = (cdo_float(values[0],dtype),cdo_float(values[-1],dtype))
+        inc = increment(values)
+        step = None
+        direction = None
+        if inc != 0 and units != "":
+            step = cdo_float(inc,dtype)
+            direction = units.split()[0]
+        return Axis(name=name,bounds=bounds,step=step,direction=direction)
+
 """ class Grid """  
 @dataclass(eq=True)
 class Grid:
@@ -115,6 +220,47 @@ class Grid:
         axis = (Axis.parse(src[cursor+1]),Axis.parse(src[cursor+2]))
         return Grid(category=category,axis=axis,points=points)
 
+    """
+        grid of the longitude and latitude dimensions of a netCDF4 dataset
+        param :
+            dataset : Dataset
+            x : str
+            y : str
+        return :
+            Grid
+    """
+    @staticmethod
+    def from_dataset(dataset,x:str,y:str):
+        xsize = len(dataset.dimensions[x])
+        ysize = len(dataset.dimensions[y])
+        axis = (Axis.from_dataset(dataset,x),Axis.from_dataset(dataset,y))
+        
+        category = "generic"
+        _,xunits,_ = coordinate(dataset,x)
+        yvalues,yunits,_ = coordinate(dataset,y)
+        if xunits.lower() in LONGITUDE_UNITS and yunits.lower() in LATITUDE_UNITS:
+            category = "lonlat"
+            if axis[1].step is None and Grid.is_gaussian(yvalues):
+                category = "gaussian"
+        return Grid(category=category,points=(xsize*ysize,(xsize,ysize)),axis=axis)
+
+    """
+        check if latitudes are the latitudes of a gaussian grid
+        param :
+            latitudes : ndarray
+        return :
+            bool
+    """
+    @staticmethod
+    def is_gaussian(latitudes:np.ndarray) -> bool:
+        n = len(latitudes)
+        if n <= 2:
+            return False
+        gaussian = np.degrees(np.arcsin(np.polynomial.legendre.leggauss(n)[0]))
+        if latitudes[0] > latitudes[-1]:
+            gaussian = gaussian[::-1]
+        return bool(np.all(np.abs(gaussian - latitudes) <= abs(latitudes[0] - latitudes[1])/500))
+
 @dataclass(eq=True, frozen=True)
 class Vertical:
     category : str = None
@@ -169,6 +315,45 @@ class Vertical:
             bounds = None
             unit = None
         return Vertical(category=category,name=name,levels=levels,bounds=bounds,unit=unit)
+
+    """
+        vertical of a dimension of a netCDF4 dataset, the category is not derived
+        from the coordinate and is always generic
+        param :
+            dataset : Dataset
+            name : str
+        return :
+            Vertical
+    """
+    @staticmethod
+    def from_dataset(dataset,name:str):
+        levels = len(dataset.dimensions[name])
+        values,units,dtype = coordinate(dataset,name)
+        if values is None:
+            # cdo numbers the levels of a dimension without coordinate
+            values,units,dtype = np.arange(1,levels+1,dtype=np.float64),"",np.float64
+        return Vertical.from_values(name,values,units,dtype)
+
+    """
+        vertical of the given levels, like cdo sinfo describes them
+        param :
+            name : str
+            values : ndarray
+            units : str
+            dtype : np.dtype
+        return :
+            Vertical
+    """
+    @staticmethod
+    def from_values(name:str,values:np.ndarray,units:str,dtype):
+        levels = len(values)
+        if levels < 2:
+            return Vertical(category="generic",name=name,levels=levels,bounds=None,unit=None)
+        bounds = (cdo_float(values[0],dtype),cdo_float(values[-1],dtype))
+        unit = None
+        if increment(values) == 0 and units != "" and "level" not in units.split():
+            unit = units.split()[0]
+        return Vertical(category="generic",name=name,levels=levels,bounds=bounds,unit=unit)
     
 """ class Time """
 @dataclass(eq=True, frozen=True)
@@ -200,6 +385,56 @@ class Time:
                     timestamps.append(date)
             return Time(name=tmp[0],step=int(tmp[-2]), timestamps= timestamps, ref = tmp2, format= format)
         return Time(name=tmp[0],step=int(tmp[-2]), timestamps= timestamps, ref =None, format= None)
+
+    """
+        time of a dimension of a netCDF4 dataset, the timestamps are decoded
+        when the time is relative to a reference date
+        param :
+            dataset : Dataset
+            name : str
+        return :
+            Time
+    """
+    @staticmethod
+    def from_dataset(dataset,name:str):
+        step = len(dataset.dimensions[name])
+        values,units,_ = coordinate(dataset,name)
+        match = re.match(r"\s*(\w+)\s+since\s+(-?\d+)-(\d+)-(\d+)(?:[ T]+(\d+):(\d+)(?::(\d+))?)?",units)
+        if values is None or match is None:
+            return Time(name=name,step=step,timestamps=[],ref=None,format=None)
+        unit,year,month,day,hour,minute,second = match.groups()
+        year,month,day = int(year),int(month),int(day)
+        hour,minute,second = (int(v) if v is not None else 0 for v in (hour,minute,second))
+        ref = f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
+        
+        variable = dataset.variables[name]
+        calendar = str(variable.calendar) if "calendar" in variable.ncattrs() else "standard"
+        # like cdo, the calendars 360, 365 and 366 are read as 360_day, 365_day and 366_day
+        if calendar[:3] in ("360","365","366"):
+            calendar = f"{calendar[:3]}_day"
+        try :
+            # a reference month 0 is the last month of the previous year
+            # and a reference day 0 (e.g. 1850-12-00) is the day before the first day of the month
+            ref_year,ref_month = (year - 1,12) if month == 0 else (year,month)
+            dates = cftime.num2date(values,f"{unit} since {ref_year:04d}-{ref_month:02d}-{max(day,1):02d} {hour:02d}:{minute:02d}:{second:02d}",\
+                calendar=calendar,only_use_cftime_datetimes=True)
+            shift = timedelta(days=1 if day == 0 else 0)
+            timestamps = [Time.timestamp(date - shift) for date in np.atleast_1d(dates)]
+        except Exception :
+            timestamps = []
+        return Time(name=name,step=step,timestamps=timestamps,ref=ref,format=DATE_FORMAT)
+
+    """
+        format a date like cdo, rounded to the second
+        param :
+            date : cftime.datetime
+        return :
+            str
+    """
+    @staticmethod
+    def timestamp(date) -> str:
+        date = date + timedelta(microseconds=500000)
+        return f"{date.year:04d}-{date.month:02d}-{date.day:02d} {date.hour:02d}:{date.minute:02d}:{date.second:02d}"
     
 """ class Info """
 @dataclass
@@ -363,6 +598,65 @@ class Info:
         time = Info.parseTime(src)
         return Info(grids=grids,verticals=verticals,time=time)
 
+    """
+        retrieve the time dimension of a netCDF4 dataset : the unlimited dimension
+        or a dimension with a time coordinate
+        param :
+            dataset : Dataset
+        return :
+            Union[str,None]
+    """
+    @staticmethod
+    def time_dimension(dataset) -> Union[str,None]:
+        for name,dimension in dataset.dimensions.items():
+            if dimension.isunlimited():
+                return name
+        for name in dataset.dimensions:
+            if name not in dataset.variables:
+                continue
+            variable = dataset.variables[name]
+            attributes = {key:str(variable.getncattr(key)) for key in variable.ncattrs()}
+            if " since " in attributes.get("units","") or attributes.get("axis","") == "T"\
+                or attributes.get("standard_name","") == "time":
+                return name
+        return None
+
+    """
+        build the Info of a netCDF4 dataset from its dimensions and coordinates,
+        without cdo. one grid is built for every pair of (latitude,longitude) dimensions
+        and one vertical for every other dimension of the data variables, in the order of the variables
+        param :
+            dataset : Dataset
+        return :
+            Info
+    """
+    @staticmethod
+    def from_dataset(dataset) -> 'Info':
+        time_name = Info.time_dimension(dataset)
+        bounds = set()
+        for variable in dataset.variables.values():
+            for key in ("bounds","climatology"):
+                if key in variable.ncattrs():
+                    bounds.add(str(variable.getncattr(key)))
+        
+        grids = {}
+        verticals = {}
+        for name,variable in dataset.variables.items():
+            if name in dataset.dimensions or name in bounds:
+                continue
+            dimensions = [dimension for dimension in variable.dimensions if dimension != time_name]
+            if len(dimensions) < 2:
+                continue
+            y,x = dimensions[-2:]
+            if (x,y) not in grids:
+                grids[(x,y)] = Grid.from_dataset(dataset,x,y)
+            for dimension in dimensions[:-2]:
+                if dimension not in verticals:
+                    verticals[dimension] = Vertical.from_dataset(dataset,dimension)
+        
+        time = None if time_name is None else Time.from_dataset(dataset,time_name)
+        return Info(grids=list(grids.values()),verticals=list(verticals.values()),time=time)
+
 
 if __name__ == "__main__":
     print("Cannot execute in main")
@@ -0,0 +1,180 @@
+import os
+import os.path as path
+import pickle
+import sqlite3
+from typing import List, Union
+from netCDF4 import Dataset
+from utils.import_cdo import cdo
+from utils.logger import Logger
+from utils.variables.info import Info, InfoBackend
+
+# to increase when the Info classes change, the entries of another version are ignored
+CACHE_VERSION = 1
+
+""" class InfoCache, sqlite table mapping a file fingerprint and a backend to the Info of the file """
+class InfoCache:
+    def __init__(self,file:str):
+        self.file = file
+        self.__connection = None
+        self.__pid = None
+
+    """
+        connection to the database, a new connection is opened in a forked process
+        param :
+            None
+        return :
+            sqlite3.Connection
+    """
+    def connection(self) -> sqlite3.Connection:
+        if self.__connection is None or self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(self.file,timeout=60)
+            self.__pid = os.getpid()
+            with self.__connection:
+                columns = [row[1] for row in self.__connection.execute("PRAGMA table_info(info)")]
+                if len(columns) > 0 and "backend" not in columns:
+                    self.__connection.execute("DROP TABLE info")
+                self.__connection.execute("""CREATE TABLE IF NOT EXISTS info (
+                    path TEXT,
+                    backend TEXT,
+                    size INTEGER,
+                    mtime INTEGER,
+                    version INTEGER,
+                    info BLOB,
+                    PRIMARY KEY (path,backend))""")
+        return self.__connection
+
+    """
+        fingerprint of a file : its real path, its size and its modification time
+        param :
+            file : str
+        return :
+            Tuple[str,int,int]
+    """
+    @staticmethod
+    def fingerprint(file:str):
+        stat = os.stat(file)
+        return path.realpath(file),stat.st_size,stat.st_mtime_ns
+
+    """
+        retrieve the Info of a file if the file did not change since it was stored
+        param :
+            file : str
+            backend : InfoBackend
+        return :
+            Union[Info,None]
+    """
+    def get(self,file:str,backend:InfoBackend = InfoBackend.CDO) -> Union[Info,None]:
+        key,size,mtime = InfoCache.fingerprint(file)
+        row = self.connection().execute("SELECT info FROM info WHERE path = ? AND backend = ? AND size = ? AND mtime = ? AND version = ?",\
+            (key,backend.value,size,mtime,CACHE_VERSION)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    """
+        store the Info of a file
+        param :
+            file : str
+            info : Info
+            backend : InfoBackend
+        return :
+            None
+    """
+    def put(self,file:str,info:Info,backend:InfoBackend = InfoBackend.CDO):
+        key,size,mtime = InfoCache.fingerprint(file)
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO info (path,backend,size,mtime,version,info) VALUES (?,?,?,?,?,?)",\
+                (key,backend.value,size,mtime,CACHE_VERSION,pickle.dumps(info)))
+
+    """
+        remove the entries of the files which no longer exist
+        param :
+            None
+        return :
+            int (the number of entries removed)
+    """
+    def prune(self) -> int:
+        with self.connection() as connection:
+            gone = [(key,) for key, in connection.execute("SELECT DISTINCT path FROM info") if not path.exists(key)]
+            connection.executemany("DELETE FROM info WHERE path = ?",gone)
+        return len(gone)
+
+    def close(self):
+        if self.__connection is not None and self.__pid == os.getpid():
+            self.__connection.close()
+        self.__connection = None
+
+
+__cache = None
+__backend = InfoBackend.CDO
+__volatile = []
+
+"""
+    use the cache stored in file and the given backend for the following calls of load_info.
+    the files in the volatile directories (the intermediate files, made again with a new
+    modification time by every run) are not cached, and the entries of the files removed
+    since the last run are pruned
+    param :
+        file : str
+        backend : InfoBackend
+        volatile : List[str]
+    return :
+        None
+"""
+def mount(file:str,backend:InfoBackend = InfoBackend.CDO,volatile:List[str] = []):
+    global __cache,__backend,__volatile
+    unmount()
+    __cache = InfoCache(file)
+    __backend = backend
+    __volatile = [path.join(path.realpath(directory),"") for directory in volatile]
+    pruned = __cache.prune()
+    if pruned > 0:
+        Logger.console().debug(f"{pruned} files removed from the info cache","INFO CACHE")
+
+def unmount():
+    global __cache,__backend,__volatile
+    if __cache is not None:
+        __cache.close()
+    __cache = None
+    __backend = InfoBackend.CDO
+    __volatile = []
+
+"""
+    Info of a file with the given backend, cdo is used when the netCDF4 header can not be read
+    param :
+        file : str
+        backend : InfoBackend
+    return :
+        Info
+"""
+def read_info(file:str,backend:InfoBackend) -> Info:
+    if backend == InfoBackend.NETCDF:
+        try :
+            with Dataset(file,"r",format="NETCDF4") as dataset:
+                return Info.from_dataset(dataset)
+        except Exception as e:
+            Logger.console().warning(f"could not read the header of {file} : {e}, using cdo sinfo instead")
+    return Info.parse(cdo.sinfo(input=file))
+
+"""
+    Info of a file, read from the cache when the file did not change, read with
+    the mounted backend otherwise
+    param :
+        file : str
+    return :
+        Info
+"""
+def load_info(file:str) -> Info:
+    if __cache is None or path.realpath(file).startswith(tuple(__volatile)):
+        return read_info(file,__backend)
+    info = __cache.get(file,__backend)
+    if info is None:
+        info = read_info(file,__backend)
+        __cache.put(file,info,__backend)
+    return info
+
+
+if __name__ == "__main__":
+    print("Cannot execute in main")
+    import sys
+    sys.exit(1)
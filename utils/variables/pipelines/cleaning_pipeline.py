@@ -1,6 +1,7 @@
-from typing import Tuple
+from typing import Iterator, List, Tuple
 from utils.variables.info import Info
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from netCDF4 import Dataset
 import numpy as np
 from utils.logger import _Logger
 
@@ -21,19 +22,26 @@ class DataAxis:
             np.ndarray
     """
     def flip(self,bounds : Tuple[int,int], data : np.ndarray,logger,increasing = True) -> np.ndarray :
-        if not (np.nanmin(self.data) >= bounds[0] and np.nanmax(self.data) <= bounds[1]):
+        if self.flipped(bounds,increasing):
+            logger.warning("flip axis of data", "FLIP")
+            return np.flip(data,self.index)
+        return data
+    
+    """
+        check if the axis is between the given bounds and if the data must be flipped
+        param :
+            bounds : Tuple[int,int],
+            increasing : bool = True by default
+        return :
+            bool
+    """
+    def flipped(self,bounds : Tuple[int,int],increasing = True) -> bool :
+        axis = self.data[:]
+        if not (np.nanmin(axis) >= bounds[0] and np.nanmax(axis) <= bounds[1]):
             raise Exception(f"Axis should be between {bounds[0]} and {bounds[1]}")
-            
         if increasing:
-            if not np.any(self.data[:-1] < self.data[1:]) :
-                logger.warning("flip axis of data", "FLIP")
-                return np.flip(data,self.index)
-            return data
-        else :
-            if not np.any(self.data[:-1] > self.data[1:]) :
-                logger.warning("flip axis of data", "FLIP")
-                return np.flip(data,self.index)
-            return data
+            return not np.any(axis[:-1] < axis[1:])
+        return not np.any(axis[:-1] > axis[1:])
             
  
 @dataclass               
@@ -44,6 +52,12 @@ class CleaningPipeline:
     longitude : DataAxis
     time : DataAxis
     vertical : DataAxis
+    # read lazily in chunks of chunk_size time steps when chunk_size > 0, see TimeChunks
+    variable : object = None
+    approved : List[str] = None
+    chunk_size : int = 0
+    # indexes of the vertical levels kept, in their order, None to keep every level
+    levels : np.ndarray = None
     """
         execute cleaning pipeline :
             - flip the latitude if needed
@@ -60,6 +74,104 @@ class CleaningPipeline:
         data = self.reorder(data)
         
         return data
+    """
+        check if the variable is read in chunks of time steps, the time must be
+        the first axis of the cleaned data or the second one after the vertical
+        param :
+            
+        return :
+            bool
+    """
+    def chunked(self) -> bool :
+        return self.chunk_size > 0 and self.variable is not None and self.time.index is not None \
+            and self.time_axis() == len(self.approved) - 3
+    
+    """
+        check which horizontal axes of the data must be flipped
+        param :
+            
+        return :
+            Tuple[bool,bool]
+            (flip of the latitude, flip of the longitude)
+    """
+    def flips(self) -> Tuple[bool,bool] :
+        return self.latitude.flipped((-90,90),increasing=False),self.longitude.flipped((-180,180),increasing=True)
+    
+    """
+        read and clean the given time steps of the variable like the whole variable : removal
+        of the unnecessary dimensions, thresholding of the fill value, flips and reorder
+        param :
+            time_steps : slice
+            flips : Tuple[bool,bool], as returned by flips
+        return :
+            np.ndarray
+    """
+    def exec_time_steps(self,time_steps:slice,flips:Tuple[bool,bool]) -> np.ndarray :
+        flip_latitude,flip_longitude = flips
+        chunk = self.read(time_steps)
+        if flip_latitude:
+            chunk = np.flip(chunk,self.latitude.index)
+        if flip_longitude:
+            chunk = np.flip(chunk,self.longitude.index)
+        return self.reorder(chunk)
+    
+    """
+        read the variable chunk by chunk along the time axis
+        param :
+            
+        return :
+            Iterator[Tuple[slice,np.ndarray]]
+            (the time steps of the chunk and the cleaned chunk)
+    """
+    def chunks(self) -> Iterator[Tuple[slice,np.ndarray]] :
+        flips = self.flips()
+        if any(flips):
+            self.logger.warning("flip axis of data", "FLIP")
+        steps = self.variable.shape[self.time.index]
+        for start in range(0,steps,self.chunk_size):
+            time_steps = slice(start,min(start + self.chunk_size,steps))
+            yield time_steps,self.exec_time_steps(time_steps,flips)
+    
+    """
+        read the variable, only the kept vertical levels are read from the file,
+        then remove the unnecessary dimensions and threshold the fill value
+        param :
+            time_steps : slice, the time steps read, all of them by default
+        return :
+            np.ndarray
+    """
+    def read(self,time_steps:slice = slice(None)) -> np.ndarray :
+        index = [slice(None)]*len(self.variable.dimensions)
+        if self.time.index is not None:
+            index[self.time.index] = time_steps
+        inverse = None
+        if self.levels is not None and self.vertical.index is not None:
+            # netCDF reads the levels in increasing order, the order and the repeated
+            # levels are restored on the read data
+            unique,inverse = np.unique(self.levels,return_inverse=True)
+            index[self.vertical.index] = unique
+        data = self.variable[tuple(index)]
+        if inverse is not None and not np.array_equal(inverse,np.arange(len(inverse))):
+            data = np.take(data,inverse,axis=self.vertical.index)
+        data = CleaningPipeline.clean(self.variable.group(),self.approved,self.variable,data)
+        return CleaningPipeline.threshold(getattr(self.variable,"_FillValue",None),data)
+    
+    """
+        axis of the time in the cleaned data, following the removal of the
+        unnecessary dimensions and the reorder
+        param :
+            
+        return :
+            int
+    """
+    def time_axis(self) -> int :
+        axes = [i for i,dim in enumerate(self.variable.dimensions) if dim in self.approved]
+        if self.vertical.index is not None and self.time.index < self.vertical.index:
+            axes[self.time.index],axes[self.vertical.index] = axes[self.vertical.index],axes[self.time.index]
+        if self.longitude.index < self.latitude.index:
+            axes[self.longitude.index],axes[self.latitude.index] = axes[self.latitude.index],axes[self.longitude.index]
+        return axes.index(self.time.index)
+    
     """
         reorder the data to correspond to (vertical,time,latitude,longitude)
         param :
@@ -85,8 +197,9 @@ class CleaningPipeline:
     """
     @staticmethod
     def clean(dataset,approved,variable,data) -> np.ndarray:
-        black_list = ((i,dim) for i,dim in enumerate(variable.dimensions) if dim not in approved )
-        for i,rejected in black_list:
+        black_list = [(i,dim) for i,dim in enumerate(variable.dimensions) if dim not in approved ]
+        # from the last dimension so the axes of the remaining ones do not shift
+        for i,rejected in reversed(black_list):
             if dataset.dimensions[rejected].size == 1 :
                 data = np.take(data,0,axis=i)
             else :
@@ -112,14 +225,16 @@ class CleaningPipeline:
             dataset,
             info,
             var_name,
-            logger
+            logger,
+            chunk_size : int, time steps read at once, 0 to read the whole variable,
+                otherwise the data is not read and is left to chunks or TimeChunks
+            levels : np.ndarray, indexes of the vertical levels read, None to read every level
         return :
             CleaningPipeline
     """
     @staticmethod
-    def build(dataset,info:Info,var_name:str,logger:_Logger) -> 'CleaningPipeline':
+    def build(dataset,info:Info,var_name:str,logger:_Logger,chunk_size:int = 0,levels:np.ndarray = None) -> 'CleaningPipeline':
         variable = dataset.variables[var_name]
-        data = variable[:]
         
         grid = info.get_grid(variable.dimensions)
         vertical = info.get_vertical(variable.dimensions)
@@ -146,18 +261,15 @@ class CleaningPipeline:
             
         if vertical is not None :
             vertical_index = variable_dimensions.index(vertical.name)
-            vertical_size = vertical.levels
+            vertical_size = vertical.levels if levels is None else len(levels)
             approved.append(vertical.name)
         else :
             vertical_index = None
             vertical_size = 1
-        
-        data = CleaningPipeline.clean(dataset,approved,variable,data)
-        data = CleaningPipeline.threshold(variable._FillValue,data)
             
-        return CleaningPipeline(
+        pipeline = CleaningPipeline(
             logger=logger,\
-            data = data,\
+            data = None,\
             latitude = DataAxis(data = dataset.variables[grid.axis[1].name],\
                 index= lat_index,\
                 size = grid.points[1][1]),\
@@ -170,4 +282,95 @@ class CleaningPipeline:
             vertical = DataAxis(data = None,\
                 index= vertical_index,\
                 size = vertical_size),\
-        )
\ No newline at end of file
+            variable = variable,\
+            approved = approved,\
+            chunk_size = chunk_size,\
+            levels = levels,\
+        )
+        if not pipeline.chunked():
+            pipeline.data = pipeline.read()
+        return pipeline
+
+"""
+    cleaned variable read lazily from its file : indexing reads and cleans only the
+    requested time steps, so the memory is bounded by the time steps read at once.
+    the file is opened again for every access, the data can be used after the
+    dataset it was built from is closed. the shape is (time,latitude,longitude)
+    or (vertical,time,latitude,longitude)
+"""
+@dataclass
+class TimeChunks:
+    file : str
+    var_name : str
+    info : Info
+    logger : _Logger
+    levels : np.ndarray
+    shape : Tuple[int,...]
+    
+    @property
+    def ndim(self) -> int :
+        return len(self.shape)
+    
+    """
+        read and clean the time steps of the index, the time steps are given by a slice
+        param :
+            index : slice or tuple of slices
+        return :
+            np.ndarray
+    """
+    def __getitem__(self,index) -> np.ndarray :
+        if not isinstance(index,tuple):
+            index = (index,)
+        index = list(index) + [slice(None)]*(self.ndim - len(index))
+        time_axis = self.ndim - 3
+        start,stop,step = index[time_axis].indices(self.shape[time_axis])
+        stop = max(start,stop)
+        index[time_axis] = slice(None,None,step)
+        with Dataset(self.file,"r",format="NETCDF4") as dataset:
+            pipeline = CleaningPipeline.build(dataset=dataset,\
+                info=self.info,\
+                var_name=self.var_name,\
+                logger=self.logger,\
+                chunk_size=max(stop - start,1),\
+                levels=self.levels)
+            chunk = pipeline.exec_time_steps(slice(start,stop),pipeline.flips())
+        shape = self.shape[:time_axis] + (stop - start,) + self.shape[time_axis + 1:]
+        return np.reshape(chunk,shape)[tuple(index)]
+    
+    """
+        same data with a vertical axis of size 1 added, like np.reshape, nothing is read
+        param :
+            shape : tuple
+        return :
+            TimeChunks
+    """
+    def reshape(self,shape,order = "C") -> 'TimeChunks' :
+        shape = tuple(shape)
+        if shape == self.shape or (self.ndim == 3 and shape == (1,) + self.shape):
+            return replace(self,shape=shape)
+        raise ValueError(f"cannot reshape the time chunks of shape {self.shape} into {shape}")
+    
+    """
+        time chunks of a chunked cleaning pipeline, the first time step is read
+        to find the shape of the cleaned data
+        param :
+            file : str, the file of the dataset of the pipeline
+            var_name : str
+            info : Info
+            pipeline : CleaningPipeline
+        return :
+            TimeChunks
+    """
+    @staticmethod
+    def build(file:str,var_name:str,info:Info,pipeline:CleaningPipeline) -> 'TimeChunks':
+        flips = pipeline.flips()
+        if any(flips):
+            pipeline.logger.warning("flip axis of data", "FLIP")
+        shape = list(pipeline.exec_time_steps(slice(0,1),flips).shape)
+        shape[len(shape) - 3] = pipeline.variable.shape[pipeline.time.index]
+        return TimeChunks(file=file,\
+            var_name=var_name,\
+            info=info,\
+            logger=pipeline.logger,\
+            levels=pipeline.levels,\
+            shape=tuple(shape))
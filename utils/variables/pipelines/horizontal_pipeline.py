@@ -1,14 +1,251 @@
 from dataclasses import dataclass,replace
+import hashlib
 import math
-from typing import Tuple
+from typing import Callable, Dict, Tuple, Union
+import numpy as np
+from netCDF4 import Dataset
 from utils.logger import Logger
-from utils.variables.info import Grid, Info
+from utils.variables.info import Grid, Info, RegridEngine
+from utils.variables.info_cache import load_info
 import os.path as path
 
 from utils.import_cdo import cdo
-from os import remove
+from os import getpid, makedirs, remove
+from os import replace as replace_file
 
 
+"""
+    class Remapping, for every point of the target grid the indexes of the source points
+    (flattened (latitude,longitude) indexes) and their weights
+"""
+@dataclass
+class Remapping:
+    indexes : np.ndarray
+    weights : np.ndarray
+    shape : Tuple[int,int]
+    
+    """
+        remap data of shape (..., latitude, longitude) on the target grid
+        param :
+            data : np.ndarray
+        return :
+            np.ndarray (..., target latitude, target longitude)
+    """
+    def apply(self,data:np.ndarray) -> np.ndarray:
+        flat = data.reshape(*data.shape[:-2],-1)
+        if len(self.indexes) == 1:
+            remapped = flat[...,self.indexes[0]]
+        else :
+            if not np.issubdtype(flat.dtype,np.floating):
+                flat = flat.astype(np.float64)
+            flat = np.ma.filled(flat,np.nan)
+            remapped = np.zeros((*flat.shape[:-1],self.indexes.shape[1]),dtype=flat.dtype)
+            for indexes,weights in zip(self.indexes,self.weights):
+                # a missing value with a weight of 0 does not hide the others
+                remapped += np.where(weights > 0, flat[...,indexes] * weights.astype(flat.dtype), 0)
+        return remapped.reshape(*data.shape[:-2],*self.shape)
+    
+    """
+        lower and upper neighbours of every target coordinate among the source coordinates,
+        and the position of the target between them (0 on the lower, 1 on the upper)
+        param :
+            source : np.ndarray (monotonic)
+            target : np.ndarray
+            periodic : bool (longitudes wrapping around 360 degrees)
+        return :
+            Tuple[np.ndarray,np.ndarray,np.ndarray]
+    """
+    @staticmethod
+    def neighbours(source:np.ndarray,target:np.ndarray,periodic:bool) -> Tuple[np.ndarray,np.ndarray,np.ndarray]:
+        n = len(source)
+        descending = n > 1 and source[0] > source[-1]
+        ascending = source[::-1] if descending else source
+        if periodic:
+            target = ascending[0] + np.mod(target - ascending[0],360)
+        upper = np.searchsorted(ascending,target)
+        lower = upper - 1
+        if periodic:
+            lower,upper = np.mod(lower,n),np.mod(upper,n)
+            span = np.mod(ascending[upper] - ascending[lower],360)
+            offset = np.mod(target - ascending[lower],360)
+        else :
+            lower,upper = np.clip(lower,0,n-1),np.clip(upper,0,n-1)
+            span = ascending[upper] - ascending[lower]
+            offset = np.clip(target - ascending[lower],0,span)
+        position = np.divide(offset,span,out=np.zeros_like(offset,dtype=np.float64),where=span != 0)
+        if descending:
+            lower,upper = n - 1 - lower,n - 1 - upper
+        return lower,upper,position
+    
+    """
+        nearest neighbour remapping, the nearest of the four surrounding source points
+        is selected with the great circle distance
+        param :
+            source : Tuple[np.ndarray,np.ndarray] (longitudes and latitudes of the source grid)
+            target : Tuple[np.ndarray,np.ndarray] (longitudes and latitudes of the target grid)
+        return :
+            Remapping
+    """
+    @staticmethod
+    def nearest(source:Tuple[np.ndarray,np.ndarray],target:Tuple[np.ndarray,np.ndarray]) -> 'Remapping':
+        (source_lon,source_lat),(target_lon,target_lat) = source,target
+        lon_lower,lon_upper,_ = Remapping.neighbours(source_lon,target_lon,periodic=True)
+        lat_lower,lat_upper,_ = Remapping.neighbours(source_lat,target_lat,periodic=False)
+        columns = np.stack((lon_lower,lon_upper),axis=-1)
+        rows = np.stack((lat_lower,lat_upper),axis=-1)
+        
+        phi = np.radians(target_lat)[:,None,None,None]
+        candidate_phi = np.radians(source_lat[rows])[:,:,None,None]
+        delta = np.radians(target_lon[:,None] - source_lon[columns])[None,None,:,:]
+        cos_distance = np.sin(phi)*np.sin(candidate_phi) + np.cos(phi)*np.cos(candidate_phi)*np.cos(delta)
+        # at the poles all the longitudes are at the same distance, the closest longitude is kept
+        cos_distance -= 1e-9 * np.abs(np.sin(delta/2))
+        # (target latitude, target longitude, 4 candidates)
+        shape = (len(target_lat),len(target_lon))
+        nearest = np.argmax(cos_distance.transpose(0,2,1,3).reshape(*shape,4),axis=-1)
+        row = np.take_along_axis(np.broadcast_to(rows[:,None,:],(*shape,2)),(nearest//2)[...,None],axis=-1)[...,0]
+        column = np.take_along_axis(np.broadcast_to(columns[None,:,:],(*shape,2)),(nearest%2)[...,None],axis=-1)[...,0]
+        indexes = (row * len(source_lon) + column).reshape(1,-1)
+        return Remapping(indexes=indexes,weights=np.ones(indexes.shape),shape=shape)
+    
+    """
+        bilinear remapping in longitude and latitude
+        param :
+            source : Tuple[np.ndarray,np.ndarray] (longitudes and latitudes of the source grid)
+            target : Tuple[np.ndarray,np.ndarray] (longitudes and latitudes of the target grid)
+        return :
+            Remapping
+    """
+    @staticmethod
+    def bilinear(source:Tuple[np.ndarray,np.ndarray],target:Tuple[np.ndarray,np.ndarray]) -> 'Remapping':
+        (source_lon,source_lat),(target_lon,target_lat) = source,target
+        lon_lower,lon_upper,x = Remapping.neighbours(source_lon,target_lon,periodic=True)
+        lat_lower,lat_upper,y = Remapping.neighbours(source_lat,target_lat,periodic=False)
+        n = len(source_lon)
+        corners = ((lat_lower,lon_lower,1-y,1-x),(lat_lower,lon_upper,1-y,x),\
+            (lat_upper,lon_lower,y,1-x),(lat_upper,lon_upper,y,x))
+        indexes = np.stack([(rows[:,None] * n + columns[None,:]).ravel() for rows,columns,_,_ in corners])
+        weights = np.stack([(wy[:,None] * wx[None,:]).ravel() for _,_,wy,wx in corners])
+        return Remapping(indexes=indexes,weights=weights,shape=(len(target_lat),len(target_lon)))
+    
+    """
+        build the remapping of the given engine
+        param :
+            source : Tuple[np.ndarray,np.ndarray]
+            target : Tuple[np.ndarray,np.ndarray]
+            engine : RegridEngine
+        return :
+            Remapping
+    """
+    @staticmethod
+    def build(source:Tuple[np.ndarray,np.ndarray],target:Tuple[np.ndarray,np.ndarray],engine:RegridEngine) -> 'Remapping':
+        if engine == RegridEngine.BILINEAR:
+            return Remapping.bilinear(source,target)
+        return Remapping.nearest(source,target)
+
+# to increase when the remappings change, the stored files of another version are ignored
+REMAP_STORE_VERSION = 1
+
+"""
+    fingerprint of the missing values of a file : the mask of the first (latitude,longitude)
+    field of each of its variables. cdo builds its weights from the valid points of the
+    source, so variables with different masks (e.g. ocean and atmosphere) need their own weights
+    param :
+        file : str
+    return :
+        str
+"""
+def mask_fingerprint(file:str) -> str:
+    masks = []
+    with Dataset(file,"r") as dataset:
+        for name,variable in sorted(dataset.variables.items()):
+            if name in dataset.dimensions or variable.ndim < 2:
+                continue
+            field = variable[(0,) * (variable.ndim - 2)]
+            masks.append((name,field.shape,np.packbits(np.ma.getmaskarray(field)).tobytes()))
+    return hashlib.sha1(repr(masks).encode()).hexdigest()
+
+"""
+    class RemapStore, remappings by (source grid, resolution, engine). they are kept in memory
+    and, once a directory is mounted, saved in it to be reused by the following runs :
+    the index arrays of the numpy engines in npz files and the cdo gennn weights in netCDF files,
+    whose key also holds the mask of the source (see mask_fingerprint)
+"""
+class RemapStore:
+    def __init__(self):
+        self.remappings : Dict[tuple,Remapping] = {}
+        self.directory = None
+    
+    def mount(self,directory:str):
+        if not path.isdir(directory):
+            makedirs(directory,exist_ok=True)
+        self.directory = directory
+    
+    def unmount(self):
+        self.directory = None
+    
+    """
+        name of the stored file of a key
+        param :
+            key : tuple
+            extension : str
+        return :
+            str
+    """
+    def file(self,key:tuple,extension:str) -> str:
+        digest = hashlib.sha1(repr((REMAP_STORE_VERSION,key)).encode()).hexdigest()
+        return path.join(self.directory,f"{digest}.{extension}")
+    
+    """
+        retrieve the remapping of a key from the memory, then from the directory,
+        and build and store it otherwise
+        param :
+            key : tuple
+            build : Callable[[],Remapping]
+        return :
+            Remapping
+    """
+    def remapping(self,key:tuple,build:Callable[[],Remapping]) -> Remapping:
+        if key in self.remappings:
+            return self.remappings[key]
+        file = None if self.directory is None else self.file(key,"npz")
+        if file is not None and path.isfile(file):
+            with np.load(file) as stored:
+                remapping = Remapping(indexes=stored["indexes"],weights=stored["weights"],shape=tuple(stored["shape"]))
+        else :
+            remapping = build()
+            if file is not None:
+                # written aside and renamed, other processes never read a partial file
+                tmp_file = f"{file}.{getpid()}.tmp.npz"
+                np.savez(tmp_file,indexes=remapping.indexes,weights=remapping.weights,shape=np.array(remapping.shape))
+                replace_file(tmp_file,file)
+        self.remappings[key] = remapping
+        return remapping
+    
+    """
+        retrieve the cdo weights file of a key, generate it if it does not exist yet.
+        None if no directory is mounted
+        param :
+            key : tuple
+            build : Callable[[str],None] (write the weights in the given file)
+        return :
+            Union[str,None]
+    """
+    def weights(self,key:tuple,build:Callable[[str],None]) -> Union[str,None]:
+        if self.directory is None:
+            return None
+        file = self.file(key,"nc")
+        if not path.isfile(file):
+            tmp_file = f"{file}.{getpid()}.tmp.nc"
+            build(tmp_file)
+            replace_file(tmp_file,file)
+        return file
+    
+    def clear(self):
+        self.remappings.clear()
+
+REMAPPINGS = RemapStore()
+
 @dataclass
 class HorizontalPipeline:
     resolution:Tuple[float,float]
@@ -27,10 +264,61 @@ class HorizontalPipeline:
         output_file = self.to_lonlat(file)
         output_file = self.resize(output_file)
 
-        sinfo = cdo.sinfo(input=output_file)
-        info = Info.parse(sinfo)
+        info = load_info(output_file)
         return output_file,info
     
+    """
+        execute the pipeline on loaded data instead of the file, with the numpy remapping of the engine.
+        the remapping is computed once for every source grid, resolution and engine
+        param :
+            data : np.ndarray (..., latitude, longitude) as returned by the CleaningPipeline
+            coordinates : Tuple[np.ndarray,np.ndarray] (longitudes and latitudes of data)
+            info : Info
+            engine : RegridEngine
+        return :
+            Tuple[np.ndarray,Info]
+    """
+    def regrid(self,data:np.ndarray,coordinates:Tuple[np.ndarray,np.ndarray],info:Info,engine:RegridEngine) -> Tuple[np.ndarray,Info]:
+        self.to_lonlat(None)
+        grid = self.compute()
+        key = HorizontalPipeline.key(self.grid,self.resolution,engine)
+        remapping = REMAPPINGS.remapping(key,lambda : Remapping.build(coordinates,HorizontalPipeline.coordinates(grid),engine))
+        data = remapping.apply(data)
+        
+        for size,axis in zip(grid.points[1],grid.axis):
+            axis.bounds = (axis.bounds[0],axis.bounds[0] + (size - 1) * axis.step)
+        names = tuple(axis.name for axis in self.grid.axis)
+        grids = [grid if tuple(axis.name for axis in other.axis) == names else other for other in info.grids]
+        return data,Info(grids=grids,verticals=info.verticals,time=info.time)
+    
+    """
+        key of the remapping of a grid
+        param :
+            grid : Grid
+            resolution : Tuple[float,float]
+            engine : RegridEngine
+        return :
+            tuple
+    """
+    @staticmethod
+    def key(grid:Grid,resolution:Tuple[float,float],engine:RegridEngine) -> tuple:
+        return (engine.value,grid.category,grid.points,\
+            tuple((axis.bounds,axis.step) for axis in grid.axis),tuple(resolution))
+    
+    """
+        longitudes and latitudes of a grid, ordered like the data of the CleaningPipeline
+        (increasing longitudes and decreasing latitudes)
+        param :
+            grid : Grid
+        return :
+            Tuple[np.ndarray,np.ndarray]
+    """
+    @staticmethod
+    def coordinates(grid:Grid) -> Tuple[np.ndarray,np.ndarray]:
+        longitude = grid.axis[0].bounds[0] + np.arange(grid.points[1][0]) * grid.axis[0].step
+        latitude = grid.axis[1].bounds[0] + np.arange(grid.points[1][1]) * grid.axis[1].step
+        return np.sort(longitude),np.sort(latitude)[::-1]
+    
     """
         exclude the non lonlat grid
         param :
@@ -65,7 +353,12 @@ class HorizontalPipeline:
             
         res_suffixe = f".rx{grid.axis[0].step}.ry{grid.axis[1].step}"
         output_file = file.replace(".nc",f"{res_suffixe}.nc")
-        cdo.remapnn(resize_file_txt_path,input=file,output=output_file)
+        key = HorizontalPipeline.key(self.grid,self.resolution,RegridEngine.CDO) + (mask_fingerprint(file),)
+        weights = REMAPPINGS.weights(key,lambda weights_file : cdo.gennn(resize_file_txt_path,input=file,output=weights_file))
+        if weights is None:
+            cdo.remapnn(resize_file_txt_path,input=file,output=output_file)
+        else :
+            cdo.remap(f"{resize_file_txt_path},{weights}",input=file,output=output_file)
         remove(resize_file_txt_path)
         return output_file
     
@@ -77,7 +370,7 @@ class HorizontalPipeline:
             Grid
     """
     def compute(self) -> Grid:
-        grid = replace(self.grid)
+        grid = replace(self.grid,axis=tuple(replace(axis) for axis in self.grid.axis))
         
         for axis in (0,1):
             if self.resolution[axis] is None:
@@ -115,6 +408,8 @@ class HorizontalPipeline:
             class IDLE:
                 def exec(self,file:str,info:Info) -> Tuple[str,Info]:
                     return file,info
+                def regrid(self,data:np.ndarray,coordinates:Tuple[np.ndarray,np.ndarray],info:Info,engine:RegridEngine) -> Tuple[np.ndarray,Info]:
+                    return data,info
             return IDLE()
         return HorizontalPipeline(resolution=resolution,grid=grid)
     
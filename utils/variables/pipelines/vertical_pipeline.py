@@ -1,10 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import List, Tuple
 
 import numpy as np
 from utils.logger import Logger
 from utils.config import Config
-from utils.variables.info import Info, Vertical
+from utils.variables.info import Info, Vertical, VerticalEngine
+from utils.variables.info_cache import load_info
 from netCDF4 import Dataset,_netCDF4
 from utils.import_cdo import cdo
 
@@ -119,58 +120,63 @@ class VerticalPipeline:
         
         file_levels = converter.convert(file_levels)
         
-        distances = self.eval_distances(file_levels)
-        
-        selected_indexes = self.select_indexes(distances)
+        selected_indexes = "".join(f",{i+1}" for i in self.match_levels(file_levels))
         
         output_file = file.replace(".nc",".zr.nc")
         cdo.sellevidx(selected_indexes,input=file, output=output_file)
         
-        sinfo = cdo.sinfo(input=output_file)
-        info = Info.parse(sinfo)
+        info = load_info(output_file)
         
         return output_file,info
     
     """
-        selecting the indexes of the closest levels
+        indexes of the desired levels in the file and the info of the selected levels,
+        the levels are then read directly by the CleaningPipeline without writing an intermediate file
         param :
-            distances : list
+            dataset : Dataset
+            info : Info
         return :
-            str
+            Tuple[np.ndarray,Info]
     """
-    def select_indexes(self,distances:list) -> str :
-        indexes = []
-        for closest_levels in distances:
-            
-            closest_levels_indexes = list(closest_levels.keys())
-            closest_levels_distances = list(closest_levels.values())
-            if len(closest_levels_distances) > 0:
-                indexes.append(closest_levels_indexes[np.argmin(closest_levels_distances)])
+    def select(self,dataset:Dataset,info:Info) -> Tuple[np.ndarray,Info]:
+        coordinate = dataset[self.vertical_name]
+        file_levels = np.ma.filled(coordinate[:].astype(np.float64),np.nan)
         
-        return "".join(f",{i+1}" for i in indexes )
+        converter = UnitConverter.build(\
+            from_unit = self.vertical_unit,\
+            to_unit = self.desired_unit)
         
+        indexes = self.match_levels(converter.convert(file_levels))
+        if len(indexes) == 0:
+            raise Exception(f"no level of {self.vertical_name} matches the desired levels {self.desired_levels}")
         
+        units = getattr(coordinate,"units","")
+        selected = Vertical.from_values(self.vertical_name,file_levels[indexes],units,coordinate.dtype)
+        verticals = [replace(selected,category=v.category) if v.name == self.vertical_name else v for v in info.verticals]
+        return indexes,Info(grids=info.grids,verticals=verticals,time=info.time)
+    
     """
-        evaluate the distances between the file levels and the desired levels
+        indexes of the closest file level of each desired level, the desired levels without
+        any file level in their window (see epsilons) are skipped. evaluated on a
+        (desired levels,file levels) array
         param :
-            file_levels : List[float]
+            file_levels : np.ndarray
         return :
-            list 
+            np.ndarray
     """
-    def eval_distances(self,file_levels:List[float]) -> list: 
-        epsilons = self.epsilons(self.desired_levels)    
-        distances = []
-        for desired_level in self.desired_levels :
-            closest_levels = {}
-            for index,level in enumerate(file_levels):
-                
-                if (level >= desired_level - epsilons[desired_level][0]) \
-                    and (level <= desired_level + epsilons[desired_level][1]):
-                        
-                    closest_levels[index] = abs(desired_level - level)
-                    
-            distances.append(closest_levels)
-        return distances
+    def match_levels(self,file_levels:np.ndarray) -> np.ndarray :
+        desired = np.asarray(self.desired_levels,dtype=np.float64)
+        file_levels = np.asarray(file_levels,dtype=np.float64)
+        epsilons = self.epsilons(self.desired_levels)
+        lower = np.array([epsilons[level][0] for level in self.desired_levels],dtype=np.float64)
+        upper = np.array([epsilons[level][1] for level in self.desired_levels],dtype=np.float64)
+        
+        levels = file_levels[np.newaxis,:]
+        window = (levels >= (desired - lower)[:,np.newaxis]) & (levels <= (desired + upper)[:,np.newaxis])
+        distances = np.where(window,np.abs(desired[:,np.newaxis] - levels),np.inf)
+        
+        matched = window.any(axis=1)
+        return np.argmin(distances,axis=1)[matched]
     
     def epsilons(self,levels) : 
         epsilons = {}
@@ -204,6 +210,8 @@ class VerticalPipeline:
             class IDLE:
                 def exec(self,file:str,info:Info) -> Tuple[str,Info]:
                     return file,info
+                def select(self,dataset:Dataset,info:Info) -> Tuple[np.ndarray,Info]:
+                    return None,info
             return IDLE()
         realm = config.get_realm_hp(variable)
         levels,unit = realm["levels"],realm["unit"]
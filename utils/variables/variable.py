@@ -6,11 +6,13 @@ from cdo import Cdo
 import sys
 from utils.config import Config
 import utils.variables.info as inf
+from utils.variables.info_cache import load_info
 from utils.logger import Logger,_Logger
 from utils.metadata.metadata import Metadata, VariableSpecificMetadata
 from utils.variables.pipelines.horizontal_pipeline import HorizontalPipeline
 from utils.variables.pipelines.vertical_pipeline import VerticalPipeline
-from utils.variables.pipelines.cleaning_pipeline import CleaningPipeline
+from utils.variables.pipelines.cleaning_pipeline import CleaningPipeline, TimeChunks
+from supported_variables.utils.utils import default_processing
 import os.path as path
 from os import link
 
@@ -39,39 +41,47 @@ def select_grid_and_vertical(file:str,var_name:str,info:inf.Info):
     return grid,vertical
 
 
-def load(variable:Variable,file:str,var_name:str,hyper_parameters:dict,config:Config,metadata:Metadata) -> Tuple[np.ndarray,inf.Info]:
-    sinfo = cdo.sinfo(input=file)
-    info = inf.Info.parse(sinfo)
-    vs_metadata = VariableSpecificMetadata()
-    
-    grid,vertical = select_grid_and_vertical(file=file, info=info,var_name=var_name)
-    vs_metadata.extends(
-        original_grid_type = grid.category,\
-        original_xsize = grid.points[1][0],\
-        original_ysize = grid.points[1][1],\
-        original_yinc = grid.axis[1].step,\
-        original_xinc = grid.axis[0].step)
-
-    
-    file,info = HorizontalPipeline.build(
-        resolution=hyper_parameters['resolution'],\
-        grid=grid)\
-    .exec(file,info)
-    
-    file,info = VerticalPipeline.build(variable=variable,\
+"""
+    apply the vertical and cleaning pipelines to a file and read the variable,
+    with the numpy vertical engine only the selected levels are read from the file
+    param :
+        variable:Variable
+        file:str
+        var_name:str
+        info:Info
+        vertical:Vertical
+        hyper_parameters:dict, 'produced' registers the files made for the resolution
+        config:Config
+        lazy:bool, read the time steps of the data when they are used, in chunks of read_chunk_size
+    return :
+        Tuple[np.ndarray,Info,Tuple[str],Tuple[np.ndarray,np.ndarray],dict]
+        (the data, the info, the dimensions and the longitudes and latitudes of the variable
+        and the attributes used in the metadata)
+"""
+def read(variable:Variable,file:str,var_name:str,info:inf.Info,vertical:inf.Vertical,hyper_parameters:dict,config:Config,lazy:bool = False):
+    vertical_pipeline = VerticalPipeline.build(variable=variable,\
         vertical=vertical,\
-        config = config)\
-    .exec(file,info)
+        config = config)
+    vertical_engine = config.get_hp(variable.name).vertical_engine
+    if vertical_engine == inf.VerticalEngine.CDO:
+        selected,info = vertical_pipeline.exec(file,info)
+        if selected != file:
+            hyper_parameters['produced'](selected)
+        file = selected
     
     with Dataset(file,"r",format="NETCDF4") as dataset:
         if var_name is None:
             variable_names = set(dataset.variables.keys()) - set(dataset.dimensions.keys())
             var_name = list(variable_names)[0]
         __variable = dataset[var_name]
+        dimensions = __variable.dimensions
         
-        metadata.extends(**info.reduce(__variable.dimensions).to_metadata())
-
-        vs_metadata.extends(
+        grid = info.get_grid(dimensions)
+        # ordered like the data returned by the CleaningPipeline
+        coordinates = (np.sort(np.ma.filled(dataset.variables[grid.axis[0].name][:].astype(np.float64),np.nan)),\
+            np.sort(np.ma.filled(dataset.variables[grid.axis[1].name][:].astype(np.float64),np.nan))[::-1])
+        
+        attributes = dict(
             original_variable_name = "" if 'name'  not in __variable.__dict__ else __variable.name,\
             original_variable_long_name = "" if 'long_name' not  in __variable.__dict__ else __variable.long_name,\
             std_name = "" if 'standard_name' not in __variable.__dict__ else __variable.standard_name,\
@@ -80,38 +90,98 @@ def load(variable:Variable,file:str,var_name:str,hyper_parameters:dict,config:Co
             history = "" if 'history' not  in dataset.__dict__ else str(dataset.history),\
             original_variable_unit  = "" if 'units' not  in __variable.__dict__ else  __variable.units)
         
-        np_array = CleaningPipeline.build(dataset=dataset,\
+        levels = None
+        if vertical_engine == inf.VerticalEngine.NUMPY:
+            levels,info = vertical_pipeline.select(dataset,info)
+        pipeline = CleaningPipeline.build(dataset=dataset,\
             info=info,\
             logger=hyper_parameters['logger'],
-            var_name=var_name
-        ).exec()
+            var_name=var_name,
+            chunk_size=config.get_hp(variable.name).read_chunk_size if lazy else 0,
+            levels=levels
+        )
+        if pipeline.chunked():
+            np_array = TimeChunks.build(file,var_name,info,pipeline)
+        else :
+            np_array = pipeline.exec()
+    return np_array,info,dimensions,coordinates,attributes
+
+"""
+    read with a cache of the last read file : with a numpy regrid engine the file
+    is read once for all the resolutions
+"""
+def read_once(f):
+    last = {}
+    def cached(variable:Variable,file:str,var_name:str,info:inf.Info,vertical:inf.Vertical,hyper_parameters:dict,config:Config):
+        key = (file,path.getmtime(file),var_name,variable.name,id(config))
+        if key not in last:
+            last.clear()
+            last[key] = f(variable,file,var_name,info,vertical,hyper_parameters,config)
+        np_array,*others = last[key]
+        # the processing of the variable may modify the array in place
+        return (np_array.copy(),*others)
+    return cached
+
+read_for_regrid = read_once(read)
+
+def load(variable:Variable,file:str,var_name:str,hyper_parameters:dict,config:Config,metadata:Metadata) -> Tuple[np.ndarray,inf.Info]:
+    info = load_info(file)
+    vs_metadata = VariableSpecificMetadata()
+    
+    grid,vertical = select_grid_and_vertical(file=file, info=info,var_name=var_name)
+    vs_metadata.extends(
+        original_grid_type = grid.category,\
+        original_xsize = grid.points[1][0],\
+        original_ysize = grid.points[1][1],\
+        original_yinc = grid.axis[1].step,\
+        original_xinc = grid.axis[0].step)
+
+    horizontal_pipeline = HorizontalPipeline.build(
+        resolution=hyper_parameters['resolution'],\
+        grid=grid)
+    hp = config.get_hp(variable.name)
+    regrid_engine = hp.regrid_engine
+    
+    if regrid_engine == inf.RegridEngine.CDO:
+        resized,info = horizontal_pipeline.exec(file,info)
+        if resized != file:
+            hyper_parameters['produced'](resized)
+        file = resized
+        # the streaming conversion reads the time steps from the file when it converts them,
+        # the data must reach the converter as read
+        lazy = hp.streaming and variable.process is default_processing
+        np_array,info,dimensions,_,attributes = read(variable,file,var_name,info,vertical,hyper_parameters,config,lazy)
+    else :
+        np_array,info,dimensions,coordinates,attributes = read_for_regrid(variable,file,var_name,info,vertical,hyper_parameters,config)
+        np_array,info = horizontal_pipeline.regrid(np_array,coordinates,info,regrid_engine)
+    
+    metadata.extends(**info.reduce(dimensions).to_metadata())
+    vs_metadata.extends(**attributes)
            
     return np_array,vs_metadata
 
 class VariableNotFoundError(Exception):pass
 
 
+"""
+    share the preprocessing of the clusters : the first variable of a cluster extracts
+    all the variables of the cluster at once, the next ones read the same output
+"""
 def memoize(f):
     cache = {}
     def memoized(inputs:List[Tuple[str,str]],variable:Variable,tmp_directory:str,cluster):
-        file = None
-        for _file,var in inputs:
-            if _file in cluster:
-                file = _file
-                break
-        if file is not None:
-            real,vars = cluster[file]
-            
-            if real in cache:
-                outputs = cache[real]
-                return [(outputs,var) for file,var in inputs]
-            else :
-                modified_inputs = [(file,",".join(vars))]
-                outputs = f(modified_inputs,variable,tmp_directory,cluster)
-                cache[real] = outputs[0][0]
-                return [(outputs[0][0],var) for file,var in inputs]
-        else :
+        if not any(file in cluster for file,_ in inputs):
             return f(inputs,variable,tmp_directory,cluster)
+        outputs = []
+        for file,var in inputs:
+            if file not in cluster:
+                outputs.extend(f([(file,var)],variable,tmp_directory,cluster))
+                continue
+            real,vars = cluster[file]
+            if real not in cache:
+                cache[real] = f([(file,",".join(vars))],variable,tmp_directory,cluster)[0][0]
+            outputs.append((cache[real],var))
+        return outputs
     return memoized
         
 